@@ -1,10 +1,14 @@
 import os
 import hashlib
+import time
+import uuid
 import jwt
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from models import Usuario
-from database import get_db
+from database import sessao
+from repositories import USUARIO_POR_ID, USUARIO_POR_EMAIL
+from cronometro import medir
+from revogacao import revogacoes
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -13,6 +17,11 @@ JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'default_secret_key')
 JWT_ALGORITHM = os.getenv('JWT_ALGORITHM', 'HS256')
 JWT_EXPIRATION_HOURS = int(os.getenv('JWT_EXPIRATION_HOURS', '24'))
 
+# Modo sem estado: /api/auth/me responde com as claims do token (user_id,
+# nome, email) em vez de ler a tabela usuario. Tokens emitidos antes (sem
+# nome) continuam respondidos pelo banco.
+AUTH_STATELESS = os.getenv('AUTH_STATELESS', '0') == '1'
+
 
 def hash_password(password: str) -> str:
     """
@@ -28,16 +37,21 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return hash_password(plain_password) == hashed_password
 
 
-def generate_jwt_token(user_id: int, email: str) -> str:
+def generate_jwt_token(user_id: int, email: str, nome: str = None) -> str:
     """
     Gera um token JWT válido
+    iat com fração de segundo (comparado aos cortes de revogação) e jti
+    para o logout
     """
     payload = {
         'user_id': user_id,
         'email': email,
         'exp': datetime.utcnow() + timedelta(hours=JWT_EXPIRATION_HOURS),
-        'iat': datetime.utcnow()
+        'iat': time.time(),
+        'jti': uuid.uuid4().hex
     }
+    if nome is not None:
+        payload['nome'] = nome
 
     token = jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
     return token
@@ -46,16 +60,22 @@ def generate_jwt_token(user_id: int, email: str) -> str:
 def decode_jwt_token(token: str) -> dict:
     """
     Decodifica e valida um token JWT
-    Retorna o payload se válido, caso contrário retorna None
+    Retorna o payload se válido e não revogado, caso contrário o erro
     """
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        return payload
+        with medir("jwt"):
+            payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
     except jwt.ExpiredSignatureError:
         return {"error": "Token expirado", "valid": False}
     except jwt.InvalidTokenError:
         return {"error": "Token inválido", "valid": False}
 
+    with medir("revogacao"):
+        revogado = revogacoes.revogado(payload)
+    if revogado:
+        return {"error": "Token revogado", "valid": False}
+    return payload
+
 
 def authenticate_user(email: str, password: str) -> dict:
     """
@@ -63,55 +83,53 @@ def authenticate_user(email: str, password: str) -> dict:
     Retorna um dicionário JSON com os dados do usuário e token JWT se autenticado
     Retorna JSON de erro se a autenticação falhar
     """
-    db = get_db()
-
-    try:
-        # Buscar usuário por email
-        usuario = db.query(Usuario).filter(Usuario.email == email).first()
-
-        if not usuario:
+    with sessao() as db:
+        try:
+            # Buscar usuário por email
+            with medir("usuario"):
+                usuario = db.execute(USUARIO_POR_EMAIL, {"email": email}).scalar()
+
+            if not usuario:
+                return {
+                    "success": False,
+                    "message": "Falha na autenticação",
+                    "error": "Usuário não encontrado",
+                    "data": None
+                }
+
+            # Verificar senha
+            if not verify_password(password, usuario.senha):
+                return {
+                    "success": False,
+                    "message": "Falha na autenticação",
+                    "error": "Senha incorreta",
+                    "data": None
+                }
+
+            # Gerar token JWT
+            token = generate_jwt_token(usuario.id_usuario, usuario.email, usuario.nome)
+
+            # Retornar dados em formato JSON consistente
             return {
-                "success": False,
-                "message": "Falha na autenticação",
-                "error": "Usuário não encontrado",
-                "data": None
+                "success": True,
+                "message": "Autenticação realizada com sucesso",
+                "data": {
+                    "id_usuario": usuario.id_usuario,
+                    "nome": usuario.nome,
+                    "email": usuario.email,
+                    "token": token,
+                    "token_type": "Bearer"
+                }
             }
 
-        # Verificar senha
-        if not verify_password(password, usuario.senha):
+        except Exception as e:
             return {
                 "success": False,
-                "message": "Falha na autenticação",
-                "error": "Senha incorreta",
+                "message": "Erro interno na autenticação",
+                "error": str(e),
                 "data": None
             }
 
-        # Gerar token JWT
-        token = generate_jwt_token(usuario.id_usuario, usuario.email)
-
-        # Retornar dados em formato JSON consistente
-        return {
-            "success": True,
-            "message": "Autenticação realizada com sucesso",
-            "data": {
-                "id_usuario": usuario.id_usuario,
-                "nome": usuario.nome,
-                "email": usuario.email,
-                "token": token,
-                "token_type": "Bearer"
-            }
-        }
-
-    except Exception as e:
-        return {
-            "success": False,
-            "message": "Erro interno na autenticação",
-            "error": str(e),
-            "data": None
-        }
-    finally:
-        db.close()
-
 
 def validate_token(token: str) -> dict:
     """
@@ -140,6 +158,7 @@ def validate_token(token: str) -> dict:
             "valid": True,
             "user_id": payload.get("user_id"),
             "email": payload.get("email"),
+            "nome": payload.get("nome"),
             "expires_at": datetime.fromtimestamp(payload.get("exp")).isoformat() if payload.get("exp") else None
         }
     }
@@ -157,32 +176,42 @@ def get_current_user_from_token(token: str) -> dict:
 
     user_id = validation["data"]["user_id"]
 
-    db = get_db()
-    try:
-        usuario = db.query(Usuario).filter(Usuario.id_usuario == user_id).first()
+    if AUTH_STATELESS and validation["data"]["nome"] is not None:
+        return {
+            "success": True,
+            "message": "Usuário recuperado com sucesso",
+            "data": {
+                "id_usuario": user_id,
+                "nome": validation["data"]["nome"],
+                "email": validation["data"]["email"]
+            }
+        }
+
+    with sessao() as db:
+        try:
+            with medir("usuario"):
+                usuario = db.execute(USUARIO_POR_ID, {"id_usuario": user_id}).scalar()
 
-        if not usuario:
+            if not usuario:
+                return {
+                    "success": False,
+                    "message": "Usuário não encontrado",
+                    "data": None
+                }
+
+            return {
+                "success": True,
+                "message": "Usuário recuperado com sucesso",
+                "data": usuario.to_dict()
+            }
+        except Exception as e:
             return {
                 "success": False,
-                "message": "Usuário não encontrado",
+                "message": "Erro ao recuperar usuário",
+                "error": str(e),
                 "data": None
             }
 
-        return {
-            "success": True,
-            "message": "Usuário recuperado com sucesso",
-            "data": usuario.to_dict()
-        }
-    except Exception as e:
-        return {
-            "success": False,
-            "message": "Erro ao recuperar usuário",
-            "error": str(e),
-            "data": None
-        }
-    finally:
-        db.close()
-
 
 # Exemplo de uso
 if __name__ == "__main__":
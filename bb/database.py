@@ -1,8 +1,12 @@
 import os
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+from cronometro import instrumentar_engine
+from consultas_lentas import registrar_consultas_lentas
 
 load_dotenv()
 
@@ -12,7 +16,12 @@ DB_NAME = os.getenv('DB_NAME', 'sistema')
 DB_USER = os.getenv('DB_USER', 'postgres')
 DB_PASSWORD = os.getenv('DB_PASSWORD', '')
 
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# Driver: psycopg2 (padrão) ou psycopg (v3). O psycopg 3 prepara no servidor
+# as queries executadas DB_PREPARE_THRESHOLD vezes na mesma conexão
+DB_DRIVER = os.getenv('DB_DRIVER', 'psycopg2')
+DB_PREPARE_THRESHOLD = int(os.getenv('DB_PREPARE_THRESHOLD', '5'))
+
+DATABASE_URL = f"postgresql+{DB_DRIVER}://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
 Base = declarative_base()
 
@@ -20,20 +29,109 @@ Base = declarative_base()
 _engine = None
 _SessionLocal = None
 
+# Sessão da requisição atual (definida pelo SessaoPorRequisicaoMiddleware)
+_sessao_requisicao = ContextVar("sessao_requisicao", default=None)
+
+# Contador de checkouts do pool na requisição atual (lista de 1 item, mutável)
+_checkouts_requisicao = ContextVar("checkouts_requisicao", default=None)
+
+def _contar_checkout(dbapi_connection, connection_record, connection_proxy):
+    contador = _checkouts_requisicao.get()
+    if contador is not None:
+        contador[0] += 1
+
 def get_engine():
     global _engine, _SessionLocal
     if _engine is None:
         print(f"[DB] Conectando em {DB_HOST}:{DB_PORT}/{DB_NAME}...", flush=True)
+        connect_args = {"connect_timeout": 5}
+        if DB_DRIVER == "psycopg":
+            try:
+                import psycopg  # noqa: F401
+            except ImportError:
+                raise RuntimeError(
+                    "DB_DRIVER=psycopg exige o psycopg 3: pip install 'psycopg[binary]' "
+                    "(ou use DB_DRIVER=psycopg2)"
+                ) from None
+            connect_args["prepare_threshold"] = DB_PREPARE_THRESHOLD
         _engine = create_engine(
             DATABASE_URL, 
             echo=False, 
             pool_pre_ping=True,
-            connect_args={"connect_timeout": 5}
+            connect_args=connect_args
         )
-        _SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=_engine)
+        # expire_on_commit=False: após o commit os objetos continuam carregados,
+        # sem um SELECT extra (nova transação) para montar a resposta
+        _SessionLocal = sessionmaker(
+            autocommit=False, autoflush=False, expire_on_commit=False, bind=_engine
+        )
+        event.listen(_engine, "checkout", _contar_checkout)
+        instrumentar_engine(_engine)
+        registrar_consultas_lentas(_engine)
         print("[DB] Engine criado", flush=True)
     return _engine
 
 def get_db():
     engine = get_engine()
-    return _SessionLocal()
\ No newline at end of file
+    return _SessionLocal()
+
+def iniciar_sessao_requisicao():
+    """
+    Cria a sessão única da requisição e a torna visível para auth,
+    repositórios e dependências. A sessão só faz checkout de uma conexão
+    quando é usada pela primeira vez.
+    Retorna a sessão e os tokens para encerrar_sessao_requisicao
+    """
+    db = get_db()
+    return db, (_sessao_requisicao.set(db), _checkouts_requisicao.set([0]))
+
+def encerrar_sessao_requisicao(db, tokens):
+    """Fecha a sessão da requisição (rollback do que não foi commitado)"""
+    token_sessao, token_checkouts = tokens
+    try:
+        db.close()
+    finally:
+        _sessao_requisicao.reset(token_sessao)
+        _checkouts_requisicao.reset(token_checkouts)
+
+def checkouts_requisicao() -> int:
+    """Quantos checkouts do pool a requisição atual já fez"""
+    contador = _checkouts_requisicao.get()
+    return contador[0] if contador is not None else 0
+
+@contextmanager
+def sessao(db=None):
+    """
+    Fornece uma sessão: a recebida, a da requisição atual ou, fora de uma
+    requisição (scripts, testes manuais), uma nova que é fechada ao sair
+    """
+    if db is not None:
+        yield db
+        return
+
+    atual = _sessao_requisicao.get()
+    if atual is not None:
+        yield atual
+        return
+
+    nova = get_db()
+    try:
+        yield nova
+    finally:
+        nova.close()
+
+def reiniciar_pool():
+    """
+    Descarta o pool herdado após um fork (gunicorn --preload)
+    Não fecha as conexões do processo pai; o filho abre as suas sob demanda
+    """
+    if _engine is not None:
+        _engine.dispose(close=False)
+
+def encerrar_conexoes():
+    """Fecha as conexões do pool (shutdown gracioso do worker)"""
+    if _engine is not None:
+        _engine.dispose()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reiniciar_pool)
\ No newline at end of file
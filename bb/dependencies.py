@@ -1,24 +1,25 @@
-from fastapi import Header, HTTPException, Depends, status
+from fastapi import Header, HTTPException, Depends, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import Optional
+from typing import List, Optional, Tuple
 from sqlalchemy.orm import Session
-from database import get_db
+from database import sessao
 from auth import decode_jwt_token, validate_token
-from repositories import JSONResponse as RepoJSONResponse
+from repositories import JSONResponse as RepoJSONResponse, escolher_campos, ler_ids
 
 # Schema de segurança para Bearer Token
 security = HTTPBearer()
 
+# Bearer opcional: o EventSource do navegador não envia headers (token na query)
+security_opcional = HTTPBearer(auto_error=False)
+
 async def get_db_session():
     """
-    Dependência que fornece uma sessão do banco de dados
-    Garante fechamento automático após uso
+    Dependência que fornece a sessão do banco de dados da requisição
+    (a mesma usada por auth e repositórios). Fora do middleware de
+    sessão cria uma nova, com fechamento automático após uso
     """
-    db = get_db()
-    try:
+    with sessao() as db:
         yield db
-    finally:
-        db.close()
 
 async def get_current_user_id(
     credentials: HTTPAuthorizationCredentials = Depends(security)
@@ -44,6 +45,47 @@ async def get_current_user_id(
 
     return payload["user_id"]
 
+async def get_current_user_id_eventos(
+    token: Optional[str] = Query(None),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security_opcional)
+) -> int:
+    """
+    Como get_current_user_id, aceitando o token também em ?token=
+    (conexões SSE abertas pelo EventSource)
+    """
+    token = credentials.credentials if credentials else token
+    payload = decode_jwt_token(token) if token else None
+
+    if not payload or "error" in payload:
+        JSONResponse.raise_unauthorized(payload.get("error", "Token inválido") if payload else "Token ausente")
+
+    return payload["user_id"]
+
+def campos_de(recurso: str):
+    """
+    Dependência do parâmetro ?fields= de um recurso (conta, categoria, transacao)
+    Retorna os campos pedidos (None = todos); 400 se algum não for permitido
+    """
+    async def dependencia(
+        fields: Optional[str] = Query(None, description="Campos da resposta, separados por vírgula")
+    ) -> Optional[Tuple[str, ...]]:
+        try:
+            return escolher_campos(recurso, fields)
+        except ValueError as e:
+            JSONResponse.raise_bad_request(str(e))
+    return dependencia
+
+async def ids_do_parametro(
+    ids: Optional[str] = Query(None, description="Multi-get: ids separados por vírgula")
+) -> Optional[List[int]]:
+    """Dependência do parâmetro ?ids= (multi-get); 400 se a lista for inválida"""
+    if ids is None:
+        return None
+    try:
+        return ler_ids(ids)
+    except ValueError as e:
+        JSONResponse.raise_bad_request(str(e))
+
 async def get_current_user_email(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> str:
@@ -0,0 +1,224 @@
+"""
+Eventos em tempo real (SSE)
+As rotas de escrita registram o evento na sessão (publicar) e ele só sai
+depois do commit:
+  - PostgreSQL: pg_notify dentro da transação (o banco só entrega se houver
+    commit) e cada worker escuta o canal em uma conexão dedicada (LISTEN),
+    então os clientes conectados em qualquer worker recebem
+  - outros bancos: entrega local no after_commit (um worker só)
+O Difusor guarda, por usuário, a fila de cada conexão SSE aberta neste
+worker. Uma conexão ociosa custa uma fila e uma corrotina (nenhuma thread
+nem conexão do banco): um worker segura dezenas de milhares.
+"""
+import asyncio
+import json
+import logging
+import os
+import select
+import threading
+from collections import defaultdict
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger("bb.eventos")
+
+# Canal do LISTEN/NOTIFY
+EVENTOS_CANAL = os.getenv('EVENTOS_CANAL', 'bb_eventos')
+
+# Intervalo (s) do comentário de keep-alive nas conexões ociosas
+EVENTOS_HEARTBEAT = float(os.getenv('EVENTOS_HEARTBEAT', '25'))
+
+# Conexões SSE simultâneas por worker (acima disso responde 503)
+EVENTOS_MAX_CONEXOES = int(os.getenv('EVENTOS_MAX_CONEXOES', '20000'))
+
+# Eventos pendentes por conexão antes de o cliente ser considerado lento
+EVENTOS_FILA = int(os.getenv('EVENTOS_FILA', '100'))
+
+
+class Difusor:
+    """Filas das conexões SSE deste worker, por usuário"""
+
+    def __init__(self):
+        self._assinantes = defaultdict(set)
+        self._loop = None
+        self._batimento = None
+        self._escuta = None
+        self._parar = threading.Event()
+        self.conexoes = 0
+        self.entregues = 0
+        self.descartados = 0
+
+    # ---------- conexões (no event loop) ----------
+
+    def assinar(self, id_usuario: int) -> asyncio.Queue:
+        self._loop = asyncio.get_running_loop()
+        fila = asyncio.Queue(EVENTOS_FILA)
+        self._assinantes[id_usuario].add(fila)
+        self.conexoes += 1
+        if self._batimento is None or self._batimento.done():
+            self._batimento = self._loop.create_task(self._bater())
+        self._iniciar_escuta()
+        return fila
+
+    def cancelar(self, id_usuario: int, fila: asyncio.Queue) -> None:
+        filas = self._assinantes.get(id_usuario)
+        if filas is not None and fila in filas:
+            filas.discard(fila)
+            self.conexoes -= 1
+            if not filas:
+                del self._assinantes[id_usuario]
+
+    def entregar(self, id_usuario: int, evento: dict) -> None:
+        for fila in self._assinantes.get(id_usuario, ()):
+            try:
+                fila.put_nowait(evento)
+                self.entregues += 1
+            except asyncio.QueueFull:
+                # Cliente lento: descarta o acumulado e pede uma recarga completa
+                self.descartados += fila.qsize()
+                while not fila.empty():
+                    fila.get_nowait()
+                fila.put_nowait({"tipo": "recarregar"})
+
+    async def _bater(self) -> None:
+        """
+        Keep-alive de todas as conexões por uma única tarefa: as conexões só
+        aguardam a própria fila (sem timer nem wait_for por conexão)
+        """
+        while self.conexoes:
+            await asyncio.sleep(EVENTOS_HEARTBEAT)
+            for filas in list(self._assinantes.values()):
+                for fila in filas:
+                    if fila.empty():
+                        fila.put_nowait(None)
+
+    def entregar_de_thread(self, id_usuario: int, evento: dict) -> None:
+        """Entrega a partir de qualquer thread (rotas sync, thread do LISTEN)"""
+        if self._loop is not None and id_usuario in self._assinantes:
+            self._loop.call_soon_threadsafe(self.entregar, id_usuario, evento)
+
+    # ---------- LISTEN (thread dedicada, só PostgreSQL) ----------
+
+    def _iniciar_escuta(self) -> None:
+        if self._escuta is not None:
+            return
+        from database import get_engine
+        if get_engine().dialect.name != "postgresql":
+            return
+        self._parar.clear()
+        self._escuta = threading.Thread(target=self._escutar, name="bb-eventos-listen", daemon=True)
+        self._escuta.start()
+
+    def _escutar(self) -> None:
+        """Recebe os NOTIFY do canal; reconecta se a conexão cair"""
+        from database import get_engine
+        while not self._parar.is_set():
+            try:
+                # Conexão fora do pool (detach): fica presa no LISTEN
+                conexao_pool = get_engine().raw_connection()
+                conexao_pool.detach()
+                conexao = conexao_pool.dbapi_connection
+                conexao.autocommit = True
+                try:
+                    cursor = conexao.cursor()
+                    cursor.execute(f"LISTEN {EVENTOS_CANAL}")
+                    cursor.close()
+                    logger.info("Escutando o canal %s", EVENTOS_CANAL)
+                    while not self._parar.is_set():
+                        for payload in _aguardar_notificacoes(conexao, timeout=5):
+                            self._receber(payload)
+                finally:
+                    conexao.close()
+            except Exception:
+                logger.exception("Falha no LISTEN; reconectando em 5 s")
+                self._parar.wait(5)
+
+    def _receber(self, payload: str) -> None:
+        try:
+            mensagem = json.loads(payload)
+            self.entregar_de_thread(mensagem["u"], mensagem["e"])
+        except (ValueError, KeyError):
+            logger.warning("Notificação inválida no canal %s: %.200s", EVENTOS_CANAL, payload)
+
+    def encerrar(self) -> None:
+        self._parar.set()
+        if self._escuta is not None:
+            self._escuta.join(timeout=10)
+            self._escuta = None
+
+    def estatisticas(self) -> dict:
+        return {
+            "conexoes": self.conexoes,
+            "usuarios": len(self._assinantes),
+            "entregues": self.entregues,
+            "descartados": self.descartados,
+            "listen": self._escuta is not None and self._escuta.is_alive(),
+        }
+
+
+def _aguardar_notificacoes(conexao, timeout: float):
+    """Payloads recebidos em até `timeout` segundos (psycopg2 ou psycopg 3)"""
+    if isinstance(getattr(conexao, "notifies", None), list):
+        # psycopg2: espera o socket ficar legível e processa
+        if select.select([conexao], [], [], timeout)[0]:
+            conexao.poll()
+            while conexao.notifies:
+                yield conexao.notifies.pop(0).payload
+        return
+    for notificacao in conexao.notifies(timeout=timeout):
+        yield notificacao.payload
+
+
+difusor = Difusor()
+
+
+# ==================== PUBLICAÇÃO ====================
+
+def publicar(db: Session, id_usuario: int, evento: dict) -> None:
+    """Registra o evento na transação da sessão; só é enviado se houver commit"""
+    db.info.setdefault("eventos", []).append((id_usuario, evento))
+
+
+def _postgres(sessao: Session) -> bool:
+    return sessao.get_bind().dialect.name == "postgresql"
+
+
+@event.listens_for(Session, "before_commit")
+def _notificar(sessao):
+    eventos = sessao.info.get("eventos")
+    if eventos and _postgres(sessao):
+        for id_usuario, evento in sessao.info.pop("eventos"):
+            sessao.execute(
+                text("SELECT pg_notify(:canal, :payload)"),
+                {"canal": EVENTOS_CANAL, "payload": json.dumps({"u": id_usuario, "e": evento}, default=str)}
+            )
+
+
+@event.listens_for(Session, "after_commit")
+def _entregar_local(sessao):
+    for id_usuario, evento in sessao.info.pop("eventos", ()):
+        difusor.entregar_de_thread(id_usuario, json.loads(json.dumps(evento, default=str)))
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _descartar(sessao, transacao):
+    # Rollback: o que não foi entregue no commit não aconteceu
+    if transacao.parent is None:
+        sessao.info.pop("eventos", None)
+
+
+# ==================== SSE ====================
+
+async def fluxo_sse(id_usuario: int):
+    """Corpo text/event-stream de uma conexão"""
+    fila = difusor.assinar(id_usuario)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            evento = await fila.get()
+            if evento is None:
+                yield ": ping\n\n"
+                continue
+            yield f"event: {evento['tipo']}\ndata: {json.dumps(evento)}\n\n"
+    finally:
+        difusor.cancelar(id_usuario, fila)
@@ -0,0 +1,104 @@
+"""
+Idempotência dos POSTs
+Clientes em rede instável repetem POSTs; com o header Idempotency-Key a
+repetição devolve a resposta original sem executar a operação de novo.
+
+A chave é reservada (INSERT) na mesma transação da operação: requisições
+concorrentes com a mesma chave esbarram na constraint única, sem lock
+explícito, e a perdedora reenvia a resposta gravada pela vencedora.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import select, bindparam, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models import ChaveIdempotencia
+
+# Por quanto tempo uma chave reenvia a resposta original
+JANELA_IDEMPOTENCIA = timedelta(hours=int(os.getenv('IDEMPOTENCIA_JANELA_HORAS', '24')))
+
+TAMANHO_MAXIMO_CHAVE = 255
+
+CHAVE_POR_USUARIO = (
+    select(ChaveIdempotencia)
+    .where(
+        ChaveIdempotencia.id_usuario == bindparam("id_usuario"),
+        ChaveIdempotencia.chave == bindparam("chave"),
+    )
+    .limit(1)
+)
+
+def _erro(status_code: int, error: str) -> HTTPException:
+    return HTTPException(
+        status_code=status_code,
+        detail={
+            "success": False,
+            "message": "Idempotency-Key inválida",
+            "error": error,
+            "data": None
+        },
+    )
+
+def impressao_digital(corpo: dict) -> str:
+    """SHA-256 do corpo (JSON canônico): a mesma chave não pode mudar de conteúdo"""
+    return hashlib.sha256(json.dumps(corpo, sort_keys=True, default=str).encode()).hexdigest()
+
+def _buscar(db: Session, id_usuario: int, chave: str) -> Optional[ChaveIdempotencia]:
+    return db.execute(CHAVE_POR_USUARIO, {"id_usuario": id_usuario, "chave": chave}).scalar()
+
+def _resposta_gravada(registro: Optional[ChaveIdempotencia], impressao: str) -> dict:
+    if registro is None or registro.resposta is None:
+        raise _erro(status.HTTP_409_CONFLICT, "Requisição com esta chave ainda está em processamento")
+    if registro.impressao != impressao:
+        raise _erro(status.HTTP_422_UNPROCESSABLE_ENTITY, "Chave já utilizada com outro conteúdo")
+    return json.loads(registro.resposta)
+
+def reservar_chave(
+    db: Session, id_usuario: int, chave: str, corpo: dict
+) -> Tuple[Optional[ChaveIdempotencia], Optional[dict]]:
+    """
+    Reserva a chave para esta requisição ou recupera a resposta original
+
+    Returns:
+        (registro, None): requisição nova; execute e chame registrar_resposta
+        (None, resposta): repetição; devolva a resposta original
+    """
+    if not chave or len(chave) > TAMANHO_MAXIMO_CHAVE:
+        raise _erro(status.HTTP_400_BAD_REQUEST, f"A chave deve ter entre 1 e {TAMANHO_MAXIMO_CHAVE} caracteres")
+
+    impressao = impressao_digital(corpo)
+
+    existente = _buscar(db, id_usuario, chave)
+    if existente:
+        if datetime.utcnow() - existente.criado_em < JANELA_IDEMPOTENCIA:
+            return None, _resposta_gravada(existente, impressao)
+        # Fora da janela: a chave pode ser reutilizada
+        db.delete(existente)
+        db.flush()
+
+    registro = ChaveIdempotencia(id_usuario=id_usuario, chave=chave, impressao=impressao)
+    db.add(registro)
+    try:
+        db.flush()
+    except IntegrityError:
+        # Outra requisição com a mesma chave venceu (e já fez commit)
+        db.rollback()
+        return None, _resposta_gravada(_buscar(db, id_usuario, chave), impressao)
+
+    return registro, None
+
+def registrar_resposta(registro: ChaveIdempotencia, resposta: dict) -> None:
+    """Grava a resposta na chave reservada (efetivada no mesmo commit da operação)"""
+    registro.resposta = json.dumps(resposta, default=str)
+
+def expurgar_chaves_expiradas(db: Session) -> int:
+    """Remove as chaves fora da janela de idempotência"""
+    resultado = db.execute(
+        delete(ChaveIdempotencia).where(ChaveIdempotencia.criado_em < datetime.utcnow() - JANELA_IDEMPOTENCIA)
+    )
+    db.commit()
+    return resultado.rowcount
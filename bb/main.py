@@ -1,27 +1,41 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+import json
+import logging
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import Any, Optional
 from sqlalchemy.orm import Session
 from decimal import Decimal
 from datetime import date
 
 # Importações locais
-from auth import authenticate_user, validate_token, get_current_user_from_token
+from auth import authenticate_user, validate_token, get_current_user_from_token, decode_jwt_token
 from repositories import (
     UsuarioRepository, ContaRepository, 
-    CategoriaRepository, TransacaoRepository
+    CategoriaRepository, TransacaoRepository,
+    codificar_cursor, decodificar_cursor, listar_campos, buscar_campos, buscar_varios,
+    CONTA_DE_OUTRO_USUARIO, CATEGORIA_DE_OUTRO_USUARIO, TIPO_INCOMPATIVEL
 )
 from dependencies import (
-    get_db_session, get_current_user_id,
-    JSONResponse, security
+    get_db_session, get_current_user_id, get_current_user_id_eventos,
+    campos_de, ids_do_parametro, JSONResponse, security
 )
-from models import Usuario, Conta, Categoria, Transacao
+from models import Usuario, Conta, Categoria
+from database import encerrar_conexoes
+from revogacao import revogacoes, revogar_token, revogar_usuario
+from idempotencia import reservar_chave, registrar_resposta
+from eventos import (
+    difusor, publicar, fluxo_sse, EVENTOS_MAX_CONEXOES
+)
+from middleware import (
+    SessaoPorRequisicaoMiddleware, AdmissaoMiddleware, ServerTimingMiddleware,
+    estatisticas_admissao
+)
+from cronometro import RotaCronometrada, RespostaJSONCronometrada
 
-print("=" * 70)
-print("🚀 INICIALIZANDO API NA PORTA 8001")
-print("=" * 70)
+logger = logging.getLogger("bb")
 
 # ==================== SCHEMAS ====================
 
@@ -32,7 +46,7 @@ class LoginRequest(BaseModel):
 class StdResponse(BaseModel):
     success: bool
     message: str
-    data: Optional[dict] = None
+    data: Optional[Any] = None
     error: Optional[str] = None
 
 class ContaCreate(BaseModel):
@@ -64,10 +78,12 @@ app = FastAPI(
     title="Sistema Financeiro API",
     version="2.0.0",
     docs_url="/docs",
-    description="API REST com autenticação JWT"
+    description="API REST com autenticação JWT",
+    default_response_class=RespostaJSONCronometrada
 )
 
-print("✓ FastAPI inicializado")
+# Rotas com medição de fases (Server-Timing); precisa vir antes dos decorators
+app.router.route_class = RotaCronometrada
 
 # CORS
 app.add_middleware(
@@ -78,7 +94,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-print("✓ CORS configurado")
+# Uma sessão (e uma conexão) por requisição
+app.add_middleware(SessaoPorRequisicaoMiddleware)
+
+# Server-Timing nas requisições amostradas (mede também a abertura da sessão)
+app.add_middleware(ServerTimingMiddleware)
+
+# Limite de concorrência por grupo de rotas (fica por fora: rejeita antes de abrir sessão)
+app.add_middleware(AdmissaoMiddleware)
 
 # Repositórios
 usuario_repo = UsuarioRepository()
@@ -86,8 +109,6 @@ conta_repo = ContaRepository()
 categoria_repo = CategoriaRepository()
 transacao_repo = TransacaoRepository()
 
-print("✓ Repositórios carregados")
-
 
 # ==================== ROTAS ====================
 
@@ -110,6 +131,21 @@ async def health():
     """Status da API"""
     return JSONResponse.success(data={"status": "healthy", "port": 8001})
 
+@app.get("/api/health/admissao", tags=["Health"])
+async def health_admissao():
+    """Fila e rejeições do controle de admissão por grupo de rotas"""
+    return JSONResponse.success(data=estatisticas_admissao())
+
+@app.get("/api/health/eventos", tags=["Health"])
+async def health_eventos():
+    """Conexões SSE abertas neste worker e eventos entregues/descartados"""
+    return JSONResponse.success(data=difusor.estatisticas())
+
+@app.get("/api/health/revogacao", tags=["Health"])
+async def health_revogacao():
+    """Revogações de token em memória neste worker: filtro, atraso da sincronização e consultas ao banco"""
+    return JSONResponse.success(data=revogacoes.estatisticas())
+
 
 # ==================== AUTH ====================
 
@@ -141,6 +177,28 @@ async def get_me(credentials: HTTPAuthorizationCredentials = Depends(security)):
         raise HTTPException(status_code=401, detail=result)
     return result
 
+@app.post("/api/auth/logout", response_model=StdResponse, tags=["Auth"])
+async def logout(
+    todos: bool = Query(False, description="Revoga todos os tokens do usuário (todas as sessões)"),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db_session)
+):
+    """
+    Logout - Revoga o token usado na requisição
+    Os outros workers recusam o token em até REVOGACAO_INTERVALO segundos
+    """
+    payload = decode_jwt_token(credentials.credentials)
+    if "error" in payload:
+        JSONResponse.raise_unauthorized(payload["error"])
+    
+    # Tokens emitidos antes do jti só podem ser revogados junto com os demais
+    if todos or "jti" not in payload:
+        revogar_usuario(db, payload["user_id"])
+        return JSONResponse.success(message="Logout realizado em todas as sessões")
+    
+    revogar_token(db, payload)
+    return JSONResponse.success(message="Logout realizado com sucesso")
+
 @app.post("/api/auth/validate", response_model=StdResponse, tags=["Auth"])
 async def validate_user_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Valida token JWT"""
@@ -179,7 +237,6 @@ async def criar_usuario(
         
         db.add(novo_usuario)
         db.commit()
-        db.refresh(novo_usuario)
         
         print(f"✅ Usuário criado: {novo_usuario.email}")
         
@@ -217,21 +274,44 @@ async def obter_usuario(
 
 # ==================== CONTAS ====================
 
+def _obter_campos(recurso: str, campos: tuple, id_registro: int, user_id: int, db: Session, nao_encontrado: str):
+    """Detalhe com ?fields=: 404 se não existir, 403 se for de outro usuário"""
+    encontrado = buscar_campos(recurso, campos, id_registro, db=db)
+    if encontrado is None:
+        raise HTTPException(status_code=404, detail=JSONResponse.error(nao_encontrado))
+    data, dono = encontrado
+    if dono != user_id:
+        JSONResponse.raise_forbidden()
+    return JSONResponse.success(data=data)
+
 @app.get("/api/contas", response_model=StdResponse, tags=["Contas"])
 async def listar_contas(
+    campos: Optional[tuple] = Depends(campos_de("conta")),
+    ids: Optional[list] = Depends(ids_do_parametro),
     user_id: int = Depends(get_current_user_id),
     db: Session = Depends(get_db_session)
 ):
-    """Listar contas do usuário"""
+    """
+    Listar contas do usuário (?fields=id_conta,nome,saldo seleciona os campos)
+    Multi-get: ?ids=1,2,3 -> data {itens, ausentes} em uma única consulta
+    """
+    if ids is not None:
+        return buscar_varios("conta", ids, user_id, campos, db=db)
+    if campos:
+        data = listar_campos("conta", campos, db=db, id_usuario=user_id)
+        return JSONResponse.success(data=data, message=f"{len(data)} contas encontradas")
     return conta_repo.get_by_user(user_id, db=db)
 
 @app.get("/api/contas/{conta_id}", response_model=StdResponse, tags=["Contas"])
 async def obter_conta(
     conta_id: int,
+    campos: Optional[tuple] = Depends(campos_de("conta")),
     user_id: int = Depends(get_current_user_id),
     db: Session = Depends(get_db_session)
 ):
-    """Obter conta específica"""
+    """Obter conta específica (?fields= seleciona os campos)"""
+    if campos:
+        return _obter_campos("conta", campos, conta_id, user_id, db, "Conta não encontrada")
     result = conta_repo.get_by_id(conta_id, db=db)
     if not result["success"]:
         raise HTTPException(status_code=404, detail=result)
@@ -239,6 +319,52 @@ async def obter_conta(
         JSONResponse.raise_forbidden()
     return result
 
+@app.get("/api/contas/{conta_id}/extrato", response_model=StdResponse, tags=["Contas"])
+async def extrato_conta(
+    conta_id: int,
+    limite: int = Query(100, ge=0, le=1000),
+    cursor: Optional[str] = None,
+    user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db_session)
+):
+    """
+    Extrato da conta: transações da mais recente para a mais antiga com o
+    saldo após cada uma (calculado no banco a partir do saldo atual)
+    Próxima página: ?cursor=<proximo_cursor>. limite=0 traz o extrato inteiro.
+    A resposta é enviada em streaming, sem montar a lista em memória
+    """
+    result = conta_repo.get_by_id(conta_id, db=db)
+    if not result["success"]:
+        raise HTTPException(status_code=404, detail=result)
+    if result["data"]["id_usuario"] != user_id:
+        JSONResponse.raise_forbidden()
+    
+    try:
+        posicao = decodificar_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail=JSONResponse.error("Cursor inválido"))
+    
+    blocos = conta_repo.extrato(conta_id, limite, posicao, db=db)
+    return StreamingResponse(
+        _extrato_json(result["data"], blocos, limite),
+        media_type="application/json"
+    )
+
+def _extrato_json(conta: dict, blocos, limite: int):
+    """Gera o JSON no formato StdResponse, um bloco de linhas por vez"""
+    yield f'{{"success": true, "message": "Extrato da conta", "data": {{"conta": {json.dumps(conta)}, "transacoes": ['
+    
+    quantidade, ultima = 0, None
+    for bloco in blocos:
+        if not bloco:
+            continue
+        yield ("," if quantidade else "") + ",".join(json.dumps(linha) for linha in bloco)
+        quantidade += len(bloco)
+        ultima = bloco[-1]
+    
+    proximo = codificar_cursor(ultima) if limite and quantidade == limite else None
+    yield f'], "proximo_cursor": {json.dumps(proximo)}}}}}'
+
 @app.post("/api/contas", response_model=StdResponse, status_code=201, tags=["Contas"])
 async def criar_conta(
     conta_data: ContaCreate,
@@ -256,7 +382,6 @@ async def criar_conta(
         
         db.add(nova_conta)
         db.commit()
-        db.refresh(nova_conta)
         
         print(f"✅ Conta criada: {nova_conta.nome}")
         
@@ -274,10 +399,21 @@ async def criar_conta(
 @app.get("/api/categorias", response_model=StdResponse, tags=["Categorias"])
 async def listar_categorias(
     tipo: Optional[str] = None,
+    campos: Optional[tuple] = Depends(campos_de("categoria")),
+    ids: Optional[list] = Depends(ids_do_parametro),
     user_id: int = Depends(get_current_user_id),
     db: Session = Depends(get_db_session)
 ):
-    """Listar categorias"""
+    """
+    Listar categorias (?fields=id_categoria,nome seleciona os campos)
+    Multi-get: ?ids=1,2,3 -> data {itens, ausentes} em uma única consulta
+    """
+    if ids is not None:
+        return buscar_varios("categoria", ids, user_id, campos, db=db)
+    if campos:
+        filtros = {"id_usuario": user_id, "tipo": tipo} if tipo else {"id_usuario": user_id}
+        data = listar_campos("categoria", campos, db=db, **filtros)
+        return JSONResponse.success(data=data, message=f"{len(data)} categorias encontradas")
     if tipo:
         return categoria_repo.get_by_tipo(user_id, tipo, db=db)
     return categoria_repo.get_by_user(user_id, db=db)
@@ -298,7 +434,6 @@ async def criar_categoria(
         
         db.add(nova_categoria)
         db.commit()
-        db.refresh(nova_categoria)
         
         return JSONResponse.success(
             data=nova_categoria.to_dict(),
@@ -313,19 +448,32 @@ async def criar_categoria(
 
 @app.get("/api/transacoes", response_model=StdResponse, tags=["Transações"])
 async def listar_transacoes(
+    campos: Optional[tuple] = Depends(campos_de("transacao")),
+    ids: Optional[list] = Depends(ids_do_parametro),
     user_id: int = Depends(get_current_user_id),
     db: Session = Depends(get_db_session)
 ):
-    """Listar transações"""
+    """
+    Listar transações (?fields=id_transacao,valor,data,descricao seleciona os campos)
+    Multi-get: ?ids=1,2,3 -> data {itens, ausentes} em uma única consulta
+    """
+    if ids is not None:
+        return buscar_varios("transacao", ids, user_id, campos, db=db)
+    if campos:
+        data = listar_campos("transacao", campos, db=db, id_usuario=user_id)
+        return JSONResponse.success(data=data, message=f"{len(data)} transações encontradas")
     return transacao_repo.get_by_user(user_id, db=db)
 
 @app.get("/api/transacoes/{transacao_id}", response_model=StdResponse, tags=["Transações"])
 async def obter_transacao(
     transacao_id: int,
+    campos: Optional[tuple] = Depends(campos_de("transacao")),
     user_id: int = Depends(get_current_user_id),
     db: Session = Depends(get_db_session)
 ):
-    """Obter transação"""
+    """Obter transação (?fields= seleciona os campos, sem os relacionamentos)"""
+    if campos:
+        return _obter_campos("transacao", campos, transacao_id, user_id, db, "Transação não encontrada")
     result = transacao_repo.get_with_relationships(transacao_id, db=db)
     if not result["success"]:
         raise HTTPException(status_code=404, detail=result)
@@ -336,56 +484,55 @@ async def obter_transacao(
 @app.post("/api/transacao", response_model=StdResponse, status_code=201, tags=["Transações"])
 async def criar_transacao(
     transacao_data: TransacaoCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     user_id: int = Depends(get_current_user_id),
     db: Session = Depends(get_db_session)
 ):
-    """Criar transação e atualizar saldo"""
+    """
+    Criar transação e atualizar saldo (Idempotency-Key opcional: repetições reenviam a resposta original)
+    Validação, inserção e saldo em um único comando (TransacaoRepository.criar)
+    """
     try:
-        # Verificar conta
-        conta_result = conta_repo.get_by_id(transacao_data.id_conta, db=db)
-        if not conta_result["success"]:
-            raise HTTPException(status_code=404, detail=JSONResponse.error("Conta não encontrada"))
-        if conta_result["data"]["id_usuario"] != user_id:
-            JSONResponse.raise_forbidden()
+        registro = None
+        if idempotency_key is not None:
+            registro, resposta = reservar_chave(
+                db, user_id, idempotency_key, transacao_data.model_dump(mode="json")
+            )
+            if resposta is not None:
+                response.headers["Idempotent-Replayed"] = "true"
+                return resposta
         
-        # Verificar categoria
-        categoria_result = categoria_repo.get_by_id(transacao_data.id_categoria, db=db)
-        if not categoria_result["success"]:
-            raise HTTPException(status_code=404, detail=JSONResponse.error("Categoria não encontrada"))
-        if categoria_result["data"]["id_usuario"] != user_id:
-            JSONResponse.raise_forbidden()
+        # Conta e categoria do usuário, tipo da categoria, INSERT e saldo: um comando
+        resultado = transacao_repo.criar(user_id, transacao_data.model_dump(), db=db)
+        if not resultado["success"]:
+            db.rollback()
+            motivo = resultado["details"]
+            if motivo in (CONTA_DE_OUTRO_USUARIO, CATEGORIA_DE_OUTRO_USUARIO):
+                JSONResponse.raise_forbidden()
+            if motivo == TIPO_INCOMPATIVEL:
+                raise HTTPException(status_code=400, detail=JSONResponse.error(resultado["message"]))
+            raise HTTPException(status_code=404, detail=JSONResponse.error(resultado["message"]))
         
-        # Criar transação
-        nova_transacao = Transacao(
-            valor=transacao_data.valor,
-            data=transacao_data.data,
-            descricao=transacao_data.descricao,
-            tipo=transacao_data.tipo,
-            id_usuario=user_id,
-            id_conta=transacao_data.id_conta,
-            id_categoria=transacao_data.id_categoria
-        )
+        transacao = {**resultado["data"]}
+        saldo = transacao.pop("saldo_atualizado")
+        
+        # Enviado às conexões de /api/eventos só depois do commit
+        publicar(db, user_id, {
+            "tipo": "transacao_criada",
+            "transacao": transacao,
+            "contas": [{"id_conta": transacao["id_conta"], "saldo": saldo}]
+        })
         
-        # Atualizar saldo
-        conta = db.query(Conta).filter(Conta.id_conta == transacao_data.id_conta).first()
-        if transacao_data.tipo == "receita":
-            conta.saldo += transacao_data.valor
-        else:
-            conta.saldo -= transacao_data.valor
+        # Resposta gravada no mesmo commit da transação e do saldo
+        if registro is not None:
+            registrar_resposta(registro, resultado)
         
-        db.add(nova_transacao)
         db.commit()
-        db.refresh(nova_transacao)
         
-        print(f"✅ Transação criada: {nova_transacao.descricao}")
+        print(f"✅ Transação criada: {transacao['descricao']}")
         
-        return JSONResponse.success(
-            data={
-                **nova_transacao.to_dict(),
-                "saldo_atualizado": float(conta.saldo)
-            },
-            message="Transação criada"
-        )
+        return resultado
     except HTTPException:
         raise
     except Exception as e:
@@ -394,6 +541,29 @@ async def criar_transacao(
         raise HTTPException(status_code=500, detail=JSONResponse.error("Erro", str(e)))
 
 
+# ==================== EVENTOS ====================
+
+@app.get("/api/eventos", tags=["Eventos"])
+async def eventos(user_id: int = Depends(get_current_user_id_eventos)):
+    """
+    Server-Sent Events do usuário: transações criadas e saldos atualizados
+    (substitui o polling de /api/dashboard). O EventSource pode enviar o
+    token em ?token=. Eventos: transacao_criada, recarregar (cliente lento:
+    recarregar o dashboard)
+    """
+    if difusor.conexoes >= EVENTOS_MAX_CONEXOES:
+        raise HTTPException(
+            status_code=503,
+            detail=JSONResponse.error("Serviço sobrecarregado", "Limite de conexões de eventos atingido"),
+            headers={"Retry-After": "5"}
+        )
+    return StreamingResponse(
+        fluxo_sse(user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # ==================== DASHBOARD ====================
 
 @app.get("/api/dashboard", response_model=StdResponse, tags=["Dashboard"])
@@ -417,11 +587,23 @@ async def dashboard(
 
 # ==================== STARTUP ====================
 
-print("=" * 70)
-print("✅ API PRONTA NA PORTA 8001")
-print("📝 Docs: http://localhost:8001/docs")
-print("🔐 Credenciais: joao@email.com / senha123")
-print("=" * 70)
+@app.on_event("startup")
+async def startup():
+    """Log de inicialização (sem efeitos colaterais no import do módulo)"""
+    try:
+        # Carrega as revogações antes da primeira requisição
+        revogacoes.iniciar()
+    except Exception:
+        # Banco indisponível: a carga é refeita no primeiro token validado
+        logger.exception("Falha ao carregar as revogações de token")
+    logger.info("API pronta na porta 8001 - Docs: http://localhost:8001/docs")
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Fecha as conexões do pool ao encerrar o worker"""
+    difusor.encerrar()
+    revogacoes.encerrar()
+    encerrar_conexoes()
 
 
 # ==================== EXECUTAR ====================
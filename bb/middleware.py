@@ -0,0 +1,230 @@
+import os
+import asyncio
+import json
+import logging
+import time
+from starlette.datastructures import MutableHeaders
+from database import (
+    iniciar_sessao_requisicao, encerrar_sessao_requisicao, checkouts_requisicao
+)
+from cronometro import (
+    SERVER_TIMING_LOG, amostrar, iniciar_medicao, encerrar_medicao,
+    registrar, formatar_server_timing, em_milissegundos
+)
+
+logger_timing = logging.getLogger("bb.timing")
+
+# Expõe o número de checkouts do pool por requisição no header X-DB-Checkouts
+DB_EXPOR_CHECKOUTS = os.getenv('DB_EXPOR_CHECKOUTS', '0') == '1'
+
+
+class SessaoPorRequisicaoMiddleware:
+    """
+    Middleware ASGI que abre UMA sessão por requisição (unit of work)
+    Auth, repositórios e a dependência get_db_session usam essa mesma
+    sessão, então a requisição faz no máximo um checkout do pool por
+    transação. A sessão é fechada ao final (rollback do que não foi commitado)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        db, tokens = iniciar_sessao_requisicao()
+
+        async def send_com_checkouts(message):
+            if message["type"] == "http.response.start" and DB_EXPOR_CHECKOUTS:
+                headers = MutableHeaders(scope=message)
+                headers.append("X-DB-Checkouts", str(checkouts_requisicao()))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_com_checkouts)
+        finally:
+            encerrar_sessao_requisicao(db, tokens)
+
+
+# ==================== SERVER-TIMING ====================
+
+class ServerTimingMiddleware:
+    """
+    Middleware ASGI que mede as fases das requisições amostradas
+    (SERVER_TIMING_AMOSTRAGEM) e as envia no header Server-Timing
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not amostrar():
+            await self.app(scope, receive, send)
+            return
+
+        medicoes, token = iniciar_medicao()
+        inicio = time.perf_counter()
+        status = None
+
+        async def send_com_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                registrar("total", time.perf_counter() - inicio)
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", formatar_server_timing(medicoes))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_com_timing)
+        finally:
+            encerrar_medicao(token)
+            if SERVER_TIMING_LOG:
+                logger_timing.info(json.dumps({
+                    "metodo": scope["method"],
+                    "caminho": scope["path"],
+                    "status": status,
+                    "fases_ms": em_milissegundos(medicoes),
+                }))
+
+
+# ==================== ADMISSÃO / LIMITE DE CONCORRÊNCIA ====================
+
+# Rotas caras: disputam o pool do banco e não podem travar as baratas (login)
+ROTAS_PESADAS = {
+    ("GET", "/api/dashboard"),
+    ("GET", "/api/transacoes"),
+}
+
+# Conexões longas e ociosas (SSE): não ocupam vaga de nenhum grupo
+ROTAS_LIVRES = {
+    ("GET", "/api/eventos"),
+}
+
+# (concorrência, tamanho da fila, segundos de espera na fila) por grupo
+LIMITES_ADMISSAO = {
+    "pesadas": (
+        int(os.getenv('ADMISSAO_PESADAS_LIMITE', '4')),
+        int(os.getenv('ADMISSAO_PESADAS_FILA', '16')),
+        float(os.getenv('ADMISSAO_PESADAS_TIMEOUT', '2')),
+    ),
+    "padrao": (
+        int(os.getenv('ADMISSAO_PADRAO_LIMITE', '64')),
+        int(os.getenv('ADMISSAO_PADRAO_FILA', '256')),
+        float(os.getenv('ADMISSAO_PADRAO_TIMEOUT', '5')),
+    ),
+}
+
+
+class GrupoAdmissao:
+    """Semáforo com fila limitada e métricas para um grupo de rotas"""
+
+    def __init__(self, nome, limite, fila, timeout):
+        self.nome = nome
+        self.limite = limite
+        self.fila = fila
+        self.timeout = timeout
+        self._semaforo = asyncio.Semaphore(limite)
+        self.em_execucao = 0
+        self.na_fila = 0
+        self.admitidas = 0
+        self.rejeitadas = 0
+
+    async def entrar(self) -> bool:
+        """Tenta admitir a requisição; False se a fila estiver cheia ou o tempo esgotar"""
+        if not self._semaforo.locked():
+            # Vaga livre: adquire sem passar pela fila
+            await self._semaforo.acquire()
+        elif self.na_fila >= self.fila:
+            self.rejeitadas += 1
+            return False
+        else:
+            self.na_fila += 1
+            try:
+                await asyncio.wait_for(self._semaforo.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                self.rejeitadas += 1
+                return False
+            finally:
+                self.na_fila -= 1
+
+        self.em_execucao += 1
+        self.admitidas += 1
+        return True
+
+    def sair(self):
+        self.em_execucao -= 1
+        self._semaforo.release()
+
+    def to_dict(self):
+        return {
+            "limite": self.limite,
+            "fila_maxima": self.fila,
+            "timeout_fila": self.timeout,
+            "em_execucao": self.em_execucao,
+            "na_fila": self.na_fila,
+            "admitidas": self.admitidas,
+            "rejeitadas": self.rejeitadas,
+        }
+
+
+grupos_admissao = {
+    nome: GrupoAdmissao(nome, *limites) for nome, limites in LIMITES_ADMISSAO.items()
+}
+
+
+def estatisticas_admissao() -> dict:
+    """Profundidade de fila e contadores de rejeição por grupo"""
+    return {nome: grupo.to_dict() for nome, grupo in grupos_admissao.items()}
+
+
+class AdmissaoMiddleware:
+    """
+    Middleware ASGI de controle de admissão
+    Cada grupo de rotas tem limite de concorrência e fila limitada com
+    timeout. Fila cheia (ou espera esgotada) responde 503 com Retry-After
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rota = (scope["method"], scope["path"].rstrip("/") or "/")
+        if rota in ROTAS_LIVRES:
+            await self.app(scope, receive, send)
+            return
+        grupo = grupos_admissao["pesadas" if rota in ROTAS_PESADAS else "padrao"]
+
+        if not await grupo.entrar():
+            await self._rejeitar(grupo, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            grupo.sair()
+
+    @staticmethod
+    async def _rejeitar(grupo, send):
+        corpo = json.dumps({
+            "success": False,
+            "message": "Serviço sobrecarregado",
+            "error": f"Limite de requisições simultâneas atingido ({grupo.nome})",
+            "data": None
+        }).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(corpo)).encode()),
+                (b"retry-after", str(max(1, round(grupo.timeout))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": corpo})
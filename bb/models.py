@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Numeric, Date, DateTime, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from database import Base
 from decimal import Decimal
@@ -99,6 +99,8 @@ class Categoria(Base):
 
 class Transacao(Base):
     __tablename__ = 'transacao'
+    # Extrato por conta em ordem de data (janela e paginação por cursor)
+    __table_args__ = (Index('ix_transacao_conta_data', 'id_conta', 'data', 'id_transacao'),)
 
     id_transacao = Column(Integer, primary_key=True, autoincrement=True)
     valor = Column(Numeric(15, 2), nullable=False)
@@ -132,3 +134,30 @@ class Transacao(Base):
 
     def to_json(self, include_relationships=False):
         return json.dumps(self.to_dict(include_relationships), cls=CustomJSONEncoder)
+
+class ChaveIdempotencia(Base):
+    """Resposta de um POST guardada para reenvio quando o cliente repete a requisição"""
+    __tablename__ = 'chave_idempotencia'
+    # A unicidade (usuário, chave) é o que deduplica requisições concorrentes
+    __table_args__ = (UniqueConstraint('id_usuario', 'chave', name='uq_chave_idempotencia_usuario_chave'),)
+
+    id_chave = Column(Integer, primary_key=True, autoincrement=True)
+    id_usuario = Column(Integer, ForeignKey('usuario.id_usuario', ondelete='CASCADE'), nullable=False)
+    chave = Column(String(255), nullable=False)
+    impressao = Column(String(64), nullable=False)  # SHA-256 do corpo da requisição
+    resposta = Column(Text)  # JSON da resposta original (nulo enquanto processa)
+    criado_em = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class TokenRevogado(Base):
+    """
+    Revogação de tokens JWT, lida pelos workers em revogacao.py. A chave é
+    o jti do token (logout) ou "usuario:<id>" / "todos" (tokens emitidos
+    antes de revogado_em). Fica fora do TRUNCATE do seed
+    """
+    __tablename__ = 'token_revogado'
+
+    id_revogacao = Column(Integer, primary_key=True, autoincrement=True)
+    chave = Column(String(64), unique=True, nullable=False)
+    revogado_em = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)  # sincronização incremental
+    # Depois disso nenhum token afetado passa pelo exp do JWT: a linha pode ser apagada
+    expira_em = Column(DateTime, nullable=False, index=True)
@@ -1,10 +1,291 @@
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Iterator, Tuple
+from datetime import date
+from decimal import Decimal
+from functools import lru_cache
+import os
+from sqlalchemy import select, bindparam, case, cast, exists, func, insert, tuple_, update
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from models import Usuario, Conta, Categoria, Transacao
-from database import get_db
+from database import sessao
 import json
 
+# ==================== CONSULTAS PRÉ-CONSTRUÍDAS ====================
+# Construídas uma única vez no import, com parâmetros nomeados (bindparam).
+# Cada chamada só passa os valores: não há montagem da query em Python e a
+# chave do cache de compilação do SQLAlchemy é sempre a mesma.
+
+USUARIO_POR_ID = select(Usuario).where(Usuario.id_usuario == bindparam("id_usuario")).limit(1)
+USUARIO_POR_EMAIL = select(Usuario).where(Usuario.email == bindparam("email")).limit(1)
+
+CONTA_POR_ID = select(Conta).where(Conta.id_conta == bindparam("id_conta")).limit(1)
+CONTAS_POR_USUARIO = select(Conta).where(Conta.id_usuario == bindparam("id_usuario"))
+
+CATEGORIA_POR_ID = select(Categoria).where(Categoria.id_categoria == bindparam("id_categoria")).limit(1)
+CATEGORIAS_POR_USUARIO = select(Categoria).where(Categoria.id_usuario == bindparam("id_usuario"))
+CATEGORIAS_POR_TIPO = select(Categoria).where(
+    Categoria.id_usuario == bindparam("id_usuario"),
+    Categoria.tipo == bindparam("tipo")
+)
+
+TRANSACAO_POR_ID = select(Transacao).where(Transacao.id_transacao == bindparam("id_transacao")).limit(1)
+TRANSACOES_POR_USUARIO = select(Transacao).where(Transacao.id_usuario == bindparam("id_usuario"))
+TRANSACOES_POR_CONTA = select(Transacao).where(Transacao.id_conta == bindparam("id_conta"))
+TRANSACOES_POR_CATEGORIA = select(Transacao).where(Transacao.id_categoria == bindparam("id_categoria"))
+
+# Extrato: transações da conta da mais recente para a mais antiga com o saldo
+# após cada uma, calculado no banco a partir do saldo atual da conta:
+#   saldo_apos = saldo atual - soma das transações mais recentes que ela
+# A janela (SUM() OVER) segue a ordem do índice (id_conta, data, id_transacao),
+# então o LIMIT interrompe a varredura. Paginação por cursor (data, id): as
+# transações mais recentes que o cursor entram só na âncora (soma agregada)
+_VALOR_ASSINADO = case((Transacao.tipo == "receita", Transacao.valor), else_=-Transacao.valor)
+_ORDEM_EXTRATO = (Transacao.data.desc(), Transacao.id_transacao.desc())
+_ANTES_DO_CURSOR = tuple_(Transacao.data, Transacao.id_transacao) < tuple_(
+    bindparam("cursor_data"), bindparam("cursor_id")
+)
+
+def _consulta_extrato(com_cursor: bool, com_limite: bool):
+    saldo_apos = Conta.saldo - func.coalesce(
+        func.sum(_VALOR_ASSINADO).over(order_by=_ORDEM_EXTRATO, rows=(None, -1)), 0
+    )
+    filtros = [Transacao.id_conta == bindparam("id_conta")]
+    if com_cursor:
+        mais_recentes = select(func.coalesce(func.sum(_VALOR_ASSINADO), 0)).where(
+            Transacao.id_conta == bindparam("id_conta"), ~_ANTES_DO_CURSOR
+        ).scalar_subquery()
+        saldo_apos = saldo_apos - mais_recentes
+        filtros.append(_ANTES_DO_CURSOR)
+
+    stmt = select(
+        Transacao.id_transacao, Transacao.data, Transacao.descricao, Transacao.tipo,
+        Transacao.valor, Transacao.id_categoria, saldo_apos.label("saldo_apos")
+    ).join(Conta, Conta.id_conta == Transacao.id_conta).where(*filtros).order_by(*_ORDEM_EXTRATO)
+    if com_limite:
+        stmt = stmt.limit(bindparam("limite"))
+    # Lê do cursor do banco em blocos (cursor no servidor no PostgreSQL)
+    return stmt.execution_options(yield_per=500)
+
+EXTRATO = {
+    (com_cursor, com_limite): _consulta_extrato(com_cursor, com_limite)
+    for com_cursor in (False, True) for com_limite in (False, True)
+}
+
+def codificar_cursor(linha: Dict) -> str:
+    """Cursor opaco da próxima página: data e id da última linha"""
+    return f"{linha['data']}_{linha['id_transacao']}"
+
+def decodificar_cursor(cursor: str) -> Tuple[date, int]:
+    """Lança ValueError se o cursor for inválido"""
+    data, id_transacao = cursor.split("_")
+    return date.fromisoformat(data), int(id_transacao)
+
+# ==================== INSERÇÃO EM UM COMANDO ====================
+# Validação, INSERT e saldo em um único comando (CTEs que alteram dados):
+# a validação fica no WHERE do UPDATE da conta (conta e categoria do usuário,
+# tipo igual ao da categoria) e o INSERT só lê do RETURNING desse UPDATE.
+# Se recusar, nada é gravado e a linha devolvida diz o motivo
+CONTA_INEXISTENTE = "conta_inexistente"
+CONTA_DE_OUTRO_USUARIO = "conta_de_outro_usuario"
+CATEGORIA_INEXISTENTE = "categoria_inexistente"
+CATEGORIA_DE_OUTRO_USUARIO = "categoria_de_outro_usuario"
+TIPO_INCOMPATIVEL = "tipo_incompativel"
+
+# Colunas gravadas a partir da requisição (CAST: o PostgreSQL não infere o
+# tipo de parâmetros na lista do SELECT)
+_COLUNAS_ENTRADA = ("valor", "data", "descricao", "tipo", "id_usuario", "id_categoria")
+
+def _consulta_insercao():
+    usuario = bindparam("b_id_usuario")
+    conta = select(Conta.id_usuario).where(Conta.id_conta == bindparam("b_id_conta")).cte("conta_pedida")
+    categoria = select(Categoria.id_usuario, Categoria.tipo).where(
+        Categoria.id_categoria == bindparam("b_id_categoria")
+    ).cte("categoria_pedida")
+    saldo = (
+        update(Conta.__table__)
+        .where(
+            Conta.id_conta == bindparam("b_id_conta"),
+            Conta.id_usuario == usuario,
+            exists().where(categoria.c.id_usuario == usuario, categoria.c.tipo == bindparam("b_tipo")),
+        )
+        .values(saldo=Conta.saldo + bindparam("b_variacao", type_=Conta.saldo.type))
+        .returning(Conta.id_conta, Conta.saldo)
+        .cte("saldo_novo")
+    )
+    tabela = Transacao.__table__
+    entrada = [cast(bindparam(f"b_{nome}"), tabela.c[nome].type) for nome in _COLUNAS_ENTRADA]
+    nova = (
+        insert(tabela)
+        .from_select([*_COLUNAS_ENTRADA, "id_conta"], select(*entrada, saldo.c.id_conta))
+        .returning(tabela.c.id_transacao, tabela.c.valor)
+        .cte("transacao_nova")
+    )
+    return select(
+        select(conta.c.id_usuario).scalar_subquery().label("conta_dono"),
+        select(categoria.c.id_usuario).scalar_subquery().label("categoria_dono"),
+        select(categoria.c.tipo).scalar_subquery().label("categoria_tipo"),
+        select(saldo.c.id_conta).scalar_subquery().label("id_conta"),
+        select(saldo.c.saldo).scalar_subquery().label("saldo"),
+        select(nova.c.id_transacao).scalar_subquery().label("id_transacao"),
+        select(nova.c.valor).scalar_subquery().label("valor"),
+    )
+
+INSERIR_TRANSACAO = _consulta_insercao()
+
+def _motivo_recusa(linha, user_id: int, tipo: str) -> str:
+    if linha.conta_dono is None:
+        return CONTA_INEXISTENTE
+    if linha.conta_dono != user_id:
+        return CONTA_DE_OUTRO_USUARIO
+    if linha.categoria_dono is None:
+        return CATEGORIA_INEXISTENTE
+    if linha.categoria_dono != user_id:
+        return CATEGORIA_DE_OUTRO_USUARIO
+    if linha.categoria_tipo != tipo:
+        return TIPO_INCOMPATIVEL
+    # Validou no snapshot, mas a conta foi removida antes do UPDATE
+    return CONTA_INEXISTENTE
+
+# ==================== CAMPOS (?fields=) ====================
+# Campos que cada recurso aceita em ?fields=, na ordem do to_dict(): coluna
+# e conversão para o mesmo JSON do to_dict(). Só as colunas pedidas entram
+# no SELECT (sem carregar a entidade ORM)
+
+def _dinheiro(valor):
+    return float(valor) if valor else 0.0
+
+def _data_iso(valor):
+    return valor.isoformat() if valor else None
+
+CAMPOS = {
+    "conta": {
+        "id_conta": (Conta.id_conta, None),
+        "nome": (Conta.nome, None),
+        "saldo": (Conta.saldo, _dinheiro),
+        "tipo": (Conta.tipo, None),
+        "id_usuario": (Conta.id_usuario, None),
+    },
+    "categoria": {
+        "id_categoria": (Categoria.id_categoria, None),
+        "nome": (Categoria.nome, None),
+        "tipo": (Categoria.tipo, None),
+        "id_usuario": (Categoria.id_usuario, None),
+    },
+    "transacao": {
+        "id_transacao": (Transacao.id_transacao, None),
+        "valor": (Transacao.valor, _dinheiro),
+        "data": (Transacao.data, _data_iso),
+        "descricao": (Transacao.descricao, None),
+        "tipo": (Transacao.tipo, None),
+        "id_usuario": (Transacao.id_usuario, None),
+        "id_conta": (Transacao.id_conta, None),
+        "id_categoria": (Transacao.id_categoria, None),
+    },
+}
+
+MODELOS = {"conta": Conta, "categoria": Categoria, "transacao": Transacao}
+
+def escolher_campos(recurso: str, fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Campos pedidos em ?fields= (separados por vírgula), na ordem do to_dict()
+    None = todos. Lança ValueError se algum campo não for permitido
+    """
+    if fields is None:
+        return None
+    permitidos = CAMPOS[recurso]
+    pedidos = {campo.strip() for campo in fields.split(",") if campo.strip()}
+    invalidos = pedidos - permitidos.keys()
+    if invalidos or not pedidos:
+        raise ValueError(
+            f"Campos inválidos: {', '.join(sorted(invalidos)) or '(vazio)'}. "
+            f"Permitidos: {', '.join(permitidos)}"
+        )
+    return tuple(nome for nome in permitidos if nome in pedidos)
+
+@lru_cache(maxsize=None)
+def _consulta_campos(recurso: str, campos: Tuple[str, ...], filtros: Tuple[str, ...]):
+    """Consulta pré-construída por combinação de campos (o dono vem sempre, como "_dono")"""
+    modelo = MODELOS[recurso]
+    colunas = [CAMPOS[recurso][nome][0] for nome in campos]
+    return select(*colunas, modelo.id_usuario.label("_dono")).where(
+        *(getattr(modelo, filtro) == bindparam(filtro) for filtro in filtros)
+    )
+
+def _linhas_campos(db: Session, recurso: str, campos: Tuple[str, ...], **filtros) -> List[Tuple[Dict, int]]:
+    """[(dict só com os campos pedidos, id_usuario dono)] das linhas que atendem aos filtros"""
+    conversoes = [(nome, CAMPOS[recurso][nome][1]) for nome in campos]
+    linhas = db.execute(_consulta_campos(recurso, campos, tuple(sorted(filtros))), filtros)
+    return [
+        ({nome: converter(valor) if converter else valor for (nome, converter), valor in zip(conversoes, linha)}, linha[-1])
+        for linha in linhas
+    ]
+
+def listar_campos(recurso: str, campos: Tuple[str, ...], db: Session = None, **filtros) -> List[Dict]:
+    """Registros do recurso (filtros por igualdade de coluna) só com os campos pedidos"""
+    with sessao(db) as db:
+        return [item for item, _ in _linhas_campos(db, recurso, campos, **filtros)]
+
+# ==================== MULTI-GET (?ids=) ====================
+# Vários registros por id em uma única consulta IN, restrita ao usuário
+
+# Máximo de ids por requisição
+MULTI_GET_MAXIMO = int(os.getenv('MULTI_GET_MAXIMO', '100'))
+
+def ler_ids(texto: str) -> List[int]:
+    """
+    Ids distintos de "1,2,3", na ordem em que aparecem
+    Lança ValueError se algum não for inteiro positivo ou se passar do máximo
+    """
+    erro = "ids deve ser uma lista de inteiros positivos separados por vírgula"
+    try:
+        ids = list(dict.fromkeys(int(parte) for parte in texto.split(",") if parte.strip()))
+    except ValueError:
+        raise ValueError(erro)
+    if not ids or any(i <= 0 for i in ids):
+        raise ValueError(erro)
+    if len(ids) > MULTI_GET_MAXIMO:
+        raise ValueError(f"No máximo {MULTI_GET_MAXIMO} ids por requisição")
+    return ids
+
+@lru_cache(maxsize=None)
+def _consulta_ids(recurso: str, campos: Tuple[str, ...]):
+    """Consulta pré-construída por combinação de campos: ids (expanding IN) do usuário"""
+    modelo = MODELOS[recurso]
+    chave = modelo.__mapper__.primary_key[0]
+    colunas = [CAMPOS[recurso][nome][0] for nome in campos]
+    return select(*colunas, chave.label("_chave")).where(
+        chave.in_(bindparam("ids", expanding=True)),
+        modelo.id_usuario == bindparam("id_usuario")
+    )
+
+def buscar_varios(recurso: str, ids: List[int], user_id: int, campos: Tuple[str, ...] = None, db: Session = None) -> Dict:
+    """
+    Multi-get: registros do usuário com os ids pedidos (campos do to_dict() ou os de ?fields=)
+    Itens na ordem dos ids; os não encontrados (ou de outro usuário) vão em "ausentes"
+    """
+    campos = campos or tuple(CAMPOS[recurso])
+    conversoes = [(nome, CAMPOS[recurso][nome][1]) for nome in campos]
+    with sessao(db) as db:
+        linhas = db.execute(_consulta_ids(recurso, campos), {"ids": ids, "id_usuario": user_id}).all()
+    por_id = {
+        linha[-1]: {nome: converter(valor) if converter else valor for (nome, converter), valor in zip(conversoes, linha)}
+        for linha in linhas
+    }
+    data = {
+        "itens": [por_id[i] for i in ids if i in por_id],
+        "ausentes": [i for i in ids if i not in por_id],
+    }
+    return JSONResponse.success(
+        data=data, message=f"{len(data['itens'])} encontrados, {len(data['ausentes'])} ausentes"
+    )
+
+def buscar_campos(recurso: str, campos: Tuple[str, ...], id_registro: int, db: Session = None) -> Optional[Tuple[Dict, int]]:
+    """(campos pedidos, id_usuario dono) do registro, ou None se não existir"""
+    chave = MODELOS[recurso].__mapper__.primary_key[0].key
+    with sessao(db) as db:
+        linhas = _linhas_campos(db, recurso, campos, **{chave: id_registro})
+        return linhas[0] if linhas else None
+
 class JSONResponse:
     """Helper para padronizar respostas JSON"""
     @staticmethod
@@ -32,20 +313,12 @@ class UsuarioRepository:
     def get_by_id(user_id: int, db: Session = None) -> Dict:
         """Busca usuario por ID retornando JSON"""
         try:
-            if db is None:
-                db = get_db()
-                close_after = True
-            else:
-                close_after = False
-
-            usuario = db.query(Usuario).filter(Usuario.id_usuario == user_id).first()
-
-            if close_after:
-                db.close()
+            with sessao(db) as db:
+                usuario = db.execute(USUARIO_POR_ID, {"id_usuario": user_id}).scalar()
 
-            if usuario:
-                return JSONResponse.success(data=usuario.to_dict())
-            return JSONResponse.error("Usuário não encontrado")
+                if usuario:
+                    return JSONResponse.success(data=usuario.to_dict())
+                return JSONResponse.error("Usuário não encontrado")
 
         except SQLAlchemyError as e:
             return JSONResponse.error("Erro ao buscar usuário", str(e))
@@ -54,20 +327,12 @@ class UsuarioRepository:
     def get_by_email(email: str, db: Session = None) -> Dict:
         """Busca usuario por email retornando JSON"""
         try:
-            if db is None:
-                db = get_db()
-                close_after = True
-            else:
-                close_after = False
-
-            usuario = db.query(Usuario).filter(Usuario.email == email).first()
-
-            if close_after:
-                db.close()
+            with sessao(db) as db:
+                usuario = db.execute(USUARIO_POR_EMAIL, {"email": email}).scalar()
 
-            if usuario:
-                return JSONResponse.success(data=usuario.to_dict())
-            return JSONResponse.error("Usuário não encontrado")
+                if usuario:
+                    return JSONResponse.success(data=usuario.to_dict())
+                return JSONResponse.error("Usuário não encontrado")
 
         except SQLAlchemyError as e:
             return JSONResponse.error("Erro ao buscar usuário", str(e))
@@ -76,19 +341,11 @@ class UsuarioRepository:
     def list_all(db: Session = None) -> Dict:
         """Lista todos os usuários em JSON"""
         try:
-            if db is None:
-                db = get_db()
-                close_after = True
-            else:
-                close_after = False
+            with sessao(db) as db:
+                usuarios = db.query(Usuario).all()
+                data = [u.to_dict() for u in usuarios]
 
-            usuarios = db.query(Usuario).all()
-            data = [u.to_dict() for u in usuarios]
-
-            if close_after:
-                db.close()
-
-            return JSONResponse.success(data=data, message=f"{len(data)} usuários encontrados")
+                return JSONResponse.success(data=data, message=f"{len(data)} usuários encontrados")
 
         except SQLAlchemyError as e:
             return JSONResponse.error("Erro ao listar usuários", str(e))
@@ -97,20 +354,12 @@ class UsuarioRepository:
     def get_full_profile(user_id: int, db: Session = None) -> Dict:
         """Retorna perfil completo com relacionamentos em JSON"""
         try:
-            if db is None:
-                db = get_db()
-                close_after = True
-            else:
-                close_after = False
-
-            usuario = db.query(Usuario).filter(Usuario.id_usuario == user_id).first()
+            with sessao(db) as db:
+                usuario = db.execute(USUARIO_POR_ID, {"id_usuario": user_id}).scalar()
 
-            if close_after:
-                db.close()
-
-            if usuario:
-                return JSONResponse.success(data=usuario.to_dict(include_relationships=True))
-            return JSONResponse.error("Usuário não encontrado")
+                if usuario:
+                    return JSONResponse.success(data=usuario.to_dict(include_relationships=True))
+                return JSONResponse.error("Usuário não encontrado")
 
         except SQLAlchemyError as e:
             return JSONResponse.error("Erro ao buscar perfil", str(e))
@@ -122,20 +371,12 @@ class ContaRepository:
     def get_by_id(conta_id: int, db: Session = None) -> Dict:
         """Busca conta por ID retornando JSON"""
         try:
-            if db is None:
-                db = get_db()
-                close_after = True
-            else:
-                close_after = False
-
-            conta = db.query(Conta).filter(Conta.id_conta == conta_id).first()
+            with sessao(db) as db:
+                conta = db.execute(CONTA_POR_ID, {"id_conta": conta_id}).scalar()
 
-            if close_after:
-                db.close()
-
-            if conta:
-                return JSONResponse.success(data=conta.to_dict())
-            return JSONResponse.error("Conta não encontrada")
+                if conta:
+                    return JSONResponse.success(data=conta.to_dict())
+                return JSONResponse.error("Conta não encontrada")
 
         except SQLAlchemyError as e:
             return JSONResponse.error("Erro ao buscar conta", str(e))
@@ -144,19 +385,11 @@ class ContaRepository:
     def get_by_user(user_id: int, db: Session = None) -> Dict:
         """Busca contas do usuário retornando JSON"""
         try:
-            if db is None:
-                db = get_db()
-                close_after = True
-            else:
-                close_after = False
-
-            contas = db.query(Conta).filter(Conta.id_usuario == user_id).all()
-            data = [c.to_dict() for c in contas]
-
-            if close_after:
-                db.close()
+            with sessao(db) as db:
+                contas = db.execute(CONTAS_POR_USUARIO, {"id_usuario": user_id}).scalars().all()
+                data = [c.to_dict() for c in contas]
 
-            return JSONResponse.success(data=data, message=f"{len(data)} contas encontradas")
+                return JSONResponse.success(data=data, message=f"{len(data)} contas encontradas")
 
         except SQLAlchemyError as e:
             return JSONResponse.error("Erro ao buscar contas", str(e))
@@ -165,24 +398,47 @@ class ContaRepository:
     def get_with_transacoes(conta_id: int, db: Session = None) -> Dict:
         """Busca conta com transações em JSON"""
         try:
-            if db is None:
-                db = get_db()
-                close_after = True
-            else:
-                close_after = False
-
-            conta = db.query(Conta).filter(Conta.id_conta == conta_id).first()
-
-            if close_after:
-                db.close()
+            with sessao(db) as db:
+                conta = db.execute(CONTA_POR_ID, {"id_conta": conta_id}).scalar()
 
-            if conta:
-                return JSONResponse.success(data=conta.to_dict(include_transacoes=True))
-            return JSONResponse.error("Conta não encontrada")
+                if conta:
+                    return JSONResponse.success(data=conta.to_dict(include_transacoes=True))
+                return JSONResponse.error("Conta não encontrada")
 
         except SQLAlchemyError as e:
             return JSONResponse.error("Erro ao buscar conta", str(e))
 
+    @staticmethod
+    def extrato(
+        conta_id: int, limite: int = 0, cursor: Optional[Tuple[date, int]] = None, db: Session = None
+    ) -> Iterator[List[Dict]]:
+        """
+        Extrato da conta em blocos de linhas (dicts), da mais recente para a
+        mais antiga, com saldo_apos calculado no banco. limite=0: sem limite.
+        Gerador: as linhas são lidas do banco conforme são consumidas
+        """
+        parametros = {"id_conta": conta_id}
+        if limite:
+            parametros["limite"] = limite
+        if cursor:
+            parametros["cursor_data"], parametros["cursor_id"] = cursor
+
+        with sessao(db) as db:
+            resultado = db.execute(EXTRATO[(cursor is not None, bool(limite))], parametros)
+            for bloco in resultado.partitions():
+                yield [
+                    {
+                        'id_transacao': linha.id_transacao,
+                        'data': linha.data.isoformat(),
+                        'descricao': linha.descricao,
+                        'tipo': linha.tipo,
+                        'valor': float(linha.valor),
+                        'id_categoria': linha.id_categoria,
+                        'saldo_apos': float(linha.saldo_apos)
+                    }
+                    for linha in bloco
+                ]
+
 class CategoriaRepository:
     """Repositório para operações de Categoria - retorna sempre JSON"""
 
@@ -190,20 +446,12 @@ class CategoriaRepository:
     def get_by_id(categoria_id: int, db: Session = None) -> Dict:
         """Busca categoria por ID retornando JSON"""
         try:
-            if db is None:
-                db = get_db()
-                close_after = True
-            else:
-                close_after = False
-
-            categoria = db.query(Categoria).filter(Categoria.id_categoria == categoria_id).first()
-
-            if close_after:
-                db.close()
+            with sessao(db) as db:
+                categoria = db.execute(CATEGORIA_POR_ID, {"id_categoria": categoria_id}).scalar()
 
-            if categoria:
-                return JSONResponse.success(data=categoria.to_dict())
-            return JSONResponse.error("Categoria não encontrada")
+                if categoria:
+                    return JSONResponse.success(data=categoria.to_dict())
+                return JSONResponse.error("Categoria não encontrada")
 
         except SQLAlchemyError as e:
             return JSONResponse.error("Erro ao buscar categoria", str(e))
@@ -212,19 +460,11 @@ class CategoriaRepository:
     def get_by_user(user_id: int, db: Session = None) -> Dict:
         """Busca categorias do usuário retornando JSON"""
         try:
-            if db is None:
-                db = get_db()
-                close_after = True
-            else:
-                close_after = False
+            with sessao(db) as db:
+                categorias = db.execute(CATEGORIAS_POR_USUARIO, {"id_usuario": user_id}).scalars().all()
+                data = [c.to_dict() for c in categorias]
 
-            categorias = db.query(Categoria).filter(Categoria.id_usuario == user_id).all()
-            data = [c.to_dict() for c in categorias]
-
-            if close_after:
-                db.close()
-
-            return JSONResponse.success(data=data, message=f"{len(data)} categorias encontradas")
+                return JSONResponse.success(data=data, message=f"{len(data)} categorias encontradas")
 
         except SQLAlchemyError as e:
             return JSONResponse.error("Erro ao buscar categorias", str(e))
@@ -233,22 +473,13 @@ class CategoriaRepository:
     def get_by_tipo(user_id: int, tipo: str, db: Session = None) -> Dict:
         """Busca categorias por tipo (receita/despesa) retornando JSON"""
         try:
-            if db is None:
-                db = get_db()
-                close_after = True
-            else:
-                close_after = False
-
-            categorias = db.query(Categoria).filter(
-                Categoria.id_usuario == user_id,
-                Categoria.tipo == tipo
-            ).all()
-            data = [c.to_dict() for c in categorias]
+            with sessao(db) as db:
+                categorias = db.execute(
+                    CATEGORIAS_POR_TIPO, {"id_usuario": user_id, "tipo": tipo}
+                ).scalars().all()
+                data = [c.to_dict() for c in categorias]
 
-            if close_after:
-                db.close()
-
-            return JSONResponse.success(data=data, message=f"{len(data)} categorias de {tipo} encontradas")
+                return JSONResponse.success(data=data, message=f"{len(data)} categorias de {tipo} encontradas")
 
         except SQLAlchemyError as e:
             return JSONResponse.error("Erro ao buscar categorias", str(e))
@@ -260,20 +491,12 @@ class TransacaoRepository:
     def get_by_id(transacao_id: int, db: Session = None) -> Dict:
         """Busca transação por ID retornando JSON"""
         try:
-            if db is None:
-                db = get_db()
-                close_after = True
-            else:
-                close_after = False
-
-            transacao = db.query(Transacao).filter(Transacao.id_transacao == transacao_id).first()
+            with sessao(db) as db:
+                transacao = db.execute(TRANSACAO_POR_ID, {"id_transacao": transacao_id}).scalar()
 
-            if close_after:
-                db.close()
-
-            if transacao:
-                return JSONResponse.success(data=transacao.to_dict())
-            return JSONResponse.error("Transação não encontrada")
+                if transacao:
+                    return JSONResponse.success(data=transacao.to_dict())
+                return JSONResponse.error("Transação não encontrada")
 
         except SQLAlchemyError as e:
             return JSONResponse.error("Erro ao buscar transação", str(e))
@@ -282,19 +505,11 @@ class TransacaoRepository:
     def get_by_user(user_id: int, db: Session = None) -> Dict:
         """Busca transações do usuário retornando JSON"""
         try:
-            if db is None:
-                db = get_db()
-                close_after = True
-            else:
-                close_after = False
-
-            transacoes = db.query(Transacao).filter(Transacao.id_usuario == user_id).all()
-            data = [t.to_dict() for t in transacoes]
+            with sessao(db) as db:
+                transacoes = db.execute(TRANSACOES_POR_USUARIO, {"id_usuario": user_id}).scalars().all()
+                data = [t.to_dict() for t in transacoes]
 
-            if close_after:
-                db.close()
-
-            return JSONResponse.success(data=data, message=f"{len(data)} transações encontradas")
+                return JSONResponse.success(data=data, message=f"{len(data)} transações encontradas")
 
         except SQLAlchemyError as e:
             return JSONResponse.error("Erro ao buscar transações", str(e))
@@ -303,20 +518,12 @@ class TransacaoRepository:
     def get_with_relationships(transacao_id: int, db: Session = None) -> Dict:
         """Busca transação com todos os relacionamentos (conta e categoria) em JSON"""
         try:
-            if db is None:
-                db = get_db()
-                close_after = True
-            else:
-                close_after = False
-
-            transacao = db.query(Transacao).filter(Transacao.id_transacao == transacao_id).first()
+            with sessao(db) as db:
+                transacao = db.execute(TRANSACAO_POR_ID, {"id_transacao": transacao_id}).scalar()
 
-            if close_after:
-                db.close()
-
-            if transacao:
-                return JSONResponse.success(data=transacao.to_dict(include_relationships=True))
-            return JSONResponse.error("Transação não encontrada")
+                if transacao:
+                    return JSONResponse.success(data=transacao.to_dict(include_relationships=True))
+                return JSONResponse.error("Transação não encontrada")
 
         except SQLAlchemyError as e:
             return JSONResponse.error("Erro ao buscar transação", str(e))
@@ -325,19 +532,11 @@ class TransacaoRepository:
     def get_by_conta(conta_id: int, db: Session = None) -> Dict:
         """Busca transações por conta retornando JSON"""
         try:
-            if db is None:
-                db = get_db()
-                close_after = True
-            else:
-                close_after = False
-
-            transacoes = db.query(Transacao).filter(Transacao.id_conta == conta_id).all()
-            data = [t.to_dict() for t in transacoes]
-
-            if close_after:
-                db.close()
+            with sessao(db) as db:
+                transacoes = db.execute(TRANSACOES_POR_CONTA, {"id_conta": conta_id}).scalars().all()
+                data = [t.to_dict() for t in transacoes]
 
-            return JSONResponse.success(data=data, message=f"{len(data)} transações encontradas")
+                return JSONResponse.success(data=data, message=f"{len(data)} transações encontradas")
 
         except SQLAlchemyError as e:
             return JSONResponse.error("Erro ao buscar transações", str(e))
@@ -346,23 +545,61 @@ class TransacaoRepository:
     def get_by_categoria(categoria_id: int, db: Session = None) -> Dict:
         """Busca transações por categoria retornando JSON"""
         try:
-            if db is None:
-                db = get_db()
-                close_after = True
-            else:
-                close_after = False
-
-            transacoes = db.query(Transacao).filter(Transacao.id_categoria == categoria_id).all()
-            data = [t.to_dict() for t in transacoes]
-
-            if close_after:
-                db.close()
+            with sessao(db) as db:
+                transacoes = db.execute(TRANSACOES_POR_CATEGORIA, {"id_categoria": categoria_id}).scalars().all()
+                data = [t.to_dict() for t in transacoes]
 
-            return JSONResponse.success(data=data, message=f"{len(data)} transações encontradas")
+                return JSONResponse.success(data=data, message=f"{len(data)} transações encontradas")
 
         except SQLAlchemyError as e:
             return JSONResponse.error("Erro ao buscar transações", str(e))
 
+    @staticmethod
+    def criar(user_id: int, dados: Dict, db: Session) -> Dict:
+        """
+        Valida, insere e ajusta o saldo da conta em um único comando (sem commit)
+        Sucesso: data = to_dict() da transação + saldo_atualizado
+        Recusa: details = motivo (CONTA_INEXISTENTE, CONTA_DE_OUTRO_USUARIO, ...
+        TIPO_INCOMPATIVEL); nada foi gravado
+        """
+        valor = Decimal(str(dados["valor"]))
+        parametros = {
+            **{f"b_{nome}": dados[nome] for nome in ("data", "descricao", "tipo", "id_conta", "id_categoria")},
+            "b_valor": valor,
+            "b_id_usuario": user_id,
+            "b_variacao": valor if dados["tipo"] == "receita" else -valor,
+        }
+        try:
+            linha = db.execute(INSERIR_TRANSACAO, parametros).one()
+        except IntegrityError:
+            # Categoria removida por outra transação entre a leitura e o INSERT
+            return JSONResponse.error("Categoria não encontrada", CATEGORIA_INEXISTENTE)
+
+        if linha.id_transacao is None:
+            motivo = _motivo_recusa(linha, user_id, dados["tipo"])
+            if motivo == TIPO_INCOMPATIVEL:
+                return JSONResponse.error(
+                    f"Tipo da transação ({dados['tipo']}) não corresponde ao tipo da categoria ({linha.categoria_tipo})",
+                    motivo
+                )
+            nome = "Conta" if motivo.startswith("conta") else "Categoria"
+            return JSONResponse.error(f"{nome} não encontrada", motivo)
+
+        return JSONResponse.success(
+            data={
+                "id_transacao": linha.id_transacao,
+                "valor": _dinheiro(linha.valor),
+                "data": _data_iso(dados["data"]),
+                "descricao": dados["descricao"],
+                "tipo": dados["tipo"],
+                "id_usuario": user_id,
+                "id_conta": linha.id_conta,
+                "id_categoria": dados["id_categoria"],
+                "saldo_atualizado": float(linha.saldo),
+            },
+            message="Transação criada"
+        )
+
 
 usuario_repo = UsuarioRepository()
 conta_repo = ContaRepository()
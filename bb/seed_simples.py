@@ -94,6 +94,38 @@ try:
         );
     """)
     
+    # Extrato por conta em ordem de data (janela e paginação por cursor)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS ix_transacao_conta_data
+            ON transacao (id_conta, data, id_transacao);
+    """)
+    
+    # Criar tabela CHAVE_IDEMPOTENCIA (respostas de POSTs repetidos)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS chave_idempotencia (
+            id_chave SERIAL PRIMARY KEY,
+            id_usuario INTEGER NOT NULL,
+            chave VARCHAR(255) NOT NULL,
+            impressao VARCHAR(64) NOT NULL,
+            resposta TEXT,
+            criado_em TIMESTAMP NOT NULL DEFAULT now(),
+            CONSTRAINT uq_chave_idempotencia_usuario_chave UNIQUE (id_usuario, chave),
+            FOREIGN KEY (id_usuario) REFERENCES usuario(id_usuario) ON DELETE CASCADE
+        );
+    """)
+    
+    # Criar tabela TOKEN_REVOGADO (logout; fica fora do TRUNCATE do passo 5)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS token_revogado (
+            id_revogacao SERIAL PRIMARY KEY,
+            chave VARCHAR(64) NOT NULL UNIQUE,
+            revogado_em TIMESTAMP NOT NULL,
+            expira_em TIMESTAMP NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS ix_token_revogado_revogado_em ON token_revogado (revogado_em);
+        CREATE INDEX IF NOT EXISTS ix_token_revogado_expira_em ON token_revogado (expira_em);
+    """)
+    
     conn.commit()
     print("✓ Tabelas criadas")
 except Exception as e:
@@ -103,14 +135,15 @@ except Exception as e:
 
 print("\nPasso 5: Limpando dados antigos...")
 try:
-    cursor.execute("DELETE FROM transacao;")
-    cursor.execute("DELETE FROM categoria;")
-    cursor.execute("DELETE FROM conta;")
-    cursor.execute("DELETE FROM usuario;")
-    cursor.execute("ALTER SEQUENCE usuario_id_usuario_seq RESTART WITH 1;")
-    cursor.execute("ALTER SEQUENCE conta_id_conta_seq RESTART WITH 1;")
-    cursor.execute("ALTER SEQUENCE categoria_id_categoria_seq RESTART WITH 1;")
-    cursor.execute("ALTER SEQUENCE transacao_id_transacao_seq RESTART WITH 1;")
+    # TRUNCATE não varre as linhas nem deixa tuplas mortas, e já reinicia as sequences
+    cursor.execute("TRUNCATE TABLE chave_idempotencia, transacao, categoria, conta, usuario RESTART IDENTITY CASCADE;")
+    # Os ids recomeçam do 1: tokens emitidos antes apontariam para os novos usuários
+    cursor.execute("""
+        INSERT INTO token_revogado (chave, revogado_em, expira_em)
+        VALUES ('todos', now() AT TIME ZONE 'utc', now() AT TIME ZONE 'utc' + %s * interval '1 hour')
+        ON CONFLICT (chave) DO UPDATE
+            SET revogado_em = EXCLUDED.revogado_em, expira_em = EXCLUDED.expira_em;
+    """, (int(os.getenv('JWT_EXPIRATION_HOURS', '24')),))
     conn.commit()
     print("✓ Dados limpos")
 except Exception as e:
@@ -0,0 +1,184 @@
+"""
+Benchmark dos Backends (leileiamor)
+Mesma carga concorrente em cada backend:
+  - sqlite padrão: engine único, sem PRAGMAs (SQLITE_OTIMIZADO=0)
+  - sqlite perfil: WAL + PRAGMAs, um escritor e pool de leitura (app/core/banco_sqlite.py)
+  - postgresql:    se --postgres for informado
+Leitores listam as últimas transações e somam receitas/despesas do usuário;
+escritores inserem transações pelo caminho atômico (gravar_transacoes).
+Reporta operações/s e p99 de cada tipo e confere, no fim, se o saldo e os
+totais batem com o que foi gravado (mesmo resultado em todos os backends).
+
+Cada backend roda em um subprocesso (DATABASE_URL é lido no import do app).
+
+Uso:
+    python benchmarks/backends.py
+    python benchmarks/backends.py --postgres postgresql://... -t 16 -s 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+
+parser = argparse.ArgumentParser(description="Benchmark dos backends: SQLite padrão x perfil SQLite x PostgreSQL")
+parser.add_argument("--postgres", default=None, help="DATABASE_URL do PostgreSQL (opcional)")
+parser.add_argument("-t", "--threads", type=int, default=16, help="Threads concorrentes")
+parser.add_argument("-e", "--escritores", type=float, default=0.2, help="Fração das threads que escrevem")
+parser.add_argument("-s", "--segundos", type=float, default=5)
+parser.add_argument("-n", "--linhas", type=int, default=20000, help="Transações pré-carregadas")
+parser.add_argument("--filho", default=None, help=argparse.SUPPRESS)
+args = parser.parse_args()
+
+VALOR = Decimal("1.10")
+
+
+def executar_carga() -> dict:
+    """Roda no subprocesso, com DATABASE_URL já no ambiente"""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "leileiamor"))
+
+    from sqlalchemy import case, func, select
+
+    from app.core.database import SessionLocal
+    from app.core.gravacao_lote import gravar_transacoes
+    from app.core.migracao import criar_tabelas
+    from app.core.projecao import PROJECAO_TRANSACAO
+    from app.models import Usuario, Conta, Categoria, Transacao
+
+    criar_tabelas()
+    db = SessionLocal()
+    try:
+        usuario = Usuario(nome="Bench", email=f"bench{time.time_ns()}@example.com", senha="x")
+        db.add(usuario)
+        db.flush()
+        conta = Conta(nome="Bench", saldo=Decimal("0.00"), tipo="corrente", id_usuario=usuario.id_usuario)
+        categoria = Categoria(nome="Bench", tipo="receita", id_usuario=usuario.id_usuario)
+        db.add_all([conta, categoria])
+        db.flush()
+        item = {
+            "valor": VALOR,
+            "data": date.today(),
+            "descricao": "bench",
+            "tipo": "receita",
+            "id_usuario": usuario.id_usuario,
+            "id_conta": conta.id_conta,
+            "id_categoria": categoria.id_categoria,
+        }
+        inicio = date(2020, 1, 1)
+        db.execute(
+            Transacao.__table__.insert(),
+            [{**item, "valor": Decimal("0.01"), "data": inicio + timedelta(days=i % 1500)} for i in range(args.linhas)],
+        )
+        conta.saldo = Decimal("0.01") * args.linhas
+        db.commit()
+        id_usuario, id_conta = usuario.id_usuario, conta.id_conta
+    finally:
+        db.close()
+
+    listagem = PROJECAO_TRANSACAO.select().where(
+        Transacao.id_usuario == id_usuario
+    ).order_by(Transacao.data.desc()).limit(50)
+    totais = select(
+        func.sum(case((Transacao.tipo == "receita", Transacao.valor), else_=0)),
+        func.sum(case((Transacao.tipo == "despesa", Transacao.valor), else_=0)),
+    ).where(Transacao.id_usuario == id_usuario)
+
+    def ler():
+        db = SessionLocal()
+        try:
+            PROJECAO_TRANSACAO.serializar(db.execute(listagem))
+            db.execute(totais).one()
+        finally:
+            db.close()
+
+    def escrever():
+        db = SessionLocal()
+        try:
+            gravar_transacoes(db, [item])
+        finally:
+            db.close()
+
+    fim = time.perf_counter() + args.segundos
+    latencias = {"leitura": [], "escrita": []}
+    trava = threading.Lock()
+
+    def trabalhador(indice):
+        tipo, operacao = ("escrita", escrever) if indice < args.threads * args.escritores else ("leitura", ler)
+        minhas = []
+        while time.perf_counter() < fim:
+            inicio = time.perf_counter()
+            operacao()
+            minhas.append(time.perf_counter() - inicio)
+        with trava:
+            latencias[tipo].extend(minhas)
+
+    with ThreadPoolExecutor(args.threads) as pool:
+        list(pool.map(trabalhador, range(args.threads)))
+
+    # Saldo (atualizado por incremento) e soma das transações devem bater
+    db = SessionLocal()
+    try:
+        saldo = db.get(Conta, id_conta).saldo
+        receitas, _ = db.execute(totais).one()
+    finally:
+        db.close()
+    esperado = Decimal("0.01") * args.linhas + VALOR * len(latencias["escrita"])
+
+    resultado = {}
+    for tipo, valores in latencias.items():
+        valores.sort()
+        resultado[tipo] = {
+            "ops_s": len(valores) / args.segundos,
+            "p50": statistics.median(valores) * 1000 if valores else 0,
+            "p99": valores[max(0, int(len(valores) * 0.99) - 1)] * 1000 if valores else 0,
+        }
+    resultado["confere"] = saldo == esperado and Decimal(str(receitas)).quantize(Decimal("0.01")) == esperado
+    return resultado
+
+
+def rodar(nome: str, url: str, otimizado: bool) -> dict:
+    ambiente = {**os.environ, "DATABASE_URL": url, "SQLITE_OTIMIZADO": "1" if otimizado else "0"}
+    saida = subprocess.run(
+        [sys.executable, __file__, "--filho", nome, "-t", str(args.threads), "-e", str(args.escritores),
+         "-s", str(args.segundos), "-n", str(args.linhas)],
+        env=ambiente, capture_output=True, text=True, check=True,
+    )
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    if args.filho:
+        print(json.dumps(executar_carga()))
+        sys.exit(0)
+
+    pasta = tempfile.mkdtemp()
+    backends = [
+        ("sqlite padrão", f"sqlite:///{pasta}/padrao.db", False),
+        ("sqlite perfil", f"sqlite:///{pasta}/perfil.db", True),
+    ]
+    if args.postgres:
+        backends.append(("postgresql", args.postgres, True))
+
+    print("=" * 92)
+    print(f"BACKENDS ({args.threads} threads, {args.escritores:.0%} escrevendo, {args.segundos:g} s, {args.linhas} linhas)")
+    print("=" * 92)
+    print(
+        f"{'backend':<16}{'leituras/s':>12}{'p50':>9}{'p99':>9}"
+        f"{'escritas/s':>13}{'p50':>9}{'p99':>9}{'saldo':>13}"
+    )
+
+    for nome, url, otimizado in backends:
+        r = rodar(nome, url, otimizado)
+        leitura, escrita = r["leitura"], r["escrita"]
+        print(
+            f"{nome:<16}{leitura['ops_s']:>12.0f}{leitura['p50']:>9.2f}{leitura['p99']:>9.2f}"
+            f"{escrita['ops_s']:>13.0f}{escrita['p50']:>9.2f}{escrita['p99']:>9.2f}"
+            f"{'✅ confere' if r['confere'] else '❌ diverge':>13}"
+        )
@@ -0,0 +1,104 @@
+"""
+Benchmark dos Eventos em Tempo Real (leileiamor)
+Abre N conexões SSE ociosas no Difusor (o mesmo gerador fluxo_sse da rota,
+sem a camada HTTP) e mede:
+  - memória por conexão ociosa (tracemalloc)
+  - tempo para um evento chegar a todas as conexões de um usuário (fanout)
+  - tempo para entregar um evento por usuário a todos os usuários
+Não precisa de banco: a entrega local é a mesma que a thread do LISTEN usa.
+
+Uso:
+    python benchmarks/eventos.py
+    python benchmarks/eventos.py -n 50000 -u 5000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+parser = argparse.ArgumentParser(description="Memória e fanout das conexões SSE ociosas")
+parser.add_argument("-n", "--conexoes", type=int, default=20000, help="Conexões ociosas")
+parser.add_argument("-u", "--usuarios", type=int, default=2000, help="Usuários distintos")
+args = parser.parse_args()
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/eventos.db")
+os.environ["EVENTOS_MAX_CONEXOES"] = str(args.conexoes)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "leileiamor"))
+
+from app.core.eventos import difusor, fluxo_sse  # noqa: E402
+
+
+class Contador:
+    """Mensagens recebidas por todas as conexões até atingir o esperado"""
+
+    def __init__(self):
+        self.pronto = asyncio.Event()
+        self.esperados = 0
+        self.recebidos = 0
+
+    def esperar(self, esperados: int) -> asyncio.Event:
+        self.pronto, self.esperados, self.recebidos = asyncio.Event(), esperados, 0
+        return self.pronto
+
+    def receber(self) -> None:
+        self.recebidos += 1
+        if self.recebidos == self.esperados:
+            self.pronto.set()
+
+
+async def conexao(id_usuario: int, contador: Contador):
+    fluxo = fluxo_sse(id_usuario)
+    await fluxo.__anext__()  # "retry:" inicial: a conexão já está assinada
+    contador.receber()
+    async for mensagem in fluxo:
+        if mensagem.startswith("event:"):
+            contador.receber()
+
+
+async def principal():
+    contador = Contador()
+    pronto = contador.esperar(args.conexoes)
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    tarefas = [asyncio.create_task(conexao(i % args.usuarios, contador)) for i in range(args.conexoes)]
+    await pronto.wait()
+    memoria = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    # Um evento para o usuário 0: chega a todas as conexões dele
+    por_usuario = len(range(0, args.conexoes, args.usuarios))
+    pronto = contador.esperar(por_usuario)
+    inicio = time.perf_counter()
+    difusor.entregar(0, {"tipo": "transacao_criada"})
+    await pronto.wait()
+    fanout_usuario = time.perf_counter() - inicio
+
+    # Um evento por usuário: chega a todas as conexões
+    pronto = contador.esperar(args.conexoes)
+    inicio = time.perf_counter()
+    for id_usuario in range(args.usuarios):
+        difusor.entregar(id_usuario, {"tipo": "transacao_criada"})
+    await pronto.wait()
+    fanout_todos = time.perf_counter() - inicio
+
+    abertas = difusor.conexoes
+    for tarefa in tarefas:
+        tarefa.cancel()
+    await asyncio.gather(*tarefas, return_exceptions=True)
+
+    print("=" * 72)
+    print(f"EVENTOS ({args.conexoes} conexões ociosas, {args.usuarios} usuários)")
+    print("=" * 72)
+    print(f"memória por conexão ociosa:        {memoria / args.conexoes / 1024:8.2f} KiB")
+    print(f"memória total:                     {memoria / 1024 / 1024:8.1f} MiB")
+    print(f"fanout 1 usuário ({por_usuario:>5} conexões):  {fanout_usuario * 1000:8.2f} ms")
+    print(f"fanout todos ({args.conexoes:>6} conexões):   {fanout_todos * 1000:8.2f} ms")
+    print(f"conexões abertas / depois de fechar: {abertas} / {difusor.conexoes}")
+
+
+if __name__ == "__main__":
+    asyncio.run(principal())
@@ -0,0 +1,129 @@
+"""
+Benchmark da Gravação em Lote (leileiamor)
+Vários produtores (threads, como as requisições de um worker) inserem
+transações ao mesmo tempo:
+  - individual: um commit por transação (caminho atual)
+  - lote N: GravadorEmLote com até N linhas por lote (group commit)
+Reporta linhas/s e a latência (p50/p99) que cada chamador percebe.
+
+Uso:
+    python benchmarks/gravacao_lote.py                       # SQLite em arquivo temporário
+    python benchmarks/gravacao_lote.py --url postgresql://... -t 64 -n 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+
+parser = argparse.ArgumentParser(description="Benchmark da gravação em lote de transações")
+parser.add_argument("--url", default=None, help="DATABASE_URL (padrão: SQLite temporário)")
+parser.add_argument("-t", "--threads", type=int, default=32, help="Produtores concorrentes")
+parser.add_argument("-n", "--por-thread", type=int, default=50, help="Inserções por produtor")
+parser.add_argument("--lotes", default="1,10,100,500", help="Tamanhos máximos de lote a medir")
+parser.add_argument("--janela-ms", type=float, default=5)
+args = parser.parse_args()
+
+# O engine do app lê DATABASE_URL no import
+os.environ["DATABASE_URL"] = args.url or f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "leileiamor"))
+
+from app.core.database import SessionLocal, engine  # noqa: E402
+from app.core.migracao import criar_tabelas  # noqa: E402
+from app.core.gravacao_lote import GravadorEmLote, gravar_transacoes  # noqa: E402
+from app.models import Usuario, Conta, Categoria  # noqa: E402
+
+
+def preparar() -> dict:
+    """Cria um usuário, uma conta e uma categoria para receber as inserções"""
+    criar_tabelas()
+    db = SessionLocal()
+    try:
+        usuario = Usuario(nome="Bench", email=f"bench{time.time_ns()}@example.com", senha="x")
+        db.add(usuario)
+        db.flush()
+        conta = Conta(nome="Bench", saldo=Decimal("0.00"), tipo="corrente", id_usuario=usuario.id_usuario)
+        categoria = Categoria(nome="Bench", tipo="receita", id_usuario=usuario.id_usuario)
+        db.add_all([conta, categoria])
+        db.commit()
+        return {
+            "valor": Decimal("1.00"),
+            "data": date.today(),
+            "descricao": "bench",
+            "tipo": "receita",
+            "id_usuario": usuario.id_usuario,
+            "id_conta": conta.id_conta,
+            "id_categoria": categoria.id_categoria,
+        }
+    finally:
+        db.close()
+
+
+def individual(item: dict) -> None:
+    db = SessionLocal()
+    try:
+        gravar_transacoes(db, [item])
+    finally:
+        db.close()
+
+
+def em_lote(gravador: GravadorEmLote):
+    """enviar() é uma corrotina (a rota aguarda com await): cada produtor usa um event loop próprio"""
+    locais = threading.local()
+
+    def gravar(item: dict) -> dict:
+        if not hasattr(locais, "loop"):
+            locais.loop = asyncio.new_event_loop()
+        return locais.loop.run_until_complete(gravador.enviar(item))
+    return gravar
+
+
+def medir(gravar, item: dict) -> dict:
+    """Executa threads x por_thread inserções e mede vazão e latência"""
+    def produtor(_):
+        latencias = []
+        for _ in range(args.por_thread):
+            inicio = time.perf_counter()
+            gravar(item)
+            latencias.append(time.perf_counter() - inicio)
+        return latencias
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as pool:
+        latencias = [x for parcial in pool.map(produtor, range(args.threads)) for x in parcial]
+    duracao = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "linhas_s": len(latencias) / duracao,
+        "p50": statistics.median(latencias) * 1000,
+        "p99": latencias[int(len(latencias) * 0.99) - 1] * 1000,
+    }
+
+
+if __name__ == "__main__":
+    item = preparar()
+
+    print("=" * 72)
+    print(
+        f"GRAVAÇÃO EM LOTE ({engine.url.get_backend_name()}, {args.threads} threads x "
+        f"{args.por_thread} inserções, janela {args.janela_ms} ms)"
+    )
+    print("=" * 72)
+    print(f"{'modo':<16}{'linhas/s':>14}{'p50 (ms)':>12}{'p99 (ms)':>12}{'média/lote':>14}")
+
+    r = medir(individual, item)
+    print(f"{'individual':<16}{r['linhas_s']:>14.0f}{r['p50']:>12.2f}{r['p99']:>12.2f}{1:>14.1f}")
+
+    for tamanho in (int(t) for t in args.lotes.split(",")):
+        gravador = GravadorEmLote(tamanho_maximo=tamanho, janela_ms=args.janela_ms)
+        r = medir(em_lote(gravador), item)
+        media = gravador.estatisticas()["media_por_lote"]
+        gravador.encerrar()
+        print(f"{f'lote {tamanho}':<16}{r['linhas_s']:>14.0f}{r['p50']:>12.2f}{r['p99']:>12.2f}{media:>14.1f}")
@@ -0,0 +1,146 @@
+"""
+Benchmark das Listagens (leileiamor)
+Compara, para a listagem de transações, o caminho ORM (entidades +
+validação from_attributes do response_model + serialização) com a projeção
+Core de app/core/projecao.py (linhas simples serializadas direto):
+  - linhas por segundo (consulta + serialização + json)
+  - pico de memória alocada por 10 mil linhas (tracemalloc)
+
+Uso:
+    python benchmarks/listagens.py                       # SQLite em memória, 10k linhas
+    python benchmarks/listagens.py -n 50000 --url postgresql://...
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import List
+
+parser = argparse.ArgumentParser(description="Benchmark das listagens: ORM x projeção Core")
+parser.add_argument("--url", default="sqlite://", help="DATABASE_URL (padrão: SQLite em memória)")
+parser.add_argument("-n", "--linhas", type=int, default=10000)
+parser.add_argument("-r", "--rodadas", type=int, default=5)
+args = parser.parse_args()
+
+# O engine do app lê DATABASE_URL no import
+os.environ["DATABASE_URL"] = args.url
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "leileiamor"))
+
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+import app.core.database as database  # noqa: E402
+from app.core.database import Base  # noqa: E402
+from app.core.projecao import PROJECAO_TRANSACAO  # noqa: E402
+from app.models import Usuario, Conta, Categoria, Transacao  # noqa: E402
+from app.schemas.schemas import TransacaoResponse  # noqa: E402
+
+# SQLite em memória: uma única conexão compartilhada (senão cada sessão veria um banco vazio)
+if args.url == "sqlite://":
+    database.engine = database.create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    database.SessionLocal.configure(bind=database.engine)
+
+ADAPTADOR = TypeAdapter(List[TransacaoResponse])
+
+
+def preparar() -> int:
+    Base.metadata.create_all(database.engine)
+    db = database.SessionLocal()
+    try:
+        usuario = Usuario(nome="Bench", email=f"bench{time.time_ns()}@example.com", senha="x")
+        db.add(usuario)
+        db.flush()
+        conta = Conta(nome="Bench", saldo=Decimal("0.00"), tipo="corrente", id_usuario=usuario.id_usuario)
+        categoria = Categoria(nome="Bench", tipo="despesa", id_usuario=usuario.id_usuario)
+        db.add_all([conta, categoria])
+        db.flush()
+        inicio = date(2020, 1, 1)
+        db.execute(
+            Transacao.__table__.insert(),
+            [
+                {
+                    "valor": Decimal(i % 5000) / 100 + 1,
+                    "data": inicio + timedelta(days=i % 1500),
+                    "descricao": f"Transação {i}",
+                    "tipo": "despesa",
+                    "id_usuario": usuario.id_usuario,
+                    "id_conta": conta.id_conta,
+                    "id_categoria": categoria.id_categoria,
+                }
+                for i in range(args.linhas)
+            ],
+        )
+        db.commit()
+        return usuario.id_usuario
+    finally:
+        db.close()
+
+
+def caminho_orm(id_usuario: int) -> bytes:
+    """O que a rota fazia: entidades ORM -> response_model -> JSON"""
+    db = database.SessionLocal()
+    try:
+        transacoes = db.query(Transacao).filter(
+            Transacao.id_usuario == id_usuario
+        ).order_by(Transacao.data.desc()).limit(args.linhas).all()
+        validadas = ADAPTADOR.validate_python(transacoes, from_attributes=True)
+        return json.dumps(ADAPTADOR.dump_python(validadas, mode="json")).encode()
+    finally:
+        db.close()
+
+
+def caminho_projecao(id_usuario: int) -> bytes:
+    """Projeção Core: só as colunas da resposta, serializadas direto"""
+    db = database.SessionLocal()
+    try:
+        stmt = PROJECAO_TRANSACAO.select().where(
+            Transacao.id_usuario == id_usuario
+        ).order_by(Transacao.data.desc()).limit(args.linhas)
+        return json.dumps(PROJECAO_TRANSACAO.serializar(db.execute(stmt))).encode()
+    finally:
+        db.close()
+
+
+def medir(caminho, id_usuario: int) -> dict:
+    caminho(id_usuario)  # aquecimento (cache de compilação)
+
+    melhor = min(_cronometrar(caminho, id_usuario) for _ in range(args.rodadas))
+
+    tracemalloc.start()
+    caminho(id_usuario)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "linhas_s": args.linhas / melhor,
+        "ms": melhor * 1000,
+        "mb_10k": pico / 1024 / 1024 * 10000 / args.linhas,
+    }
+
+
+def _cronometrar(caminho, id_usuario: int) -> float:
+    inicio = time.perf_counter()
+    caminho(id_usuario)
+    return time.perf_counter() - inicio
+
+
+if __name__ == "__main__":
+    id_usuario = preparar()
+
+    # Os dois caminhos precisam produzir exatamente o mesmo JSON
+    assert caminho_orm(id_usuario) == caminho_projecao(id_usuario), "respostas diferentes"
+
+    print("=" * 64)
+    print(f"LISTAGEM DE TRANSAÇÕES ({database.engine.url.get_backend_name()}, {args.linhas} linhas)")
+    print("=" * 64)
+    print(f"{'caminho':<12}{'linhas/s':>14}{'ms':>12}{'MB/10k linhas':>18}")
+
+    for nome, caminho in (("orm", caminho_orm), ("projeção", caminho_projecao)):
+        r = medir(caminho, id_usuario)
+        print(f"{nome:<12}{r['linhas_s']:>14.0f}{r['ms']:>12.1f}{r['mb_10k']:>18.2f}")
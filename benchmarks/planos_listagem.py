@@ -0,0 +1,160 @@
+"""
+Verificação dos Planos da Listagem de Transações (leileiamor)
+Chama list_transacoes com cada combinação de filtros e ordenação, captura
+o SQL que a rota executa (listagem e contagem) e roda EXPLAIN nele:
+  - PostgreSQL: EXPLAIN (FORMAT JSON), falha se houver Seq Scan em transacao
+  - SQLite:     EXPLAIN QUERY PLAN, falha se houver SCAN transacao sem índice
+Sai com código 1 se alguma combinação não usar índice.
+
+Uso:
+    python benchmarks/planos_listagem.py                       # SQLite em arquivo temporário
+    python benchmarks/planos_listagem.py --url postgresql://... -u 50 -n 2000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+parser = argparse.ArgumentParser(description="Verifica os índices usados pela listagem de transações")
+parser.add_argument("--url", default=None, help="DATABASE_URL (padrão: SQLite temporário)")
+parser.add_argument("-u", "--usuarios", type=int, default=20)
+parser.add_argument("-n", "--por-usuario", type=int, default=2000, help="Transações por usuário")
+args = parser.parse_args()
+
+# O engine do app lê DATABASE_URL no import
+os.environ["DATABASE_URL"] = args.url or f"sqlite:///{tempfile.mkdtemp()}/planos.db"
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "leileiamor"))
+
+from sqlalchemy import event  # noqa: E402
+
+import app.core.database as database  # noqa: E402
+from app.core.migracao import criar_tabelas  # noqa: E402
+from app.core.projecao import PROJECAO_TRANSACAO  # noqa: E402
+from app.models import Usuario, Conta, Categoria, Transacao  # noqa: E402
+from app.routers.transacoes import list_transacoes  # noqa: E402
+
+HOJE = date(2025, 6, 30)
+
+COMBINACOES = [
+    {},
+    {"data_inicio": HOJE - timedelta(days=30)},
+    {"data_inicio": HOJE - timedelta(days=90), "data_fim": HOJE - timedelta(days=60)},
+    {"valor_min": Decimal("500")},
+    {"valor_min": Decimal("100"), "valor_max": Decimal("120")},
+    {"data_inicio": HOJE - timedelta(days=30), "valor_min": Decimal("500")},
+    {"tipo": "despesa", "data_inicio": HOJE - timedelta(days=30)},
+    {"id_conta": 1, "valor_min": Decimal("500")},
+]
+
+
+def preparar() -> Usuario:
+    criar_tabelas()
+    db = database.SessionLocal()
+    try:
+        alvo = None
+        for u in range(args.usuarios):
+            usuario = Usuario(nome=f"Plano {u}", email=f"plano{u}.{time.time_ns()}@example.com", senha="x")
+            db.add(usuario)
+            db.flush()
+            conta = Conta(nome="Plano", saldo=Decimal("0.00"), tipo="corrente", id_usuario=usuario.id_usuario)
+            categoria = Categoria(nome="Plano", tipo="despesa", id_usuario=usuario.id_usuario)
+            db.add_all([conta, categoria])
+            db.flush()
+            db.execute(
+                Transacao.__table__.insert(),
+                [
+                    {
+                        "valor": Decimal((i * 7919) % 100000) / 100,
+                        "data": HOJE - timedelta(days=i % 730),
+                        "descricao": f"Transação {i}",
+                        "tipo": "despesa" if i % 3 else "receita",
+                        "id_usuario": usuario.id_usuario,
+                        "id_conta": conta.id_conta,
+                        "id_categoria": categoria.id_categoria,
+                    }
+                    for i in range(args.por_usuario)
+                ],
+            )
+            alvo = alvo or usuario
+        db.commit()
+
+        # Estatísticas atualizadas para o planner
+        with database.engine.begin() as conexao:
+            conexao.exec_driver_sql("ANALYZE")
+        db.refresh(alvo)
+        db.expunge(alvo)
+        return alvo
+    finally:
+        db.close()
+
+
+def explicar(conexao, sql: str, parametros) -> tuple:
+    """Retorna (plano legível, usa_varredura_completa)"""
+    if conexao.dialect.name == "postgresql":
+        plano = conexao.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}", parametros).scalar()
+        plano = json.loads(plano) if isinstance(plano, str) else plano
+        nos, pendentes = [], [plano[0]["Plan"]]
+        while pendentes:
+            no = pendentes.pop()
+            nos.append(no)
+            pendentes.extend(no.get("Plans", []))
+        descricao = [f"{n['Node Type']} {n.get('Index Name') or n.get('Relation Name') or ''}".strip() for n in nos]
+        completa = any(n["Node Type"] == "Seq Scan" and n.get("Relation Name") == "transacao" for n in nos)
+        return "; ".join(descricao), completa
+
+    linhas = conexao.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", parametros).all()
+    detalhes = [linha[-1] for linha in linhas]
+    completa = any(d.startswith("SCAN transacao") and "INDEX" not in d for d in detalhes)
+    return "; ".join(detalhes), completa
+
+
+if __name__ == "__main__":
+    usuario = preparar()
+
+    capturadas = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        if "FROM transacao" in statement and not statement.startswith("EXPLAIN"):
+            capturadas.append((statement, parameters))
+
+    for engine in database.ENGINES:
+        event.listen(engine, "before_cursor_execute", capturar)
+
+    print("=" * 96)
+    print(f"PLANOS DA LISTAGEM ({database.engine.url.get_backend_name()}, "
+          f"{args.usuarios} usuários x {args.por_usuario} transações)")
+    print("=" * 96)
+
+    falhas = 0
+    for filtros in COMBINACOES:
+        for ordenar in ("data", "valor"):
+            capturadas.clear()
+            db = database.SessionLocal()
+            try:
+                parametros = {
+                    "skip": 0, "limit": 50, "tipo": None, "id_conta": None, "id_categoria": None,
+                    "data_inicio": None, "data_fim": None, "valor_min": None, "valor_max": None,
+                    **filtros,
+                }
+                list_transacoes(**parametros, ordenar=ordenar, projecao=PROJECAO_TRANSACAO, ids=None, db=db, current_user=usuario)
+                consultas = list(capturadas)
+                with database.engine_leitura.connect() as conexao:
+                    for sql, valores in consultas:
+                        plano, completa = explicar(conexao, sql, valores)
+                        tipo_consulta = "contagem" if "count(" in sql.lower() else "listagem"
+                        rotulo = ", ".join(f"{k}={v}" for k, v in filtros.items()) or "sem filtros"
+                        print(f"{'❌' if completa else '✅'} {rotulo} | ordenar={ordenar} | {tipo_consulta}")
+                        print(f"     {plano}")
+                        falhas += completa
+            finally:
+                db.close()
+
+    print("=" * 96)
+    if falhas:
+        print(f"❌ {falhas} consulta(s) com varredura completa de transacao")
+        sys.exit(1)
+    print("✅ Todas as combinações usam índice")
@@ -0,0 +1,86 @@
+"""
+Microbenchmark das Consultas dos Repositórios (bb)
+Compara, por chamada, a query montada a cada vez (db.query(...).filter(...))
+com as consultas pré-construídas de bb/repositories.py:
+  - montagem: construir a query e gerar a chave do cache de compilação
+    (o que o SQLAlchemy faz antes de cada execução)
+  - execução: montar + executar + carregar o resultado
+
+Uso:
+    python benchmarks/repositorios.py                       # SQLite em memória
+    python benchmarks/repositorios.py --url postgresql://...
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bb"))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from database import Base  # noqa: E402
+from models import Usuario, Conta  # noqa: E402
+from repositories import CONTA_POR_ID, CONTAS_POR_USUARIO, USUARIO_POR_EMAIL  # noqa: E402
+
+
+def preparar(url: str):
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    if not db.query(Usuario).count():
+        db.add(Usuario(nome="Bench", email="bench@email.com", senha="x"))
+        db.flush()
+        db.add_all([Conta(nome=f"Conta {i}", saldo=100, tipo="corrente", id_usuario=1) for i in range(10)])
+        db.commit()
+    return engine, db
+
+
+def medir(funcao, repeticoes: int) -> float:
+    """Melhor tempo por chamada (µs) em 5 rodadas"""
+    return min(timeit.repeat(funcao, number=repeticoes, repeat=5)) / repeticoes * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Microbenchmark das consultas dos repositórios")
+    parser.add_argument("--url", default="sqlite://")
+    parser.add_argument("-n", "--repeticoes", type=int, default=2000)
+    args = parser.parse_args()
+
+    engine, db = preparar(args.url)
+
+    casos = {
+        "conta por id": (
+            lambda: db.query(Conta).filter(Conta.id_conta == 1).first(),
+            lambda: db.execute(CONTA_POR_ID, {"id_conta": 1}).scalar(),
+            lambda: db.query(Conta).filter(Conta.id_conta == 1).limit(1).statement._generate_cache_key(),
+            lambda: CONTA_POR_ID._generate_cache_key(),
+        ),
+        "contas por usuário": (
+            lambda: db.query(Conta).filter(Conta.id_usuario == 1).all(),
+            lambda: db.execute(CONTAS_POR_USUARIO, {"id_usuario": 1}).scalars().all(),
+            lambda: db.query(Conta).filter(Conta.id_usuario == 1).statement._generate_cache_key(),
+            lambda: CONTAS_POR_USUARIO._generate_cache_key(),
+        ),
+        "usuário por email": (
+            lambda: db.query(Usuario).filter(Usuario.email == "bench@email.com").first(),
+            lambda: db.execute(USUARIO_POR_EMAIL, {"email": "bench@email.com"}).scalar(),
+            lambda: db.query(Usuario).filter(Usuario.email == "bench@email.com").limit(1).statement._generate_cache_key(),
+            lambda: USUARIO_POR_EMAIL._generate_cache_key(),
+        ),
+    }
+
+    print("=" * 78)
+    print(f"MICROBENCHMARK DAS CONSULTAS ({engine.url.get_backend_name()}, µs por chamada)")
+    print("=" * 78)
+    print(f"{'consulta':<22}{'montar orm':>14}{'montar pré':>14}{'exec orm':>14}{'exec pré':>14}")
+
+    for nome, (exec_orm, exec_pre, montar_orm, montar_pre) in casos.items():
+        print(
+            f"{nome:<22}"
+            f"{medir(montar_orm, args.repeticoes):>14.1f}{medir(montar_pre, args.repeticoes):>14.1f}"
+            f"{medir(exec_orm, args.repeticoes):>14.1f}{medir(exec_pre, args.repeticoes):>14.1f}"
+        )
+
+    db.close()
@@ -0,0 +1,95 @@
+"""
+Benchmark de Inicialização
+Mede, em um interpretador novo a cada rodada, o tempo de import do módulo
+principal de cada app e o tempo até a primeira resposta (GET de health)
+
+Uso:
+    python benchmarks/startup.py                 # bb e leileiamor, 5 rodadas
+    python benchmarks/startup.py leileiamor -n 10
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Diretório de cada app e a rota usada como "primeira requisição"
+APPS = {
+    "bb": "/api/health",
+    "leileiamor": "/health",
+}
+
+# Executado dentro do subprocesso: imprime os tempos em JSON
+SCRIPT = """
+import json, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    t2 = time.perf_counter()
+    resposta = client.get({rota!r})
+    t3 = time.perf_counter()
+print(json.dumps({{
+    "import": t1 - t0,
+    "startup": t2 - t1,
+    "primeira_requisicao": t3 - t2,
+    "status": resposta.status_code,
+}}))
+"""
+
+
+def medir(app: str, rodadas: int) -> dict:
+    """Executa as rodadas do app e retorna as medianas (em ms)"""
+    amostras = {"total": [], "import": [], "startup": [], "primeira_requisicao": []}
+
+    for _ in range(rodadas):
+        inicio = time.perf_counter()
+        processo = subprocess.run(
+            [sys.executable, "-c", SCRIPT.format(rota=APPS[app])],
+            cwd=os.path.join(RAIZ, app),
+            capture_output=True,
+            text=True,
+        )
+        total = time.perf_counter() - inicio
+
+        if processo.returncode != 0:
+            raise RuntimeError(f"{app}: falha ao iniciar\n{processo.stderr}")
+
+        tempos = json.loads(processo.stdout.strip().splitlines()[-1])
+        if tempos["status"] != 200:
+            raise RuntimeError(f"{app}: health retornou {tempos['status']}")
+
+        amostras["total"].append(total)
+        for chave in ("import", "startup", "primeira_requisicao"):
+            amostras[chave].append(tempos[chave])
+
+    return {chave: statistics.median(valores) * 1000 for chave, valores in amostras.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de inicialização das APIs")
+    parser.add_argument("apps", nargs="*", help=f"Apps a medir (padrão: {', '.join(APPS)})")
+    parser.add_argument("-n", "--rodadas", type=int, default=5)
+    args = parser.parse_args()
+
+    args.apps = args.apps or list(APPS)
+    desconhecidos = [app for app in args.apps if app not in APPS]
+    if desconhecidos:
+        parser.error(f"apps desconhecidos: {', '.join(desconhecidos)}")
+
+    print("=" * 70)
+    print(f"BENCHMARK DE INICIALIZAÇÃO ({args.rodadas} rodadas, mediana em ms)")
+    print("=" * 70)
+    print(f"{'app':<12}{'import':>12}{'startup':>12}{'1ª req':>12}{'processo':>12}")
+
+    for app in args.apps:
+        r = medir(app, args.rodadas)
+        print(
+            f"{app:<12}{r['import']:>12.1f}{r['startup']:>12.1f}"
+            f"{r['primeira_requisicao']:>12.1f}{r['total']:>12.1f}"
+        )
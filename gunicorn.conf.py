@@ -0,0 +1,65 @@
+"""
+Configuração de Produção (gunicorn + workers uvicorn)
+
+Uso (a partir do diretório do app):
+    gunicorn -c gunicorn.conf.py main:app                 # raiz / docker
+    cd bb && gunicorn -c ../gunicorn.conf.py main:app
+    cd leileiamor && gunicorn -c ../gunicorn.conf.py main:app
+
+Variáveis de ambiente:
+    PORT               porta (padrão 8000)
+    WEB_CONCURRENCY    número de workers (padrão: CPUs disponíveis, mínimo 2)
+    GRACEFUL_TIMEOUT   segundos para drenar requisições no shutdown (padrão 30)
+"""
+import gc
+import os
+
+
+def cpus_disponiveis() -> int:
+    """
+    CPUs realmente disponíveis para o processo
+    Considera a afinidade e a cota do cgroup (limite de CPU do container)
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as arquivo:
+            cota, periodo = arquivo.read().split()
+        if cota != "max":
+            cpus = min(cpus, max(1, int(int(cota) / int(periodo))))
+    except (OSError, ValueError):
+        pass
+
+    return cpus
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", max(2, cpus_disponiveis())))
+
+# Carrega o app uma vez no master: os workers compartilham a memória (copy-on-write).
+# Os engines do SQLAlchemy descartam o pool herdado no fork (os.register_at_fork
+# em database.py), então nenhuma conexão é compartilhada entre processos.
+preload_app = True
+
+# Shutdown gracioso: requisições em andamento terminam e o evento de shutdown
+# do app fecha as conexões do pool
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = 60
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    """
+    Executado no master depois do preload e antes de criar os workers
+    Congela os objetos da inicialização: o GC dos workers não os percorre
+    e não suja as páginas compartilhadas (preserva o copy-on-write)
+    """
+    gc.freeze()
+    server.log.info(f"{gc.get_freeze_count()} objetos congelados; iniciando {workers} workers")
@@ -0,0 +1,152 @@
+"""
+Módulo de Controle de Admissão
+Limita a concorrência por grupo de rotas com fila limitada e timeout:
+rotas caras (relatórios, listagens, seed/limpeza) não esgotam o pool do
+banco nem atrasam as rotas baratas como /auth/login
+"""
+import asyncio
+import json
+import os
+from typing import Optional
+
+# Regras (método, prefixo do caminho) -> grupo; a primeira que casar vence.
+# Grupo None: fora do controle (conexões longas ocupariam a vaga para sempre)
+REGRAS = [
+    ("GET", "/eventos", None),
+    ("POST", "/seed", "utilitarios"),
+    ("DELETE", "/limpar-dados", "utilitarios"),
+    ("GET", "/relatorios", "pesadas"),
+    ("GET", "/transacoes", "pesadas"),
+    ("GET", "/contas/", "pesadas"),  # /contas/{id}/previsao
+]
+
+# (concorrência, tamanho da fila, segundos de espera na fila) por grupo
+LIMITES = {
+    "utilitarios": (
+        int(os.getenv("ADMISSAO_UTILITARIOS_LIMITE", "1")),
+        int(os.getenv("ADMISSAO_UTILITARIOS_FILA", "0")),
+        float(os.getenv("ADMISSAO_UTILITARIOS_TIMEOUT", "1")),
+    ),
+    "pesadas": (
+        int(os.getenv("ADMISSAO_PESADAS_LIMITE", "4")),
+        int(os.getenv("ADMISSAO_PESADAS_FILA", "16")),
+        float(os.getenv("ADMISSAO_PESADAS_TIMEOUT", "2")),
+    ),
+    "padrao": (
+        int(os.getenv("ADMISSAO_PADRAO_LIMITE", "64")),
+        int(os.getenv("ADMISSAO_PADRAO_FILA", "256")),
+        float(os.getenv("ADMISSAO_PADRAO_TIMEOUT", "5")),
+    ),
+}
+
+
+class GrupoAdmissao:
+    """Semáforo com fila limitada e métricas para um grupo de rotas"""
+
+    def __init__(self, nome: str, limite: int, fila: int, timeout: float):
+        self.nome = nome
+        self.limite = limite
+        self.fila = fila
+        self.timeout = timeout
+        self._semaforo = asyncio.Semaphore(limite)
+        self.em_execucao = 0
+        self.na_fila = 0
+        self.admitidas = 0
+        self.rejeitadas = 0
+
+    async def entrar(self) -> bool:
+        """Tenta admitir a requisição; False se a fila estiver cheia ou o tempo esgotar"""
+        if not self._semaforo.locked():
+            # Vaga livre: adquire sem passar pela fila
+            await self._semaforo.acquire()
+        elif self.na_fila >= self.fila:
+            self.rejeitadas += 1
+            return False
+        else:
+            self.na_fila += 1
+            try:
+                await asyncio.wait_for(self._semaforo.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                self.rejeitadas += 1
+                return False
+            finally:
+                self.na_fila -= 1
+
+        self.em_execucao += 1
+        self.admitidas += 1
+        return True
+
+    def sair(self) -> None:
+        self.em_execucao -= 1
+        self._semaforo.release()
+
+    def to_dict(self) -> dict:
+        return {
+            "limite": self.limite,
+            "fila_maxima": self.fila,
+            "timeout_fila": self.timeout,
+            "em_execucao": self.em_execucao,
+            "na_fila": self.na_fila,
+            "admitidas": self.admitidas,
+            "rejeitadas": self.rejeitadas,
+        }
+
+
+grupos = {nome: GrupoAdmissao(nome, *limites) for nome, limites in LIMITES.items()}
+
+
+def grupo_da_rota(metodo: str, caminho: str) -> Optional[GrupoAdmissao]:
+    for metodo_regra, prefixo, nome in REGRAS:
+        if metodo == metodo_regra and caminho.startswith(prefixo):
+            return grupos.get(nome)
+    return grupos["padrao"]
+
+
+def estatisticas_admissao() -> dict:
+    """Profundidade de fila e contadores de rejeição por grupo"""
+    return {nome: grupo.to_dict() for nome, grupo in grupos.items()}
+
+
+class AdmissaoMiddleware:
+    """
+    Middleware ASGI de controle de admissão
+    Fila cheia (ou espera esgotada) responde 503 com Retry-After
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        grupo = grupo_da_rota(scope["method"], scope["path"])
+        if grupo is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await grupo.entrar():
+            await self._rejeitar(grupo, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            grupo.sair()
+
+    @staticmethod
+    async def _rejeitar(grupo: GrupoAdmissao, send) -> None:
+        corpo = json.dumps({
+            "detail": f"Serviço sobrecarregado: limite de requisições simultâneas atingido ({grupo.nome})"
+        }).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(corpo)).encode()),
+                (b"retry-after", str(max(1, round(grupo.timeout))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": corpo})
@@ -0,0 +1,140 @@
+"""
+Perfil SQLite (instalação de um servidor só, sem PostgreSQL)
+Ativado quando DATABASE_URL aponta para um arquivo SQLite:
+  - WAL: leitores não bloqueiam o escritor nem o contrário
+  - PRAGMAs ajustados: synchronous, cache_size, mmap_size, busy_timeout,
+    foreign_keys (as FKs passam a valer como no PostgreSQL)
+  - um engine de escrita com uma única conexão (as escritas do processo
+    esperam na fila do pool em vez de disputar o lock do arquivo) e um
+    pool de leitura com conexões somente leitura
+  - SessaoRoteada: cada sessão lê pelo pool de leitura e, a partir da
+    primeira escrita, fica na conexão de escrita até o fim da transação
+
+Com vários workers (gunicorn) cada processo tem o seu escritor; entre
+processos quem serializa é o lock do SQLite (busy_timeout).
+SQLite em memória mantém o engine único de antes.
+"""
+import os
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
+
+# Liga/desliga o perfil (0 = engine único sem PRAGMAs, o comportamento anterior)
+SQLITE_OTIMIZADO = os.getenv("SQLITE_OTIMIZADO", "1") == "1"
+
+# Conexões do pool de leitura (mais SQLITE_LEITORES_EXTRAS sob pico)
+SQLITE_LEITORES = int(os.getenv("SQLITE_LEITORES", "8"))
+SQLITE_LEITORES_EXTRAS = int(os.getenv("SQLITE_LEITORES_EXTRAS", "16"))
+
+# Espera pelo lock do arquivo (ms) e pela conexão de escrita (s)
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_ESPERA_ESCRITA = float(os.getenv("SQLITE_ESPERA_ESCRITA", "30"))
+
+# Aplicados em toda conexão nova. Em WAL, synchronous=NORMAL não corrompe o
+# banco numa queda de energia; no máximo perde os últimos commits
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "foreign_keys": "ON",
+    "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),  # negativo = KiB (64 MB)
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "temp_store": "MEMORY",
+}
+
+
+def usar_perfil_sqlite(url: str) -> bool:
+    """True para SQLite em arquivo com o perfil ligado"""
+    url = make_url(url)
+    return (
+        SQLITE_OTIMIZADO
+        and url.get_backend_name() == "sqlite"
+        and url.database not in (None, "", ":memory:")
+    )
+
+
+def _aplicar_pragmas(somente_leitura: bool):
+    def ao_conectar(conexao_dbapi, registro):
+        cursor = conexao_dbapi.cursor()
+        try:
+            for nome, valor in PRAGMAS.items():
+                cursor.execute(f"PRAGMA {nome}={valor}")
+            if somente_leitura:
+                # Uma escrita roteada por engano falha em vez de disputar o lock
+                cursor.execute("PRAGMA query_only=ON")
+        finally:
+            cursor.close()
+    return ao_conectar
+
+
+def criar_engines(url: str):
+    """
+    Cria os engines do perfil
+
+    Returns:
+        tuple: (engine de escrita, engine de leitura)
+    """
+    connect_args = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+
+    escrita = create_engine(
+        url,
+        connect_args=connect_args,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=SQLITE_ESPERA_ESCRITA,
+    )
+    leitura = create_engine(
+        url,
+        connect_args=connect_args,
+        pool_size=SQLITE_LEITORES,
+        max_overflow=SQLITE_LEITORES_EXTRAS,
+    )
+
+    event.listen(escrita, "connect", _aplicar_pragmas(somente_leitura=False))
+    event.listen(leitura, "connect", _aplicar_pragmas(somente_leitura=True))
+
+    # Ativa o WAL já (journal_mode é persistente no arquivo): a primeira
+    # conexão de leitura não pode fazer essa troca por causa do query_only
+    with escrita.connect():
+        pass
+
+    return escrita, leitura
+
+
+def _eh_escrita(clause) -> bool:
+    """INSERT/UPDATE/DELETE (Core ou ORM) e SQL textual que não seja SELECT"""
+    if isinstance(clause, UpdateBase):
+        return True
+    if isinstance(clause, TextClause):
+        return not clause.text.lstrip()[:7].upper().startswith(("SELECT", "EXPLAIN"))
+    return False
+
+
+class SessaoRoteada(Session):
+    """
+    Sessão que escolhe o engine por instrução
+    Leituras vão para o pool de leitura até a primeira escrita (flush ou
+    DML); dali até o commit/rollback tudo vai para a conexão de escrita,
+    para a transação enxergar o que ela mesma gravou (flush + refresh)
+    """
+
+    def __init__(self, escrita, leitura, **kwargs):
+        kwargs["bind"] = escrita
+        super().__init__(**kwargs)
+        self.engine_escrita = escrita
+        self.engine_leitura = leitura
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.info.get("escrevendo") or self._flushing or _eh_escrita(clause):
+            self.info["escrevendo"] = True
+            return self.engine_escrita
+        return self.engine_leitura
+
+
+@event.listens_for(SessaoRoteada, "after_transaction_end")
+def _liberar_escrita(sessao, transacao):
+    # Fim da transação externa: a próxima volta a ler pelo pool de leitura
+    if transacao.parent is None:
+        sessao.info.pop("escrevendo", None)
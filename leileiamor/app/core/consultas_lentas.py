@@ -0,0 +1,155 @@
+"""
+Módulo de Log de Consultas Lentas
+Hooks before/after_cursor_execute no engine: toda instrução acima de
+CONSULTA_LENTA_MS vai para o logger "app.consultas_lentas" em uma linha
+JSON com o SQL normalizado, os parâmetros (strings mascaradas), a duração
+e a rota de origem.
+
+Na primeira ocorrência de cada formato de instrução o plano também é
+capturado (CONSULTA_LENTA_EXPLAIN=1, padrão):
+  - PostgreSQL: EXPLAIN (ANALYZE, BUFFERS) para SELECT; EXPLAIN simples
+    para o resto (ANALYZE executaria uma escrita de novo)
+  - SQLite: EXPLAIN QUERY PLAN
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import event
+
+from app.core.cronometro import rota_atual
+
+# Limite (ms) a partir do qual a instrução é registrada; negativo desliga
+CONSULTA_LENTA_MS = float(os.getenv("CONSULTA_LENTA_MS", "500"))
+
+# Captura o plano na primeira ocorrência de cada formato
+CONSULTA_LENTA_EXPLAIN = os.getenv("CONSULTA_LENTA_EXPLAIN", "1") == "1"
+
+# Quantidade máxima de formatos lembrados (evita crescimento sem limite)
+MAX_FORMATOS = 1000
+
+logger = logging.getLogger("app.consultas_lentas")
+
+_formatos_explicados = set()
+_formatos_lock = threading.Lock()
+
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LISTA = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ESPACOS = re.compile(r"\s+")
+
+
+def normalizar_sql(statement: str) -> str:
+    """Formato da instrução: literais e placeholders viram ?, listas IN viram (?...)"""
+    sql = _PLACEHOLDER.sub("?", statement)
+    sql = _STRING.sub("?", sql)
+    sql = _NUMERO.sub("?", sql)
+    sql = _LISTA.sub("(?...)", sql)
+    return _ESPACOS.sub(" ", sql).strip()
+
+
+def _mascarar(valor):
+    if valor is None or isinstance(valor, (bool, int, float, Decimal)):
+        return valor
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return "***"
+
+
+def mascarar_parametros(parameters, executemany: bool):
+    """Mantém números e datas (ids, limites, períodos); mascara o resto"""
+    if executemany:
+        return {"linhas": len(parameters)}
+    if isinstance(parameters, dict):
+        return {chave: _mascarar(valor) for chave, valor in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [_mascarar(valor) for valor in parameters]
+    return None
+
+
+def _primeira_ocorrencia(formato: str) -> bool:
+    chave = hashlib.sha1(formato.encode()).hexdigest()
+    with _formatos_lock:
+        if chave in _formatos_explicados or len(_formatos_explicados) >= MAX_FORMATOS:
+            return False
+        _formatos_explicados.add(chave)
+        return True
+
+
+def capturar_plano(conn, statement: str, parameters) -> list:
+    """
+    Executa o EXPLAIN da instrução em um cursor novo da mesma conexão
+    (mesma transação; no PostgreSQL dentro de um SAVEPOINT, para que uma
+    falha no EXPLAIN não aborte a transação da requisição)
+    """
+    dialeto = conn.dialect.name
+    if dialeto == "postgresql":
+        # Só SELECT é executado de novo pelo ANALYZE (um WITH pode conter escrita)
+        if statement.lstrip().upper().startswith("SELECT"):
+            prefixo = "EXPLAIN (ANALYZE, BUFFERS) "
+        else:
+            prefixo = "EXPLAIN "
+    elif dialeto == "sqlite":
+        prefixo = "EXPLAIN QUERY PLAN "
+    else:
+        return []
+
+    cursor = conn.connection.cursor()
+    try:
+        if dialeto == "postgresql":
+            cursor.execute("SAVEPOINT plano_consulta_lenta")
+        try:
+            cursor.execute(prefixo + statement, parameters)
+            plano = [" | ".join(str(coluna) for coluna in linha) for linha in cursor.fetchall()]
+        except Exception as e:
+            if dialeto == "postgresql":
+                cursor.execute("ROLLBACK TO SAVEPOINT plano_consulta_lenta")
+            return [f"EXPLAIN falhou: {e}"]
+        if dialeto == "postgresql":
+            cursor.execute("RELEASE SAVEPOINT plano_consulta_lenta")
+        return plano
+    finally:
+        cursor.close()
+
+
+def _antes_cursor(conn, cursor, statement, parameters, context, executemany):
+    conn.info["consulta_inicio"] = time.perf_counter()
+
+
+def _depois_cursor(conn, cursor, statement, parameters, context, executemany):
+    inicio = conn.info.pop("consulta_inicio", None)
+    if inicio is None:
+        return
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    if duracao_ms < CONSULTA_LENTA_MS:
+        return
+
+    formato = normalizar_sql(statement)
+    registro = {
+        "duracao_ms": round(duracao_ms, 3),
+        "rota": rota_atual(),
+        "sql": formato,
+        "parametros": mascarar_parametros(parameters, executemany),
+    }
+    if CONSULTA_LENTA_EXPLAIN and not executemany and _primeira_ocorrencia(formato):
+        try:
+            registro["plano"] = capturar_plano(conn, statement, parameters)
+        except Exception as e:
+            registro["plano"] = [f"EXPLAIN falhou: {e}"]
+
+    logger.warning(json.dumps(registro, default=str))
+
+
+def registrar_consultas_lentas(engine) -> None:
+    """Instala os hooks de consulta lenta no engine (no-op se desligado)"""
+    if CONSULTA_LENTA_MS < 0:
+        return
+    event.listen(engine, "before_cursor_execute", _antes_cursor)
+    event.listen(engine, "after_cursor_execute", _depois_cursor)
@@ -0,0 +1,92 @@
+"""
+Módulo de Contagem (total das listagens paginadas)
+O total de transações do usuário fica em contagem_transacoes, atualizado
+pelas rotas de escrita na mesma transação da inserção/remoção: a listagem
+sem filtros lê uma linha em vez de fazer COUNT(*).
+
+Com filtros (ou antes do contador existir) conta até LIMITE_CONTAGEM_EXATA
+linhas: abaixo disso o total é exato; acima vira estimativa (linhas
+previstas pelo planner no PostgreSQL; nos outros bancos, o próprio limite).
+"""
+import json
+import os
+from typing import Tuple
+
+from sqlalchemy import func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.contagem import ContagemTransacoes
+from app.models.transacao import Transacao
+
+# Até quantas linhas o total é contado exatamente
+LIMITE_CONTAGEM_EXATA = int(os.getenv("LIMITE_CONTAGEM_EXATA", "1000"))
+
+_CONTAGEM = ContagemTransacoes.__table__
+
+
+def _contar_tudo(id_usuario: int):
+    return select(literal(id_usuario), func.count()).where(Transacao.id_usuario == id_usuario)
+
+
+def ajustar_contagem(db: Session, id_usuario: int, variacao: int) -> None:
+    """
+    Soma `variacao` ao total do usuário, na transação da escrita
+    Chamar depois de adicionar/remover as transações e antes do commit
+    """
+    db.flush()
+    atualizadas = db.execute(
+        update(_CONTAGEM)
+        .where(_CONTAGEM.c.id_usuario == id_usuario)
+        .values(total=_CONTAGEM.c.total + variacao)
+    ).rowcount
+    if atualizadas:
+        return
+
+    # Primeira escrita do usuário sem contador: conta uma vez (o COUNT já
+    # enxerga as linhas desta transação, então a variação não é somada)
+    try:
+        with db.begin_nested():
+            db.execute(insert(_CONTAGEM).from_select(["id_usuario", "total"], _contar_tudo(id_usuario)))
+    except IntegrityError:
+        # Outra requisição criou o contador antes; a contagem dela não via estas linhas
+        db.execute(
+            update(_CONTAGEM)
+            .where(_CONTAGEM.c.id_usuario == id_usuario)
+            .values(total=_CONTAGEM.c.total + variacao)
+        )
+
+
+def _estimar(db: Session, consulta) -> int:
+    """Linhas previstas pelo planner (PostgreSQL); nos outros bancos, o limite"""
+    if db.get_bind().dialect.name != "postgresql":
+        return LIMITE_CONTAGEM_EXATA + 1
+
+    sql = consulta.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True})
+    plano = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()
+    if isinstance(plano, str):
+        plano = json.loads(plano)
+    return max(LIMITE_CONTAGEM_EXATA + 1, int(plano[0]["Plan"]["Plan Rows"]))
+
+
+def total_transacoes(db: Session, id_usuario: int, *filtros) -> Tuple[int, bool]:
+    """
+    Total de transações do usuário que atendem aos filtros
+
+    Returns:
+        tuple: (total, exato)
+    """
+    if not filtros:
+        total = db.execute(
+            select(_CONTAGEM.c.total).where(_CONTAGEM.c.id_usuario == id_usuario)
+        ).scalar()
+        if total is not None:
+            return total, True
+
+    consulta = select(Transacao.id_transacao).where(Transacao.id_usuario == id_usuario, *filtros)
+    limitada = db.execute(
+        select(func.count()).select_from(consulta.limit(LIMITE_CONTAGEM_EXATA + 1).subquery())
+    ).scalar()
+    if limitada <= LIMITE_CONTAGEM_EXATA:
+        return limitada, True
+    return _estimar(db, consulta), False
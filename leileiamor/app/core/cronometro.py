@@ -0,0 +1,241 @@
+"""
+Módulo de Cronometragem por Requisição (Server-Timing)
+Separa o tempo de cada requisição amostrada em fases:
+  entrada     leitura do corpo + dependências (inclui jwt, usuario e revogacao)
+  jwt         decodificação do token
+  usuario     busca do usuário autenticado (ausente com AUTH_STATELESS=1)
+  revogacao   consulta às revogações de token (filtro em memória)
+  rota        execução do endpoint
+  db          tempo no banco (soma dos cursor.execute, com a quantidade)
+  validacao   validação do response_model + jsonable_encoder
+  json        serialização do corpo
+  total       até o envio dos headers
+As fases vão no header Server-Timing e, com SERVER_TIMING_LOG=1, em uma
+linha JSON no logger "app.timing". Requisições fora da amostra não medem nada.
+"""
+import functools
+import inspect
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from app.core.perfil import perfilar_endpoint
+
+# Fração das requisições medidas (0 desliga, 1 mede todas)
+SERVER_TIMING_AMOSTRAGEM = float(os.getenv("SERVER_TIMING_AMOSTRAGEM", "0.1"))
+
+# Escreve as medições de cada requisição amostrada no log estruturado
+SERVER_TIMING_LOG = os.getenv("SERVER_TIMING_LOG", "0") == "1"
+
+# Medições da requisição atual: {fase: [segundos, ocorrências]} (None = fora da amostra)
+_medicoes = ContextVar("medicoes", default=None)
+
+# Rota (método + caminho declarado) da requisição atual, para os logs do banco
+_rota_atual = ContextVar("rota_atual", default=None)
+
+logger = logging.getLogger("app.timing")
+
+
+def amostrar() -> bool:
+    return SERVER_TIMING_AMOSTRAGEM > 0 and random.random() < SERVER_TIMING_AMOSTRAGEM
+
+
+def iniciar_medicao():
+    """Ativa a medição na requisição atual; retorna (medicoes, token)"""
+    medicoes = {}
+    return medicoes, _medicoes.set(medicoes)
+
+
+def encerrar_medicao(token) -> None:
+    _medicoes.reset(token)
+
+
+def registrar(nome: str, segundos: float) -> None:
+    medicoes = _medicoes.get()
+    if medicoes is not None:
+        fase = medicoes.setdefault(nome, [0.0, 0])
+        fase[0] += segundos
+        fase[1] += 1
+
+
+@contextmanager
+def medir(nome: str):
+    """Soma a duração do bloco na fase `nome` (no-op fora da amostra)"""
+    if _medicoes.get() is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar(nome, time.perf_counter() - inicio)
+
+
+def rota_atual():
+    return _rota_atual.get()
+
+
+def em_milissegundos(medicoes: dict) -> dict:
+    return {nome: round(segundos * 1000, 3) for nome, (segundos, _) in medicoes.items() if not nome.startswith("_")}
+
+
+def formatar_server_timing(medicoes: dict) -> str:
+    """Ex: jwt;dur=0.081, db;dur=1.2;desc="3 queries", total;dur=4.9"""
+    partes = []
+    for nome, (segundos, ocorrencias) in medicoes.items():
+        if nome.startswith("_"):
+            continue
+        parte = f"{nome};dur={segundos * 1000:.3f}"
+        if nome == "db":
+            parte += f';desc="{ocorrencias} queries"'
+        partes.append(parte)
+    return ", ".join(partes)
+
+
+# ============================================================================
+# FASES DA ROTA
+# ============================================================================
+
+class RespostaJSONCronometrada(JSONResponse):
+    """JSONResponse que mede a serialização do corpo (fase json)"""
+
+    def render(self, content) -> bytes:
+        with medir("json"):
+            return super().render(content)
+
+
+def _cronometrar_endpoint(endpoint):
+    """Envolve o endpoint marcando início e fim (a assinatura é preservada)"""
+    def marcar(inicio):
+        medicoes = _medicoes.get()
+        if medicoes is not None:
+            medicoes["_rota"] = (inicio, time.perf_counter())
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def endpoint_cronometrado(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                marcar(inicio)
+    else:
+        @functools.wraps(endpoint)
+        def endpoint_cronometrado(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                marcar(inicio)
+
+    return endpoint_cronometrado
+
+
+class RotaCronometrada(APIRoute):
+    """
+    APIRoute que separa entrada, rota e validação da resposta
+    (o que sobra do handler depois do endpoint, menos a fase json)
+    Também liga o profiler no endpoint quando a requisição pediu captura
+    e marca a rota atual (usada pelo log de consultas lentas)
+    """
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, _cronometrar_endpoint(perfilar_endpoint(endpoint)), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        rota = f"{','.join(sorted(self.methods))} {self.path}"
+
+        async def handler_cronometrado(request):
+            _rota_atual.set(rota)
+            medicoes = _medicoes.get()
+            if medicoes is None:
+                return await handler(request)
+
+            inicio = time.perf_counter()
+            json_antes = medicoes.get("json", [0.0])[0]
+            resposta = await handler(request)
+            fim = time.perf_counter()
+
+            marcas = medicoes.pop("_rota", None)
+            if marcas:
+                json_handler = medicoes.get("json", [0.0])[0] - json_antes
+                registrar("entrada", marcas[0] - inicio)
+                registrar("rota", marcas[1] - marcas[0])
+                registrar("validacao", max(0.0, fim - marcas[1] - json_handler))
+            return resposta
+
+        return handler_cronometrado
+
+
+# ============================================================================
+# BANCO
+# ============================================================================
+
+def _antes_cursor(conn, cursor, statement, parameters, context, executemany):
+    if _medicoes.get() is not None:
+        conn.info["cronometro_inicio"] = time.perf_counter()
+
+
+def _depois_cursor(conn, cursor, statement, parameters, context, executemany):
+    inicio = conn.info.pop("cronometro_inicio", None)
+    if inicio is not None:
+        registrar("db", time.perf_counter() - inicio)
+
+
+def instrumentar_engine(engine) -> None:
+    """Soma o tempo dos cursor.execute do engine na fase db"""
+    event.listen(engine, "before_cursor_execute", _antes_cursor)
+    event.listen(engine, "after_cursor_execute", _depois_cursor)
+
+
+# ============================================================================
+# MIDDLEWARE
+# ============================================================================
+
+class ServerTimingMiddleware:
+    """
+    Middleware ASGI que mede as fases das requisições amostradas
+    (SERVER_TIMING_AMOSTRAGEM) e as envia no header Server-Timing
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not amostrar():
+            await self.app(scope, receive, send)
+            return
+
+        medicoes, token = iniciar_medicao()
+        inicio = time.perf_counter()
+        status = None
+
+        async def send_com_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                registrar("total", time.perf_counter() - inicio)
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", formatar_server_timing(medicoes))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_com_timing)
+        finally:
+            encerrar_medicao(token)
+            if SERVER_TIMING_LOG:
+                logger.info(json.dumps({
+                    "metodo": scope["method"],
+                    "caminho": scope["path"],
+                    "status": status,
+                    "fases_ms": em_milissegundos(medicoes),
+                }))
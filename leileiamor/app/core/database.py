@@ -6,6 +6,10 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+from app.core.banco_sqlite import SessaoRoteada, criar_engines, usar_perfil_sqlite
+from app.core.cronometro import instrumentar_engine
+from app.core.consultas_lentas import registrar_consultas_lentas
+
 # ============================================================================
 # CONFIGURAÇÃO VIA VARIÁVEIS DE AMBIENTE (Docker)
 # ============================================================================
@@ -21,13 +25,53 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
 # ============================================================================
 
 # Criação do engine do SQLAlchemy
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+if usar_perfil_sqlite(DATABASE_URL):
+    # SQLite em arquivo: WAL + PRAGMAs, um escritor e um pool de leitura
+    # (engine é o de escrita: create_all, migrações e scripts usam ele)
+    engine, engine_leitura = criar_engines(DATABASE_URL)
+else:
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
+    )
+    engine_leitura = engine
+
+ENGINES = [engine] if engine_leitura is engine else [engine, engine_leitura]
+
+for _engine in ENGINES:
+    # Tempo gasto no banco entra na fase "db" do Server-Timing
+    instrumentar_engine(_engine)
+
+    # Instruções acima de CONSULTA_LENTA_MS vão para o log, com o plano (EXPLAIN)
+    registrar_consultas_lentas(_engine)
 
 # SessionLocal para criar sessões de banco de dados
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+if engine_leitura is engine:
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+else:
+    SessionLocal = sessionmaker(
+        class_=SessaoRoteada, autocommit=False, autoflush=False,
+        escrita=engine, leitura=engine_leitura,
+    )
+
+def reiniciar_pool():
+    """
+    Descarta o pool herdado após um fork (gunicorn --preload, ProcessPoolExecutor)
+    As conexões do processo pai não são fechadas, só deixam de ser usadas;
+    o processo filho abre as suas sob demanda
+    """
+    for _engine in ENGINES:
+        _engine.dispose(close=False)
+
+
+def encerrar_conexoes():
+    """Fecha as conexões do pool (shutdown gracioso do worker)"""
+    for _engine in ENGINES:
+        _engine.dispose()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reiniciar_pool)
 
 # Base para os modelos ORM
 Base = declarative_base()
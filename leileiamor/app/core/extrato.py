@@ -0,0 +1,121 @@
+"""
+Módulo de Extrato
+Transações da conta da mais recente para a mais antiga com o saldo após
+cada uma, calculado no banco a partir do saldo atual da conta:
+    saldo_apos = saldo atual - soma das transações mais recentes que ela
+A janela (SUM() OVER) segue a ordem do índice (id_conta, data, id_transacao),
+então o LIMIT interrompe a varredura. A paginação é por cursor (data, id):
+as transações mais recentes que o cursor entram só na âncora (soma agregada).
+
+O JSON é gerado em blocos enquanto as linhas chegam do banco (yield_per):
+um extrato de 20 anos nunca fica inteiro em memória.
+"""
+import json
+from datetime import date
+from decimal import Decimal
+from typing import Iterator, Optional, Tuple
+
+from sqlalchemy import bindparam, case, func, select, tuple_
+
+from app.core.database import SessionLocal
+from app.models.conta import Conta
+from app.models.transacao import Transacao
+
+# Linhas lidas do banco por bloco (cursor no servidor no PostgreSQL)
+TAMANHO_BLOCO = 500
+
+CENTAVO = Decimal("0.01")
+
+_VALOR_ASSINADO = case((Transacao.tipo == "receita", Transacao.valor), else_=-Transacao.valor)
+_ORDEM = (Transacao.data.desc(), Transacao.id_transacao.desc())
+_ANTES_DO_CURSOR = tuple_(Transacao.data, Transacao.id_transacao) < tuple_(
+    bindparam("cursor_data"), bindparam("cursor_id")
+)
+
+
+def _consulta(com_cursor: bool, com_limite: bool):
+    saldo_apos = Conta.saldo - func.coalesce(
+        func.sum(_VALOR_ASSINADO).over(order_by=_ORDEM, rows=(None, -1)), 0
+    )
+    filtros = [Transacao.id_conta == bindparam("id_conta")]
+    if com_cursor:
+        mais_recentes = select(func.coalesce(func.sum(_VALOR_ASSINADO), 0)).where(
+            Transacao.id_conta == bindparam("id_conta"), ~_ANTES_DO_CURSOR
+        ).scalar_subquery()
+        saldo_apos = saldo_apos - mais_recentes
+        filtros.append(_ANTES_DO_CURSOR)
+
+    stmt = select(
+        Transacao.id_transacao, Transacao.data, Transacao.descricao, Transacao.tipo,
+        Transacao.valor, Transacao.id_categoria, saldo_apos.label("saldo_apos")
+    ).join(Conta, Conta.id_conta == Transacao.id_conta).where(*filtros).order_by(*_ORDEM)
+    if com_limite:
+        stmt = stmt.limit(bindparam("limite"))
+    return stmt.execution_options(yield_per=TAMANHO_BLOCO)
+
+
+# Pré-construídas: (com cursor, com limite) -> consulta
+CONSULTAS = {
+    (com_cursor, com_limite): _consulta(com_cursor, com_limite)
+    for com_cursor in (False, True) for com_limite in (False, True)
+}
+
+
+def codificar_cursor(linha: dict) -> str:
+    """Cursor opaco da próxima página: data e id da última linha"""
+    return f"{linha['data']}_{linha['id_transacao']}"
+
+
+def decodificar_cursor(cursor: str) -> Tuple[date, int]:
+    """Lança ValueError se o cursor for inválido"""
+    data, id_transacao = cursor.split("_")
+    return date.fromisoformat(data), int(id_transacao)
+
+
+def _moeda(valor) -> str:
+    return str(Decimal(str(valor)).quantize(CENTAVO))
+
+
+def gerar_extrato_json(conta: dict, limite: int = 0, cursor: Optional[Tuple[date, int]] = None) -> Iterator[str]:
+    """
+    Gera o JSON do extrato ({conta, transacoes, proximo_cursor}) em blocos
+    Abre a própria sessão: o corpo é enviado depois que a rota retorna
+
+    Args:
+        conta: conta já validada (ContaResponse em JSON)
+        limite: linhas por página (0 = extrato inteiro)
+        cursor: (data, id_transacao) da última linha da página anterior
+    """
+    parametros = {"id_conta": conta["id_conta"]}
+    if limite:
+        parametros["limite"] = limite
+    if cursor:
+        parametros["cursor_data"], parametros["cursor_id"] = cursor
+
+    yield f'{{"conta": {json.dumps(conta)}, "transacoes": ['
+
+    quantidade, ultima = 0, None
+    db = SessionLocal()
+    try:
+        resultado = db.execute(CONSULTAS[(cursor is not None, bool(limite))], parametros)
+        for bloco in resultado.partitions():
+            linhas = [
+                {
+                    "id_transacao": linha.id_transacao,
+                    "data": linha.data.isoformat(),
+                    "descricao": linha.descricao,
+                    "tipo": linha.tipo,
+                    "valor": _moeda(linha.valor),
+                    "id_categoria": linha.id_categoria,
+                    "saldo_apos": _moeda(linha.saldo_apos),
+                }
+                for linha in bloco
+            ]
+            yield ("," if quantidade else "") + ",".join(json.dumps(linha) for linha in linhas)
+            quantidade += len(linhas)
+            ultima = linhas[-1]
+    finally:
+        db.close()
+
+    proximo = codificar_cursor(ultima) if limite and quantidade == limite else None
+    yield f'], "proximo_cursor": {json.dumps(proximo)}}}'
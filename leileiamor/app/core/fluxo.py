@@ -0,0 +1,199 @@
+"""
+Módulo de Fluxo de Caixa
+Agregações diárias, semanais e mensais calculadas com arrays NumPy
+"""
+from datetime import date
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import Float, case, cast, select
+from sqlalchemy.orm import Session
+
+from app.models.conta import Conta
+from app.models.transacao import Transacao
+
+# Janela padrão (em dias) das médias móveis
+JANELA_PADRAO = 7
+
+
+def carregar_transacoes(db: Session, id_usuario: int) -> dict:
+    """
+    Busca apenas as colunas necessárias (data, valor, tipo, id_conta)
+    em uma única query e converte o resultado para arrays NumPy
+
+    Returns:
+        dict: Arrays "datas" (datetime64[D]), "valores" (float, com sinal:
+        receita positiva, despesa negativa) e "contas" (int)
+    """
+    # Sinal e conversão para float feitos no banco: evita Decimal e o
+    # carregamento de entidades ORM linha a linha
+    valor_com_sinal = case(
+        (Transacao.tipo == "receita", cast(Transacao.valor, Float)),
+        else_=-cast(Transacao.valor, Float),
+    )
+    linhas = db.execute(
+        select(Transacao.data, valor_com_sinal, Transacao.id_conta)
+        .where(Transacao.id_usuario == id_usuario)
+    ).all()
+
+    if not linhas:
+        return {
+            "datas": np.empty(0, dtype="datetime64[D]"),
+            "valores": np.empty(0, dtype=np.float64),
+            "contas": np.empty(0, dtype=np.int64),
+        }
+
+    datas, valores, contas = zip(*linhas)
+
+    return {
+        "datas": np.array(datas, dtype="datetime64[D]"),
+        "valores": np.fromiter(valores, dtype=np.float64, count=len(linhas)),
+        "contas": np.fromiter(contas, dtype=np.int64, count=len(linhas)),
+    }
+
+
+def media_movel(serie: np.ndarray, janela: int) -> np.ndarray:
+    """
+    Média móvel simples via soma acumulada (sem loop em Python)
+    Os primeiros pontos usam a janela parcial disponível
+    """
+    acumulado = np.concatenate(([0.0], np.cumsum(serie)))
+    fim = np.arange(1, len(serie) + 1)
+    inicio = np.maximum(fim - janela, 0)
+    return (acumulado[fim] - acumulado[inicio]) / (fim - inicio)
+
+
+def _agrupar(indices: np.ndarray, valores: np.ndarray, tamanho: int) -> dict:
+    """Soma receitas e despesas por período (índice inteiro 0..tamanho-1)"""
+    receitas = np.bincount(indices, weights=np.where(valores > 0, valores, 0.0), minlength=tamanho)
+    despesas = np.bincount(indices, weights=np.where(valores < 0, -valores, 0.0), minlength=tamanho)
+    return {"receitas": receitas, "despesas": despesas}
+
+
+def _datas_str(datas: np.ndarray) -> list:
+    return np.datetime_as_string(datas, unit="D").tolist()
+
+
+def _arredondar(serie: np.ndarray) -> list:
+    return np.round(serie, 2).tolist()
+
+
+def calcular_fluxo(
+    db: Session,
+    id_usuario: int,
+    data_inicio: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    janela: int = JANELA_PADRAO,
+) -> dict:
+    """
+    Calcula as séries de receitas x despesas e o saldo acumulado por conta
+
+    O saldo de cada conta é ancorado no saldo atual: o valor em um dia é o
+    saldo atual menos o efeito das transações posteriores a esse dia.
+    Por isso o histórico completo é carregado e o intervalo
+    data_inicio/data_fim só recorta as séries na saída.
+    """
+    dados = carregar_transacoes(db, id_usuario)
+    datas, valores, contas = dados["datas"], dados["valores"], dados["contas"]
+
+    saldos_atuais = dict(
+        db.query(Conta.id_conta, Conta.saldo).filter(Conta.id_usuario == id_usuario).all()
+    )
+
+    if len(datas) == 0:
+        return {
+            "inicio": None,
+            "fim": None,
+            "janela": janela,
+            "diario": {"datas": [], "receitas": [], "despesas": [], "liquido": [],
+                       "media_movel_receitas": [], "media_movel_despesas": []},
+            "semanal": {"periodos": [], "receitas": [], "despesas": []},
+            "mensal": {"periodos": [], "receitas": [], "despesas": []},
+            "contas": [
+                {"id_conta": id_conta, "saldo": []} for id_conta in sorted(saldos_atuais)
+            ],
+        }
+
+    primeiro, ultimo = datas.min(), datas.max()
+
+    # ---------------- Diário ----------------
+    n_dias = int((ultimo - primeiro).astype(np.int64)) + 1
+    dia = (datas - primeiro).astype(np.int64)
+    dias = primeiro + np.arange(n_dias)
+    diario = _agrupar(dia, valores, n_dias)
+    liquido = diario["receitas"] - diario["despesas"]
+
+    # ---------------- Semanal (semana começando na segunda) ----------------
+    # datetime64[D] conta dias desde 1970-01-01 (quinta-feira)
+    semana = (datas.astype(np.int64) + 3) // 7
+    primeira_semana = int(semana.min())
+    n_semanas = int(semana.max()) - primeira_semana + 1
+    semanal = _agrupar(semana - primeira_semana, valores, n_semanas)
+    inicio_semanas = ((primeira_semana + np.arange(n_semanas)) * 7 - 3).astype("datetime64[D]")
+
+    # ---------------- Mensal ----------------
+    meses = datas.astype("datetime64[M]")
+    primeiro_mes = meses.min()
+    n_meses = int((meses.max() - primeiro_mes).astype(np.int64)) + 1
+    mensal = _agrupar((meses - primeiro_mes).astype(np.int64), valores, n_meses)
+    periodos_meses = np.datetime_as_string(primeiro_mes + np.arange(n_meses), unit="M").tolist()
+
+    # ---------------- Saldo acumulado por conta ----------------
+    ids_contas = np.array(sorted(set(saldos_atuais) | set(np.unique(contas).tolist())), dtype=np.int64)
+    linha_conta = np.searchsorted(ids_contas, contas)
+    fluxo_contas = np.bincount(
+        linha_conta * n_dias + dia, weights=valores, minlength=len(ids_contas) * n_dias
+    ).reshape(len(ids_contas), n_dias)
+    acumulado = np.cumsum(fluxo_contas, axis=1)
+    atuais = np.array([float(saldos_atuais.get(int(i), 0) or 0) for i in ids_contas])
+    saldos = atuais[:, None] - acumulado[:, -1:] + acumulado
+
+    # ---------------- Recorte do intervalo pedido ----------------
+    corte_inicio = 0
+    corte_fim = n_dias
+    if data_inicio is not None:
+        corte_inicio = int(np.clip((np.datetime64(data_inicio, "D") - primeiro).astype(np.int64), 0, n_dias))
+    if data_fim is not None:
+        corte_fim = int(np.clip((np.datetime64(data_fim, "D") - primeiro).astype(np.int64) + 1, 0, n_dias))
+    recorte = slice(corte_inicio, max(corte_inicio, corte_fim))
+
+    mm_receitas = media_movel(diario["receitas"], janela)
+    mm_despesas = media_movel(diario["despesas"], janela)
+
+    dias_recorte = dias[recorte]
+    # Intervalo fora do histórico (recorte vazio): nenhuma semana ou mês
+    mascara_semanas = np.zeros(n_semanas, dtype=bool)
+    mascara_meses = np.zeros(n_meses, dtype=bool)
+    if len(dias_recorte):
+        mascara_semanas = (inicio_semanas + 6 >= dias_recorte[0]) & (inicio_semanas <= dias_recorte[-1])
+        meses_recorte = dias_recorte.astype("datetime64[M]")
+        periodos_m = primeiro_mes + np.arange(n_meses)
+        mascara_meses = (periodos_m >= meses_recorte[0]) & (periodos_m <= meses_recorte[-1])
+
+    return {
+        "inicio": _datas_str(dias_recorte[:1])[0] if len(dias_recorte) else None,
+        "fim": _datas_str(dias_recorte[-1:])[0] if len(dias_recorte) else None,
+        "janela": janela,
+        "diario": {
+            "datas": _datas_str(dias_recorte),
+            "receitas": _arredondar(diario["receitas"][recorte]),
+            "despesas": _arredondar(diario["despesas"][recorte]),
+            "liquido": _arredondar(liquido[recorte]),
+            "media_movel_receitas": _arredondar(mm_receitas[recorte]),
+            "media_movel_despesas": _arredondar(mm_despesas[recorte]),
+        },
+        "semanal": {
+            "periodos": _datas_str(inicio_semanas[mascara_semanas]),
+            "receitas": _arredondar(semanal["receitas"][mascara_semanas]),
+            "despesas": _arredondar(semanal["despesas"][mascara_semanas]),
+        },
+        "mensal": {
+            "periodos": [p for p, m in zip(periodos_meses, mascara_meses.tolist()) if m],
+            "receitas": _arredondar(mensal["receitas"][mascara_meses]),
+            "despesas": _arredondar(mensal["despesas"][mascara_meses]),
+        },
+        "contas": [
+            {"id_conta": int(id_conta), "saldo": _arredondar(saldos[i, recorte])}
+            for i, id_conta in enumerate(ids_contas)
+        ],
+    }
@@ -0,0 +1,250 @@
+"""
+Módulo de Gravação em Lote (group commit)
+Em picos de inserção (ex: dia de pagamento) cada transação pagaria o próprio
+commit (fsync). Com GRAVACAO_EM_LOTE=1 as inserções entram em
+uma fila em memória e uma thread as grava em micro-lotes: até
+LOTE_TAMANHO_MAXIMO linhas ou LOTE_JANELA_MS milissegundos após a primeira,
+o que vier antes. Cada lote é uma única transação, com um INSERT de várias
+linhas e um UPDATE por conta com a soma das variações de saldo.
+Conta, categoria e tipo são validados dentro da transação do lote
+(insercao.validar_lote), não no cache de metadados do worker.
+Cada chamador recebe o resultado da própria transação (ou o ErroInsercao)
+e o aguarda sem ocupar uma thread (await). Um item só é cancelado enquanto
+ainda está na fila: depois que o lote começa, o chamador espera o commit.
+"""
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import Future
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.contagem import ajustar_contagem
+from app.core.database import SessionLocal
+from app.core.eventos import publicar, saldos
+from app.core.insercao import ErroInsercao, validar_lote
+from app.core.previsao import invalidar_previsao
+from app.models.conta import Conta
+from app.models.transacao import Transacao
+
+# Caminho de escrita opcional (desligado por padrão)
+GRAVACAO_EM_LOTE = os.getenv("GRAVACAO_EM_LOTE", "0") == "1"
+
+# Quantidade máxima de linhas por lote
+LOTE_TAMANHO_MAXIMO = int(os.getenv("LOTE_TAMANHO_MAXIMO", "500"))
+
+# Espera máxima (a partir da primeira linha) antes de gravar o lote
+LOTE_JANELA_MS = float(os.getenv("LOTE_JANELA_MS", "5"))
+
+# Tempo máximo que um item aguarda na fila; depois disso é cancelado sem ser gravado
+TIMEOUT_RESULTADO = 30
+
+_CONTA = Conta.__table__
+
+_ATUALIZAR_SALDO = (
+    update(_CONTA)
+    .where(_CONTA.c.id_conta == bindparam("b_id_conta"))
+    .values(saldo=_CONTA.c.saldo + bindparam("b_variacao"))
+)
+
+
+class GravacaoNaoIniciada(Exception):
+    """O item ficou na fila além do prazo e foi cancelado: não será gravado (pode repetir)"""
+
+
+def gravar_transacoes(db: Session, itens: list) -> list:
+    """
+    Valida e insere as transações e aplica as variações de saldo em uma transação
+
+    Args:
+        itens: dicts com as colunas de Transacao
+
+    Returns:
+        list: id_transacao (ou o ErroInsercao, se recusado) de cada item, na mesma ordem
+    """
+    erros = validar_lote(db, itens)
+    itens = [item for item, erro in zip(itens, erros) if erro is None]
+    if not itens:
+        db.rollback()
+        return erros
+
+    ids = db.scalars(
+        insert(Transacao).returning(Transacao.id_transacao, sort_by_parameter_order=True),
+        itens,
+    ).all()
+
+    variacoes = defaultdict(Decimal)
+    inseridas = Counter()
+    for item in itens:
+        inseridas[item["id_usuario"]] += 1
+        valor = Decimal(str(item["valor"]))
+        variacoes[item["id_conta"]] += valor if item["tipo"] == "receita" else -valor
+
+    # Contas em ordem crescente: lotes concorrentes (outros workers) não entram em deadlock
+    db.execute(
+        _ATUALIZAR_SALDO,
+        [{"b_id_conta": id_conta, "b_variacao": variacao} for id_conta, variacao in sorted(variacoes.items())],
+    )
+    for id_usuario, quantidade in sorted(inseridas.items()):
+        ajustar_contagem(db, id_usuario, quantidade)
+        invalidar_previsao(db, id_usuario)
+
+    # Saldos depois do lote (lidos na mesma transação) para os painéis conectados
+    contas = {
+        conta.id_conta: conta
+        for conta in db.execute(select(Conta.id_conta, Conta.saldo).where(Conta.id_conta.in_(variacoes)))
+    }
+    for id_transacao, item in zip(ids, itens):
+        publicar(db, item["id_usuario"], {
+            "tipo": "transacao_criada",
+            "transacao": {**item, "id_transacao": id_transacao},
+            "contas": saldos(contas[item["id_conta"]]),
+        })
+    db.commit()
+    gerados = iter(ids)
+    return [next(gerados) if erro is None else erro for erro in erros]
+
+
+class GravadorEmLote:
+    """Fila de inserções gravada em micro-lotes por uma thread dedicada"""
+
+    def __init__(self, tamanho_maximo: int = LOTE_TAMANHO_MAXIMO, janela_ms: float = LOTE_JANELA_MS):
+        self.tamanho_maximo = tamanho_maximo
+        self.janela = janela_ms / 1000
+        self._fila = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.lotes = 0
+        self.linhas = 0
+        self.maior_lote = 0
+
+    async def enviar(self, item: dict, timeout: float = TIMEOUT_RESULTADO) -> dict:
+        """
+        Enfileira a inserção e aguarda (sem bloquear a thread) o commit do lote
+
+        Returns:
+            dict: O item com o id_transacao gerado
+
+        Raises:
+            GravacaoNaoIniciada: o item não saiu da fila em timeout segundos
+            ErroInsercao: conta, categoria ou tipo recusados na validação
+        """
+        self._iniciar()
+        futuro = Future()
+        self._fila.put((item, futuro))
+        try:
+            # shield: o prazo não cancela o futuro; quem decide é o cancel() abaixo
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(futuro)), timeout)
+        except asyncio.TimeoutError:
+            if futuro.cancel():
+                raise GravacaoNaoIniciada(f"Item não entrou em um lote em {timeout}s")
+            # O lote já está gravando o item: responder erro geraria duplicata na repetição
+            return await asyncio.wrap_future(futuro)
+
+    def _iniciar(self) -> None:
+        # A thread é criada sob demanda: após um fork (workers do gunicorn)
+        # ela não existe no filho e é recriada na primeira inserção
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar, name="gravador-lote", daemon=True)
+                self._thread.start()
+
+    def encerrar(self, timeout: float = 5) -> None:
+        """Grava o que está na fila e encerra a thread (shutdown do app)"""
+        if self._thread is not None and self._thread.is_alive():
+            self._fila.put(None)
+            self._thread.join(timeout)
+
+    def estatisticas(self) -> dict:
+        return {
+            "lotes": self.lotes,
+            "linhas": self.linhas,
+            "media_por_lote": round(self.linhas / self.lotes, 2) if self.lotes else 0,
+            "maior_lote": self.maior_lote,
+            "na_fila": self._fila.qsize(),
+        }
+
+    def _coletar(self) -> Optional[list]:
+        """Bloqueia até a primeira linha e junta as seguintes até o tamanho ou a janela"""
+        primeiro = self._fila.get()
+        if primeiro is None:
+            return None
+
+        lote = [primeiro]
+        prazo = time.monotonic() + self.janela
+        while len(lote) < self.tamanho_maximo:
+            restante = prazo - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                item = self._fila.get(timeout=restante)
+            except queue.Empty:
+                break
+            if item is None:
+                # Pedido de encerramento: grava este lote e para no próximo ciclo
+                self._fila.put(None)
+                break
+            lote.append(item)
+        return lote
+
+    def _executar(self) -> None:
+        while True:
+            lote = self._coletar()
+            if lote is None:
+                return
+            self._gravar(lote)
+
+    def _gravar(self, lote: list) -> None:
+        # Itens cancelados (prazo na fila) ficam de fora; os demais não podem mais ser cancelados
+        lote = [(item, futuro) for item, futuro in lote if futuro.set_running_or_notify_cancel()]
+        if not lote:
+            return
+        db = SessionLocal()
+        try:
+            try:
+                ids = gravar_transacoes(db, [item for item, _ in lote])
+            except Exception:
+                # Um item inválido não derruba os demais: regrava um a um
+                db.rollback()
+                self._gravar_individualmente(db, lote)
+                return
+
+            for (item, futuro), id_transacao in zip(lote, ids):
+                self._responder(item, futuro, id_transacao)
+
+            self.lotes += 1
+            self.linhas += len(lote)
+            self.maior_lote = max(self.maior_lote, len(lote))
+        finally:
+            db.close()
+
+    @staticmethod
+    def _responder(item: dict, futuro: Future, resultado) -> None:
+        if isinstance(resultado, ErroInsercao):
+            futuro.set_exception(resultado)
+        else:
+            futuro.set_result({**item, "id_transacao": resultado})
+
+    def _gravar_individualmente(self, db: Session, lote: list) -> None:
+        for item, futuro in lote:
+            try:
+                (resultado,) = gravar_transacoes(db, [item])
+            except Exception as e:
+                db.rollback()
+                futuro.set_exception(e)
+            else:
+                self._responder(item, futuro, resultado)
+                self.lotes += 1
+                self.linhas += 1
+                self.maior_lote = max(self.maior_lote, 1)
+
+
+gravador = GravadorEmLote()
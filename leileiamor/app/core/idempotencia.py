@@ -0,0 +1,116 @@
+"""
+Módulo de Idempotência
+Clientes em rede instável repetem POSTs; com o header Idempotency-Key a
+repetição devolve a resposta original sem executar a operação de novo.
+
+A chave é reservada (INSERT) na mesma transação da operação: requisições
+concorrentes com a mesma chave esbarram na constraint única, sem lock
+explícito, e a perdedora reenvia a resposta gravada pela vencedora.
+
+Uso:
+    python -m app.core.idempotencia    # remove as chaves fora da janela
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.idempotencia import ChaveIdempotencia
+
+# Por quanto tempo uma chave reenvia a resposta original
+JANELA_IDEMPOTENCIA = timedelta(hours=int(os.getenv("IDEMPOTENCIA_JANELA_HORAS", "24")))
+
+TAMANHO_MAXIMO_CHAVE = 255
+
+
+def impressao_digital(corpo: dict) -> str:
+    """SHA-256 do corpo (JSON canônico): a mesma chave não pode mudar de conteúdo"""
+    return hashlib.sha256(json.dumps(corpo, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _buscar(db: Session, id_usuario: int, chave: str) -> Optional[ChaveIdempotencia]:
+    return db.query(ChaveIdempotencia).filter(
+        ChaveIdempotencia.id_usuario == id_usuario,
+        ChaveIdempotencia.chave == chave
+    ).first()
+
+
+def _resposta_gravada(registro: Optional[ChaveIdempotencia], impressao: str) -> dict:
+    if registro is None or registro.resposta is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Requisição com esta Idempotency-Key ainda está em processamento"
+        )
+    if registro.impressao != impressao:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key já utilizada com outro conteúdo"
+        )
+    return json.loads(registro.resposta)
+
+
+def reservar_chave(
+    db: Session, id_usuario: int, chave: str, corpo: dict
+) -> Tuple[Optional[ChaveIdempotencia], Optional[dict]]:
+    """
+    Reserva a chave para esta requisição ou recupera a resposta original
+
+    Returns:
+        (registro, None): requisição nova; execute e chame registrar_resposta
+        (None, resposta): repetição; devolva a resposta original
+    """
+    if not chave or len(chave) > TAMANHO_MAXIMO_CHAVE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Idempotency-Key deve ter entre 1 e {TAMANHO_MAXIMO_CHAVE} caracteres"
+        )
+
+    impressao = impressao_digital(corpo)
+
+    existente = _buscar(db, id_usuario, chave)
+    if existente:
+        if datetime.utcnow() - existente.criado_em < JANELA_IDEMPOTENCIA:
+            return None, _resposta_gravada(existente, impressao)
+        # Fora da janela: a chave pode ser reutilizada
+        db.delete(existente)
+        db.flush()
+
+    registro = ChaveIdempotencia(id_usuario=id_usuario, chave=chave, impressao=impressao)
+    db.add(registro)
+    try:
+        db.flush()
+    except IntegrityError:
+        # Outra requisição com a mesma chave venceu (e já fez commit)
+        db.rollback()
+        return None, _resposta_gravada(_buscar(db, id_usuario, chave), impressao)
+
+    return registro, None
+
+
+def registrar_resposta(registro: ChaveIdempotencia, resposta: dict) -> None:
+    """Grava a resposta na chave reservada (efetivada no mesmo commit da operação)"""
+    registro.resposta = json.dumps(resposta, default=str)
+
+
+def expurgar_chaves_expiradas(db: Session) -> int:
+    """Remove as chaves fora da janela de idempotência"""
+    removidas = db.query(ChaveIdempotencia).filter(
+        ChaveIdempotencia.criado_em < datetime.utcnow() - JANELA_IDEMPOTENCIA
+    ).delete(synchronize_session=False)
+    db.commit()
+    return removidas
+
+
+if __name__ == "__main__":
+    from app.core.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(f"✅ {expurgar_chaves_expiradas(db)} chaves de idempotência expiradas removidas")
+    finally:
+        db.close()
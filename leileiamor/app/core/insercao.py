@@ -0,0 +1,300 @@
+"""
+Módulo de Inserção em Um Comando (PostgreSQL)
+POST /transacoes fazia cinco idas ao banco: SELECT da conta, SELECT da
+categoria, INSERT, UPDATE do saldo no flush e SELECT do refresh.
+No PostgreSQL tudo vira um único comando com CTEs que alteram dados:
+
+    WITH conta_pedida     AS (SELECT dono da conta),
+         categoria_pedida AS (SELECT dono e tipo da categoria),
+         saldo_novo       AS (UPDATE conta ... WHERE a conta é do usuário
+                              AND a categoria é do usuário e do mesmo tipo
+                              RETURNING id_conta, saldo),
+         transacao_nova   AS (INSERT INTO transacao SELECT ... FROM saldo_novo
+                              RETURNING id_transacao, valor),
+         contagem_nova    AS (UPDATE contagem_transacoes ... se inseriu),
+         versao_nova      AS (INSERT INTO versao_cache ... ON CONFLICT
+                              incrementa a versão da previsão, se inseriu)
+    SELECT conta_dono, categoria_dono, categoria_tipo, id_conta, saldo, ...
+
+A validação fica no WHERE do UPDATE: se falhar, nada é alterado e a linha
+devolvida diz o motivo (conta inexistente ou de outro usuário, categoria
+inexistente ou de outro usuário, tipo diferente do da categoria).
+Outros bancos (SQLite não aceita UPDATE/INSERT dentro de WITH) seguem o
+caminho da rota, com a mesma validação no UPDATE do saldo (atualizar_saldo).
+INSERCAO_UNICA=0 desliga.
+A gravação em lote valida as linhas na transação do lote (validar_lote).
+"""
+import os
+from decimal import Decimal
+from typing import List, Optional
+
+from sqlalchemy import bindparam, cast, exists, insert, literal_column, select, update
+from sqlalchemy.dialects.postgresql import insert as insert_pg
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.contagem import ajustar_contagem
+from app.core.database import engine
+from app.models.conta import Conta
+from app.models.categoria import Categoria
+from app.models.contagem import ContagemTransacoes
+from app.models.transacao import Transacao
+from app.models.versao_cache import VersaoCache
+
+INSERCAO_UNICA = os.getenv("INSERCAO_UNICA", "1") == "1" and engine.dialect.name == "postgresql"
+
+# Motivos de recusa (ErroInsercao.motivo)
+CONTA_INEXISTENTE = "conta_inexistente"
+CONTA_DE_OUTRO_USUARIO = "conta_de_outro_usuario"
+CATEGORIA_INEXISTENTE = "categoria_inexistente"
+CATEGORIA_DE_OUTRO_USUARIO = "categoria_de_outro_usuario"
+TIPO_INCOMPATIVEL = "tipo_incompativel"
+
+
+class ErroInsercao(Exception):
+    """Transação recusada pela validação do comando (nada foi gravado)"""
+
+    def __init__(self, motivo: str, categoria_tipo: str = None):
+        super().__init__(motivo)
+        self.motivo = motivo
+        self.categoria_tipo = categoria_tipo
+
+
+_CONTA = Conta.__table__
+_CATEGORIA = Categoria.__table__
+_TRANSACAO = Transacao.__table__
+_CONTAGEM = ContagemTransacoes.__table__
+_VERSAO = VersaoCache.__table__
+
+# Colunas gravadas a partir da requisição (tipadas: o PostgreSQL não infere
+# o tipo de parâmetros na lista do SELECT)
+_COLUNAS_ENTRADA = ("valor", "data", "descricao", "tipo", "id_usuario", "id_categoria")
+
+
+def _consulta():
+    usuario = bindparam("b_id_usuario")
+    conta = select(_CONTA.c.id_usuario).where(
+        _CONTA.c.id_conta == bindparam("b_id_conta")
+    ).cte("conta_pedida")
+    categoria = select(_CATEGORIA.c.id_usuario, _CATEGORIA.c.tipo).where(
+        _CATEGORIA.c.id_categoria == bindparam("b_id_categoria")
+    ).cte("categoria_pedida")
+
+    saldo = (
+        update(_CONTA)
+        .where(
+            _CONTA.c.id_conta == bindparam("b_id_conta"),
+            _CONTA.c.id_usuario == usuario,
+            exists().where(categoria.c.id_usuario == usuario, categoria.c.tipo == bindparam("b_tipo")),
+        )
+        .values(saldo=_CONTA.c.saldo + bindparam("b_variacao", type_=_CONTA.c.saldo.type))
+        .returning(_CONTA.c.id_conta, _CONTA.c.saldo)
+        .cte("saldo_novo")
+    )
+
+    entrada = [cast(bindparam(f"b_{nome}"), _TRANSACAO.c[nome].type) for nome in _COLUNAS_ENTRADA]
+    nova = (
+        insert(_TRANSACAO)
+        .from_select([*_COLUNAS_ENTRADA, "id_conta"], select(*entrada, saldo.c.id_conta))
+        .returning(_TRANSACAO.c.id_transacao, _TRANSACAO.c.valor)
+        .cte("transacao_nova")
+    )
+
+    contagem = (
+        update(_CONTAGEM)
+        .where(_CONTAGEM.c.id_usuario == usuario, exists(select(nova.c.id_transacao)))
+        .values(total=_CONTAGEM.c.total + 1)
+        .returning(_CONTAGEM.c.id_usuario)
+        .cte("contagem_nova")
+    )
+
+    # Mesmo efeito de invalidar_previsao (versoes.marcar) sem outra ida ao banco
+    versao = (
+        insert_pg(_VERSAO)
+        .from_select(
+            ["id_usuario", "metadados", "previsao"],
+            select(cast(usuario, _VERSAO.c.id_usuario.type), literal_column("0"), literal_column("1"))
+            .where(exists(select(nova.c.id_transacao))),
+        )
+        .on_conflict_do_update(index_elements=[_VERSAO.c.id_usuario], set_={"previsao": _VERSAO.c.previsao + 1})
+        .returning(_VERSAO.c.id_usuario)
+        .cte("versao_nova")
+    )
+
+    return select(
+        select(conta.c.id_usuario).scalar_subquery().label("conta_dono"),
+        select(categoria.c.id_usuario).scalar_subquery().label("categoria_dono"),
+        select(categoria.c.tipo).scalar_subquery().label("categoria_tipo"),
+        select(saldo.c.id_conta).scalar_subquery().label("id_conta"),
+        select(saldo.c.saldo).scalar_subquery().label("saldo"),
+        select(nova.c.id_transacao).scalar_subquery().label("id_transacao"),
+        select(nova.c.valor).scalar_subquery().label("valor"),
+        exists(select(contagem.c.id_usuario)).label("contado"),
+        exists(select(versao.c.id_usuario)).label("versionado"),
+    )
+
+
+# Pré-construída: só os parâmetros mudam entre as inserções
+INSERIR_TRANSACAO = _consulta()
+
+
+def _motivo(conta_dono: Optional[int], categoria_dono: Optional[int], categoria_tipo: Optional[str], id_usuario: int, tipo: str) -> str:
+    """Por que a validação recusou"""
+    if conta_dono is None:
+        return CONTA_INEXISTENTE
+    if conta_dono != id_usuario:
+        return CONTA_DE_OUTRO_USUARIO
+    if categoria_dono is None:
+        return CATEGORIA_INEXISTENTE
+    if categoria_dono != id_usuario:
+        return CATEGORIA_DE_OUTRO_USUARIO
+    if categoria_tipo != tipo:
+        return TIPO_INCOMPATIVEL
+    # Validou no snapshot, mas a conta foi removida antes do UPDATE
+    return CONTA_INEXISTENTE
+
+
+def _recusa(db: Session, id_usuario: int, dados: dict) -> ErroInsercao:
+    """Motivo da recusa quando o UPDATE validado não alterou nada (só consulta nesse caso)"""
+    linha = db.execute(select(
+        select(_CONTA.c.id_usuario).where(_CONTA.c.id_conta == dados["id_conta"]).scalar_subquery(),
+        select(_CATEGORIA.c.id_usuario).where(_CATEGORIA.c.id_categoria == dados["id_categoria"]).scalar_subquery(),
+        select(_CATEGORIA.c.tipo).where(_CATEGORIA.c.id_categoria == dados["id_categoria"]).scalar_subquery(),
+    )).one()
+    return ErroInsercao(_motivo(*linha, id_usuario, dados["tipo"]), linha[2])
+
+
+def atualizar_saldo(db: Session, id_usuario: int, dados: dict):
+    """
+    Aplica o valor da nova transação ao saldo da conta, validando no próprio
+    UPDATE que conta e categoria são do usuário e que o tipo é o da categoria
+
+    Returns:
+        linha com id_conta e saldo após a atualização
+
+    Raises:
+        ErroInsercao: validação recusada (nada foi alterado)
+    """
+    valor = Decimal(str(dados["valor"]))
+    conta = db.execute(
+        update(_CONTA)
+        .where(
+            _CONTA.c.id_conta == dados["id_conta"],
+            _CONTA.c.id_usuario == id_usuario,
+            exists().where(
+                _CATEGORIA.c.id_categoria == dados["id_categoria"],
+                _CATEGORIA.c.id_usuario == id_usuario,
+                _CATEGORIA.c.tipo == dados["tipo"],
+            ),
+        )
+        .values(saldo=_CONTA.c.saldo + (valor if dados["tipo"] == "receita" else -valor))
+        .returning(_CONTA.c.id_conta, _CONTA.c.saldo)
+    ).first()
+    if conta is None:
+        raise _recusa(db, id_usuario, dados)
+    return conta
+
+
+def reverter_saldo(db: Session, id_usuario: int, dados: dict):
+    """
+    Desfaz no saldo da conta o valor de uma transação já gravada (edição)
+    Sem validar categoria e tipo: a transação gravada já passou por eles
+
+    Returns:
+        linha com id_conta e saldo após a atualização
+    """
+    valor = Decimal(str(dados["valor"]))
+    return db.execute(
+        update(_CONTA)
+        .where(_CONTA.c.id_conta == dados["id_conta"], _CONTA.c.id_usuario == id_usuario)
+        .values(saldo=_CONTA.c.saldo - (valor if dados["tipo"] == "receita" else -valor))
+        .returning(_CONTA.c.id_conta, _CONTA.c.saldo)
+    ).first()
+
+
+def validar_lote(db: Session, itens: list) -> List[Optional[ErroInsercao]]:
+    """
+    Valida conta, categoria e tipo de cada item na transação da gravação em
+    lote (duas consultas para o lote todo). No PostgreSQL as linhas ficam
+    travadas (FOR SHARE) até o commit: não mudam entre a validação e o INSERT
+
+    Returns:
+        list: None (válido) ou o ErroInsercao de cada item, na mesma ordem
+    """
+    contas = dict(db.execute(
+        select(_CONTA.c.id_conta, _CONTA.c.id_usuario)
+        .where(_CONTA.c.id_conta.in_({item["id_conta"] for item in itens}))
+        .with_for_update(read=True)
+    ).all())
+    categorias = {
+        id_categoria: (id_usuario, tipo)
+        for id_categoria, id_usuario, tipo in db.execute(
+            select(_CATEGORIA.c.id_categoria, _CATEGORIA.c.id_usuario, _CATEGORIA.c.tipo)
+            .where(_CATEGORIA.c.id_categoria.in_({item["id_categoria"] for item in itens}))
+            .with_for_update(read=True)
+        )
+    }
+
+    erros = []
+    for item in itens:
+        categoria_dono, categoria_tipo = categorias.get(item["id_categoria"], (None, None))
+        conta_dono = contas.get(item["id_conta"])
+        valido = (
+            conta_dono == item["id_usuario"]
+            and categoria_dono == item["id_usuario"]
+            and categoria_tipo == item["tipo"]
+        )
+        erros.append(None if valido else ErroInsercao(
+            _motivo(conta_dono, categoria_dono, categoria_tipo, item["id_usuario"], item["tipo"]), categoria_tipo
+        ))
+    return erros
+
+
+def inserir_transacao(db: Session, id_usuario: int, dados: dict):
+    """
+    Valida, insere a transação e ajusta o saldo da conta em um comando
+
+    Args:
+        dados: campos de TransacaoCreate (valor, data, descricao, tipo, id_conta, id_categoria)
+
+    Returns:
+        (transacao, conta): dict no formato de TransacaoResponse e a linha
+        com id_conta e saldo após a inserção
+
+    Raises:
+        ErroInsercao: validação recusada (motivo em .motivo)
+    """
+    valor = Decimal(str(dados["valor"]))
+    parametros = {
+        **{f"b_{nome}": dados[nome] for nome in ("data", "descricao", "tipo", "id_conta", "id_categoria")},
+        "b_valor": valor,
+        "b_id_usuario": id_usuario,
+        "b_variacao": valor if dados["tipo"] == "receita" else -valor,
+    }
+    try:
+        linha = db.execute(INSERIR_TRANSACAO, parametros).one()
+    except IntegrityError:
+        # Categoria removida por outra transação entre a leitura e o INSERT
+        raise ErroInsercao(CATEGORIA_INEXISTENTE)
+
+    if linha.id_transacao is None:
+        raise ErroInsercao(
+            _motivo(linha.conta_dono, linha.categoria_dono, linha.categoria_tipo, id_usuario, dados["tipo"]),
+            linha.categoria_tipo,
+        )
+
+    if not linha.contado:
+        # Primeira transação do usuário sem contador: cria contando as linhas
+        ajustar_contagem(db, id_usuario, 1)
+
+    transacao = {
+        "valor": linha.valor,
+        "data": dados["data"],
+        "descricao": dados["descricao"],
+        "tipo": dados["tipo"],
+        "id_conta": linha.id_conta,
+        "id_categoria": dados["id_categoria"],
+        "id_transacao": linha.id_transacao,
+        "id_usuario": id_usuario,
+    }
+    return transacao, linha
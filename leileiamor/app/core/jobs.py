@@ -0,0 +1,250 @@
+"""
+Módulo de Jobs (tarefas pesadas fora das requisições)
+Seed, limpeza, expurgo e exportações não rodam mais dentro do handler: a
+rota grava um job na tabela job e responde 202 com o id; um processo
+separado (python worker.py) executa e publica o progresso em /jobs/{id}.
+
+A fila é a própria tabela, sem broker externo:
+  - PostgreSQL: SELECT ... FOR UPDATE SKIP LOCKED, então vários workers
+    reservam jobs diferentes sem se bloquear
+  - todos os bancos: a reserva é um UPDATE condicionado a status='pendente',
+    então dois workers nunca executam o mesmo job
+Falhas voltam para a fila com espera exponencial até max_tentativas; jobs
+sem heartbeat (worker morto) são devolvidos à fila.
+"""
+import json
+import logging
+import os
+import threading
+import traceback
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.core.cronometro import RespostaJSONCronometrada
+from app.core.database import SessionLocal
+from app.models.job import Job
+
+logger = logging.getLogger("leileiamor.jobs")
+
+# Segundos entre consultas à fila quando não há job disponível
+JOBS_INTERVALO = float(os.getenv("JOBS_INTERVALO", "1"))
+
+# Tentativas por job (a primeira inclusa)
+JOBS_MAX_TENTATIVAS = int(os.getenv("JOBS_MAX_TENTATIVAS", "3"))
+
+# Espera antes da nova tentativa: base * 2^(tentativa - 1) segundos
+JOBS_ESPERA_BASE = float(os.getenv("JOBS_ESPERA_BASE", "5"))
+
+# Heartbeat do job em execução e prazo para considerá-lo abandonado
+JOBS_HEARTBEAT = float(os.getenv("JOBS_HEARTBEAT", "15"))
+JOBS_ABANDONADO = float(os.getenv("JOBS_ABANDONADO", "120"))
+
+# Tarefas registradas: tipo -> função(db, parametros, progresso) -> dict
+TAREFAS = {}
+
+
+class ErroDefinitivo(Exception):
+    """Falha que não adianta repetir (ex: parâmetros inválidos)"""
+
+
+def tarefa(tipo: str) -> Callable:
+    """Registra a função como executora dos jobs do tipo"""
+    def registrar(funcao):
+        TAREFAS[tipo] = funcao
+        return funcao
+    return registrar
+
+
+# ==================== FILA ====================
+
+def enfileirar(
+    db: Session,
+    tipo: str,
+    parametros: Optional[dict] = None,
+    id_usuario: Optional[int] = None,
+    max_tentativas: int = JOBS_MAX_TENTATIVAS
+) -> Job:
+    """Grava o job como pendente (commit) e o devolve"""
+    job = Job(
+        tipo=tipo,
+        parametros=json.dumps(parametros or {}),
+        id_usuario=id_usuario,
+        max_tentativas=max_tentativas,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def reservar(db: Session, worker: str) -> Optional[Job]:
+    """Reserva o próximo job disponível para este worker (None se a fila estiver vazia)"""
+    agora = datetime.utcnow()
+    id_job = db.execute(
+        select(Job.id_job)
+        .where(Job.status == "pendente", Job.disponivel_em <= agora)
+        .order_by(Job.disponivel_em, Job.id_job)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).scalar()
+    if id_job is None:
+        db.rollback()
+        return None
+
+    reservado = db.execute(
+        update(Job)
+        .where(Job.id_job == id_job, Job.status == "pendente")
+        .values(
+            status="executando", worker=worker, tentativas=Job.tentativas + 1,
+            iniciado_em=agora, atualizado_em=agora, mensagem=None,
+        )
+    ).rowcount
+    db.commit()
+    return db.get(Job, id_job) if reservado else None
+
+
+def devolver_abandonados(db: Session) -> int:
+    """Jobs em execução sem heartbeat (worker morto) contam como tentativa falha"""
+    limite = datetime.utcnow() - timedelta(seconds=JOBS_ABANDONADO)
+    abandonados = db.execute(
+        select(Job.id_job, Job.tentativas, Job.max_tentativas)
+        .where(Job.status == "executando", Job.atualizado_em < limite)
+    ).all()
+    for id_job, tentativas, max_tentativas in abandonados:
+        _registrar_falha(db, id_job, tentativas, max_tentativas, "Worker interrompido (sem heartbeat)")
+    db.commit()
+    return len(abandonados)
+
+
+def _registrar_falha(db: Session, id_job: int, tentativas: int, max_tentativas: int, erro: str, definitivo: bool = False) -> None:
+    agora = datetime.utcnow()
+    if definitivo or tentativas >= max_tentativas:
+        valores = {"status": "falhou", "concluido_em": agora}
+    else:
+        espera = JOBS_ESPERA_BASE * 2 ** (tentativas - 1)
+        valores = {"status": "pendente", "disponivel_em": agora + timedelta(seconds=espera)}
+    db.execute(
+        update(Job)
+        .where(Job.id_job == id_job, Job.status == "executando")
+        .values(erro=erro, atualizado_em=agora, **valores)
+    )
+
+
+# ==================== EXECUÇÃO ====================
+
+class Progresso:
+    """
+    Passado às tarefas: progresso(percentual, mensagem)
+    Grava em uma sessão própria (commit imediato), fora da transação da tarefa
+    """
+
+    def __init__(self, id_job: int):
+        self.id_job = id_job
+
+    def __call__(self, percentual: int, mensagem: Optional[str] = None) -> None:
+        valores = {"progresso": max(0, min(100, int(percentual))), "atualizado_em": datetime.utcnow()}
+        if mensagem is not None:
+            valores["mensagem"] = mensagem[:255]
+        self._gravar(valores)
+
+    def batimento(self) -> None:
+        self._gravar({"atualizado_em": datetime.utcnow()})
+
+    def _gravar(self, valores: dict) -> None:
+        db = SessionLocal()
+        try:
+            db.execute(update(Job).where(Job.id_job == self.id_job, Job.status == "executando").values(**valores))
+            db.commit()
+        finally:
+            db.close()
+
+
+def executar(job: Job) -> None:
+    """Executa o job reservado e grava o resultado (ou a falha)"""
+    progresso = Progresso(job.id_job)
+    parar = threading.Event()
+
+    def bater():
+        # Mantém o job vivo durante passos longos sem progresso
+        while not parar.wait(JOBS_HEARTBEAT):
+            try:
+                progresso.batimento()
+            except Exception as e:
+                # Falha passageira do banco não pode parar o heartbeat: o job
+                # seria dado como abandonado e executado de novo
+                logger.warning("Heartbeat do job %s falhou: %s", job.id_job, e)
+
+    batimento = threading.Thread(target=bater, name=f"job-{job.id_job}-heartbeat", daemon=True)
+    batimento.start()
+
+    db = SessionLocal()
+    try:
+        funcao = TAREFAS.get(job.tipo)
+        if funcao is None:
+            raise ErroDefinitivo(f"Tipo de job desconhecido: {job.tipo}")
+        resultado = funcao(db, json.loads(job.parametros), progresso)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        definitivo = isinstance(e, ErroDefinitivo)
+        erro = str(e) if definitivo else traceback.format_exc(limit=5)
+        logger.warning("Job %s (%s) falhou na tentativa %s: %s", job.id_job, job.tipo, job.tentativas, e)
+        _registrar_falha(db, job.id_job, job.tentativas, job.max_tentativas, erro, definitivo)
+        db.commit()
+    else:
+        agora = datetime.utcnow()
+        db.execute(
+            update(Job)
+            .where(Job.id_job == job.id_job, Job.status == "executando")
+            .values(
+                status="concluido", progresso=100, resultado=json.dumps(resultado, default=str),
+                erro=None, atualizado_em=agora, concluido_em=agora,
+            )
+        )
+        db.commit()
+    finally:
+        parar.set()
+        batimento.join()
+        db.close()
+
+
+def executar_proximo(worker: str) -> bool:
+    """Reserva e executa um job; False se a fila estava vazia"""
+    db = SessionLocal()
+    try:
+        job = reservar(db, worker)
+        if job is None:
+            return False
+        db.expunge(job)
+    finally:
+        db.close()
+    executar(job)
+    return True
+
+
+def resposta_aceita(job: Job) -> RespostaJSONCronometrada:
+    """202 Accepted com o estado do job e o endereço para acompanhá-lo"""
+    return RespostaJSONCronometrada(
+        status_code=202, content=descrever(job), headers={"Location": f"/jobs/{job.id_job}"}
+    )
+
+
+def descrever(job: Job) -> dict:
+    """Estado do job no formato de JobResponse"""
+    return {
+        "id_job": job.id_job,
+        "tipo": job.tipo,
+        "status": job.status,
+        "progresso": job.progresso,
+        "mensagem": job.mensagem,
+        "resultado": json.loads(job.resultado) if job.resultado else None,
+        "erro": job.erro,
+        "tentativas": job.tentativas,
+        "max_tentativas": job.max_tentativas,
+        "criado_em": job.criado_em.isoformat() if job.criado_em else None,
+        "iniciado_em": job.iniciado_em.isoformat() if job.iniciado_em else None,
+        "concluido_em": job.concluido_em.isoformat() if job.concluido_em else None,
+    }
@@ -0,0 +1,117 @@
+"""
+Módulo de Limpeza de Dados
+Reset rápido do banco (TRUNCATE) e expurgo de usuário em lotes
+"""
+from typing import Callable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.models.usuario import Usuario
+from app.models.conta import Conta
+from app.models.categoria import Categoria
+from app.models.transacao import Transacao
+from app.models.idempotencia import ChaveIdempotencia
+from app.models.contagem import ContagemTransacoes
+
+# Ordem de remoção respeitando as foreign keys (filhas primeiro)
+TABELAS = [ChaveIdempotencia, ContagemTransacoes, Transacao, Categoria, Conta, Usuario]
+
+# Tamanho padrão dos lotes do expurgo por usuário
+TAMANHO_LOTE_PADRAO = 1000
+
+
+def estimar_registros(db: Session) -> dict:
+    """
+    Registros de cada tabela segundo o planner (pg_class.reltuples)
+    Lê só o catálogo, sem varrer as tabelas; -1 (nunca analisada) vira 0
+    """
+    nomes = [model.__tablename__ for model in TABELAS]
+    linhas = dict(db.execute(
+        text("SELECT relname, reltuples FROM pg_class WHERE oid = ANY(CAST(:nomes AS regclass[]))"),
+        {"nomes": nomes},
+    ).all())
+    return {nome: max(0, int(linhas.get(nome, 0))) for nome in nomes}
+
+
+def apagar_tabelas(db: Session) -> dict:
+    """
+    Remove TODOS os dados com DELETE tabela por tabela em uma transação
+
+    Returns:
+        dict: Quantidade de registros removidos por tabela
+    """
+    removidos = {model.__tablename__: db.query(model).delete() for model in TABELAS}
+    db.commit()
+    return removidos
+
+
+def truncar_tabelas(db: Session) -> dict:
+    """
+    Remove TODOS os dados com TRUNCATE ... RESTART IDENTITY CASCADE
+
+    Em PostgreSQL é uma única instrução: não varre as linhas, não gera
+    tuplas mortas e reinicia as sequences. Em outros bancos (ex: SQLite)
+    cai para DELETE tabela por tabela (apagar_tabelas).
+
+    Returns:
+        dict: Registros removidos por tabela; no PostgreSQL é a estimativa
+        do planner, já que contar antes do TRUNCATE varreria cada tabela
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return apagar_tabelas(db)
+
+    removidos = estimar_registros(db)
+    nomes = ", ".join(removidos)
+    db.execute(text(f"TRUNCATE TABLE {nomes} RESTART IDENTITY CASCADE"))
+    db.commit()
+    return removidos
+
+
+def expurgar_usuario(
+    db: Session,
+    id_usuario: int,
+    tamanho_lote: int = TAMANHO_LOTE_PADRAO,
+    progresso: Optional[Callable] = None
+) -> dict:
+    """
+    Remove um usuário e todos os seus dados em lotes limitados
+
+    Cada lote é uma transação curta (commit após cada DELETE), então os
+    locks nunca ficam presos por muito tempo em um banco compartilhado.
+    progresso(percentual, mensagem) é chamado ao terminar cada tabela.
+
+    Returns:
+        dict: Quantidade de registros removidos por tabela
+
+    Raises:
+        ValueError: tamanho_lote menor que 1 (o laço nunca terminaria)
+    """
+    if tamanho_lote < 1:
+        raise ValueError(f"tamanho_lote deve ser >= 1 (recebido {tamanho_lote})")
+
+    removidos = {}
+
+    for model in TABELAS:
+        pk = model.__table__.primary_key.columns.values()[0]
+        tabela = model.__tablename__
+        total = 0
+
+        while True:
+            resultado = db.execute(
+                text(
+                    f"DELETE FROM {tabela} WHERE {pk.name} IN ("
+                    f"SELECT {pk.name} FROM {tabela} WHERE id_usuario = :id_usuario LIMIT :limite)"
+                ),
+                {"id_usuario": id_usuario, "limite": tamanho_lote},
+            )
+            db.commit()
+            total += resultado.rowcount
+            if resultado.rowcount < tamanho_lote:
+                break
+
+        removidos[tabela] = total
+        if progresso is not None:
+            progresso(100 * len(removidos) // len(TABELAS), f"{tabela}: {total} removidos")
+
+    return removidos
@@ -0,0 +1,135 @@
+"""
+Módulo de Metadados do Usuário (cache de contas e categorias)
+Ids, nomes e tipos das contas e categorias mudam poucas vezes por mês, mas
+eram lidos do banco em toda inserção de transação (posse da conta e da
+categoria, tipo da categoria) e em toda listagem de categorias.
+O cache guarda esses metadados por usuário, em memória no worker:
+  - limitado a METADADOS_MAX_USUARIOS (descarta o usado há mais tempo)
+  - válido enquanto a versão do usuário não mudar (app/core/versoes.py): as
+    rotas de escrita de contas e categorias a incrementam na transação, então
+    uma escrita em qualquer worker invalida o cache de todos
+O cache só serve leituras: a inserção de transações valida conta, categoria
+e tipo no próprio comando de escrita.
+O saldo NÃO entra no cache: muda a cada transação.
+Acertos e faltas em /health/metadados.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core import versoes
+from app.core.cronometro import RespostaJSONCronometrada
+from app.models.conta import Conta
+from app.models.categoria import Categoria
+
+# Usuários mantidos em cache por worker
+METADADOS_MAX_USUARIOS = int(os.getenv("METADADOS_MAX_USUARIOS", "10000"))
+
+# Colunas guardadas (as de ContaResponse e CategoriaResponse, menos o saldo)
+COLUNAS_CONTA = (Conta.nome, Conta.tipo, Conta.id_conta, Conta.id_usuario)
+COLUNAS_CATEGORIA = (Categoria.nome, Categoria.tipo, Categoria.id_categoria, Categoria.id_usuario)
+
+
+class Metadados:
+    """Contas e categorias de um usuário: id -> dict das colunas, em ordem de id"""
+
+    __slots__ = ("contas", "categorias", "versao")
+
+    def __init__(self, contas: dict, categorias: dict, versao: tuple):
+        self.contas = contas
+        self.categorias = categorias
+        self.versao = versao
+
+
+class CacheMetadados:
+    """Cache LRU de Metadados por usuário (seguro entre threads)"""
+
+    def __init__(self, maximo: int = METADADOS_MAX_USUARIOS):
+        self.maximo = maximo
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+        self.desatualizados = 0
+        self.descartes = 0
+
+    def obter(self, db: Session, id_usuario: int) -> Metadados:
+        """Metadados do usuário (do cache, se a versão não mudou, ou carregados do banco)"""
+        # Lida antes da carga: uma escrita concorrente muda a versão e a próxima leitura recarrega
+        versao = versoes.ler(db, id_usuario, "metadados")
+        with self._lock:
+            item = self._itens.get(id_usuario)
+            if item is not None and item.versao == versao:
+                self._itens.move_to_end(id_usuario)
+                self.acertos += 1
+                return item
+            self.faltas += 1
+            if item is not None:
+                self.desatualizados += 1
+
+        item = _carregar(db, id_usuario, versao)
+
+        with self._lock:
+            atual = self._itens.get(id_usuario)
+            # Não troca por uma carga mais antiga que terminou depois
+            if atual is None or all(nova >= antiga for nova, antiga in zip(versao, atual.versao)):
+                self._itens[id_usuario] = item
+                self._itens.move_to_end(id_usuario)
+                while len(self._itens) > self.maximo:
+                    self._itens.popitem(last=False)
+                    self.descartes += 1
+        return item
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            consultas = self.acertos + self.faltas
+            return {
+                "usuarios": len(self._itens),
+                "maximo": self.maximo,
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+                "taxa_acerto": round(self.acertos / consultas, 4) if consultas else None,
+                "desatualizados": self.desatualizados,
+                "descartes": self.descartes,
+            }
+
+
+def _carregar(db: Session, id_usuario: int, versao: tuple) -> Metadados:
+    contas = db.execute(
+        select(*COLUNAS_CONTA).where(Conta.id_usuario == id_usuario).order_by(Conta.id_conta)
+    ).mappings().all()
+    categorias = db.execute(
+        select(*COLUNAS_CATEGORIA).where(Categoria.id_usuario == id_usuario).order_by(Categoria.id_categoria)
+    ).mappings().all()
+    return Metadados(
+        {linha["id_conta"]: dict(linha) for linha in contas},
+        {linha["id_categoria"]: dict(linha) for linha in categorias},
+        versao,
+    )
+
+
+metadados = CacheMetadados()
+
+
+def obter_metadados(db: Session, id_usuario: int) -> Metadados:
+    return metadados.obter(db, id_usuario)
+
+
+def invalidar_metadados(db: Session, id_usuario: Optional[int] = None) -> None:
+    """
+    Invalida os metadados do usuário (ou de todos, sem id_usuario) em todos
+    os workers: incrementa a versão na transação da escrita (antes do commit)
+    """
+    versoes.marcar(db, id_usuario, "metadados")
+
+
+def resposta_do_cache(registros, projecao) -> RespostaJSONCronometrada:
+    """Resposta JSON das listagens montada a partir dos dicts do cache (sem consulta)"""
+    nomes = projecao.nomes
+    return RespostaJSONCronometrada(
+        content=projecao.serializar([tuple(registro[nome] for nome in nomes) for registro in registros])
+    )
@@ -0,0 +1,68 @@
+"""
+Migração e Verificação do Banco de Dados
+Passo explícito de deploy: cria as tabelas ou verifica se o schema existe.
+Não é executado ao importar a aplicação.
+
+Uso:
+    python -m app.core.migracao            # cria as tabelas que faltam
+    python -m app.core.migracao --check    # apenas verifica (exit 1 se faltar algo)
+"""
+import sys
+from sqlalchemy import inspect
+
+from app.core.database import engine, Base
+import app.models  # noqa: F401 - registra os modelos no metadata
+
+
+def criar_tabelas() -> None:
+    """Cria as tabelas (e índices) que ainda não existem"""
+    Base.metadata.create_all(bind=engine)
+    criar_indices()
+
+
+def criar_indices() -> list:
+    """
+    Cria os índices declarados nos modelos que faltam em tabelas já existentes
+    (create_all só cria os índices junto com a tabela) e recria os que
+    existem com outras colunas (índice estendido no modelo)
+
+    Returns:
+        list: Nomes dos índices criados ou recriados
+    """
+    inspetor = inspect(engine)
+    criados = []
+    for tabela in Base.metadata.sorted_tables:
+        existentes = {indice["name"]: indice["column_names"] for indice in inspetor.get_indexes(tabela.name)}
+        for indice in tabela.indexes:
+            colunas = [coluna.name for coluna in indice.columns]
+            if existentes.get(indice.name) == colunas:
+                continue
+            if indice.name in existentes:
+                indice.drop(bind=engine)
+            indice.create(bind=engine)
+            criados.append(indice.name)
+    return criados
+
+
+def verificar_tabelas() -> list:
+    """
+    Verifica se todas as tabelas dos modelos existem no banco
+
+    Returns:
+        list: Nomes das tabelas que estão faltando
+    """
+    existentes = set(inspect(engine).get_table_names())
+    return [nome for nome in Base.metadata.tables if nome not in existentes]
+
+
+if __name__ == "__main__":
+    if "--check" in sys.argv:
+        faltando = verificar_tabelas()
+        if faltando:
+            print(f"❌ Tabelas faltando: {', '.join(faltando)}")
+            sys.exit(1)
+        print("✅ Schema do banco está completo")
+        sys.exit(0)
+
+    criar_tabelas()
+    print("✅ Tabelas criadas/verificadas")
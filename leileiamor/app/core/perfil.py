@@ -0,0 +1,209 @@
+"""
+Módulo de Captura de Perfil por Requisição
+Um administrador pode pedir que UMA requisição específica seja executada sob
+o profiler com a query ?profile=1 e o header X-Profile-Token com o valor
+de PROFILER_TOKEN (ex: GET /transacoes/?profile=1).
+O resultado vai para um arquivo .pstats em PROFILER_DIRETORIO
+(abrir com `python -m pstats arquivo` ou `snakeviz arquivo`).
+
+- Sem PROFILER_TOKEN configurado a captura fica desligada
+- No máximo PROFILER_MAX_CONCORRENTES capturas ao mesmo tempo (as demais
+  requisições seguem normalmente, sem perfil)
+- Só os PROFILER_MAX_ARQUIVOS arquivos mais recentes são mantidos
+- Só código síncrono é medido (rotas `def`, no threadpool): em uma rota
+  `async def` o profiler da thread do event loop mediria também as
+  corrotinas das outras requisições. Sem nada medido não há arquivo e o
+  header X-Profile vem como "assincrona"
+"""
+import cProfile
+import functools
+import hmac
+import inspect
+import os
+import re
+import tempfile
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+from urllib.parse import parse_qs
+
+from fastapi import Header, HTTPException, status
+from starlette.datastructures import MutableHeaders
+
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN", "")
+PROFILER_DIRETORIO = os.getenv(
+    "PROFILER_DIRETORIO", os.path.join(tempfile.gettempdir(), "leileiamor-perfis")
+)
+PROFILER_MAX_CONCORRENTES = int(os.getenv("PROFILER_MAX_CONCORRENTES", "2"))
+PROFILER_MAX_ARQUIVOS = int(os.getenv("PROFILER_MAX_ARQUIVOS", "50"))
+
+EXTENSAO = ".pstats"
+
+# Valor do header X-Profile quando a requisição não executou código perfilável
+SEM_CAPTURA = "assincrona"
+
+# Profiler da requisição atual (None = requisição sem captura)
+_perfil = ContextVar("perfil", default=None)
+
+_vagas = threading.BoundedSemaphore(PROFILER_MAX_CONCORRENTES)
+
+
+def token_valido(token: Optional[str]) -> bool:
+    return bool(PROFILER_TOKEN) and token is not None and hmac.compare_digest(token, PROFILER_TOKEN)
+
+
+def exigir_admin(x_profile_token: Optional[str] = Header(None)) -> None:
+    """Dependência das rotas de perfis: exige o header X-Profile-Token"""
+    if not token_valido(x_profile_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acesso restrito a administradores"
+        )
+
+
+# ============================================================================
+# CAPTURA
+# ============================================================================
+
+class Perfil(cProfile.Profile):
+    """Profiler da requisição; capturado indica se algum código foi medido"""
+    capturado = False
+
+
+def perfilar_endpoint(endpoint):
+    """
+    Envolve o endpoint para rodar sob o profiler quando a requisição pediu captura
+    O profiler é ligado na thread que executa o endpoint (rotas síncronas
+    rodam no threadpool), então só o trabalho desta requisição é medido
+    Corrotinas voltam sem mudança: a thread delas é a do event loop, compartilhada.
+    A parte síncrona de uma rota async pode ser envolvida e chamada com run_in_threadpool
+    """
+    if inspect.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    def endpoint_perfilado(*args, **kwargs):
+        perfil = _perfil.get()
+        if perfil is None:
+            return endpoint(*args, **kwargs)
+        perfil.capturado = True
+        perfil.enable()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            perfil.disable()
+
+    return endpoint_perfilado
+
+
+def _nome_arquivo(metodo: str, caminho: str) -> str:
+    rota = re.sub(r"[^A-Za-z0-9]+", "_", caminho).strip("_") or "raiz"
+    return f"{datetime.utcnow():%Y%m%dT%H%M%S%f}_{metodo}_{rota}{EXTENSAO}"
+
+
+def _rotacionar() -> None:
+    """Mantém apenas os PROFILER_MAX_ARQUIVOS arquivos mais recentes"""
+    arquivos = sorted(
+        (nome for nome in os.listdir(PROFILER_DIRETORIO) if nome.endswith(EXTENSAO)),
+        reverse=True,
+    )
+    for nome in arquivos[PROFILER_MAX_ARQUIVOS:]:
+        try:
+            os.remove(os.path.join(PROFILER_DIRETORIO, nome))
+        except FileNotFoundError:
+            pass
+
+
+def salvar_perfil(perfil: cProfile.Profile, nome: str) -> None:
+    os.makedirs(PROFILER_DIRETORIO, exist_ok=True)
+    perfil.dump_stats(os.path.join(PROFILER_DIRETORIO, nome))
+    _rotacionar()
+
+
+def listar_perfis() -> list:
+    """Capturas mais recentes primeiro"""
+    if not os.path.isdir(PROFILER_DIRETORIO):
+        return []
+    perfis = []
+    for nome in sorted(os.listdir(PROFILER_DIRETORIO), reverse=True):
+        if not nome.endswith(EXTENSAO):
+            continue
+        info = os.stat(os.path.join(PROFILER_DIRETORIO, nome))
+        perfis.append({
+            "arquivo": nome,
+            "tamanho": info.st_size,
+            "criado_em": datetime.utcfromtimestamp(info.st_mtime).isoformat(),
+        })
+    return perfis
+
+
+def caminho_perfil(nome: str) -> Optional[str]:
+    """Caminho do arquivo de captura (None se não existir ou o nome for inválido)"""
+    if os.path.basename(nome) != nome or not nome.endswith(EXTENSAO):
+        return None
+    caminho = os.path.join(PROFILER_DIRETORIO, nome)
+    return caminho if os.path.isfile(caminho) else None
+
+
+# ============================================================================
+# MIDDLEWARE
+# ============================================================================
+
+class PerfilMiddleware:
+    """
+    Middleware ASGI que ativa a captura com ?profile=1 e X-Profile-Token válido
+    A resposta informa o arquivo gerado no header X-Profile (ou "ocupado"
+    quando o limite de capturas simultâneas foi atingido, ou SEM_CAPTURA
+    quando a rota não executou código síncrono perfilado)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not PROFILER_TOKEN
+            or parse_qs(scope["query_string"].decode("latin-1")).get("profile") != ["1"]
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        token = dict(scope["headers"]).get(b"x-profile-token")
+        if token is None or not token_valido(token.decode("latin-1")):
+            await self.app(scope, receive, send)
+            return
+
+        if not _vagas.acquire(blocking=False):
+            await self.app(scope, receive, self._com_header(send, lambda: "ocupado"))
+            return
+
+        perfil = Perfil()
+        contexto = _perfil.set(perfil)
+        nome = _nome_arquivo(scope["method"], scope["path"])
+        inicio = time.perf_counter()
+        try:
+            await self.app(
+                scope, receive, self._com_header(send, lambda: nome if perfil.capturado else SEM_CAPTURA)
+            )
+        finally:
+            _perfil.reset(contexto)
+            try:
+                if perfil.capturado:
+                    salvar_perfil(perfil, nome)
+                    print(f"🔬 Perfil salvo: {nome} ({(time.perf_counter() - inicio) * 1000:.1f} ms)")
+                else:
+                    print(f"🔬 Perfil não capturado: {scope['method']} {scope['path']} é assíncrona")
+            finally:
+                _vagas.release()
+
+    @staticmethod
+    def _com_header(send, valor):
+        """valor() é lido no início da resposta, quando o endpoint já executou"""
+        async def send_com_header(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Profile", valor())
+            await send(message)
+        return send_com_header
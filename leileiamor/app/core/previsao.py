@@ -0,0 +1,238 @@
+"""
+Módulo de Previsão de Saldo
+Aprende receitas e despesas recorrentes por categoria a partir do histórico
+de transações e projeta o saldo de todas as contas do usuário
+A previsão fica em cache por worker (LRU) enquanto a versão "previsao" do
+usuário não mudar (app/core/versoes.py): as escritas de transações e contas
+a incrementam na própria transação, então valem para todos os workers.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import Float, case, cast, select
+from sqlalchemy.orm import Session
+
+from app.core import versoes
+from app.core.database import SessionLocal
+from app.models.usuario import Usuario
+from app.models.conta import Conta
+from app.models.transacao import Transacao
+
+# Quantidade de meses projetados à frente
+HORIZONTE_MESES = 12
+
+# Quantidade de meses completos de histórico usados no aprendizado
+JANELA_HISTORICO_MESES = 12
+
+# Fração mínima de meses com lançamento para a categoria ser considerada recorrente
+LIMIAR_RECORRENCIA = 0.5
+
+# Tempo máximo (segundos) que uma previsão fica em cache (a virada do mês muda a projeção)
+CACHE_TTL_SEGUNDOS = 3600
+
+# Usuários com previsão em cache por worker (descarta a usada há mais tempo)
+PREVISAO_MAX_USUARIOS = int(os.getenv("PREVISAO_MAX_USUARIOS", "1000"))
+
+_cache = OrderedDict()  # id_usuario -> (versao, instante, previsoes)
+_cache_lock = threading.Lock()
+
+
+def _meses_str(meses: np.ndarray) -> list:
+    return np.datetime_as_string(meses, unit="M").tolist()
+
+
+def prever_usuario(db: Session, id_usuario: int, hoje: Optional[date] = None) -> dict:
+    """
+    Projeta o saldo de TODAS as contas do usuário em uma única passada NumPy
+
+    Para cada par (conta, categoria) soma os lançamentos de cada mês da
+    janela de histórico. Categorias presentes em pelo menos
+    LIMIAR_RECORRENCIA dos meses são recorrentes e entram na variação
+    mensal pela média; as esporádicas são ignoradas.
+
+    Returns:
+        dict: Previsão por id_conta
+    """
+    hoje = hoje or date.today()
+    mes_atual = np.datetime64(hoje, "M")
+    fim_historico = mes_atual - 1
+    inicio_historico = mes_atual - JANELA_HISTORICO_MESES
+
+    contas = db.execute(
+        select(Conta.id_conta, cast(Conta.saldo, Float))
+        .where(Conta.id_usuario == id_usuario)
+        .order_by(Conta.id_conta)
+    ).all()
+    if not contas:
+        return {}
+
+    ids_contas = np.array([c[0] for c in contas], dtype=np.int64)
+    saldos = np.array([c[1] or 0.0 for c in contas], dtype=np.float64)
+
+    valor_com_sinal = case(
+        (Transacao.tipo == "receita", cast(Transacao.valor, Float)),
+        else_=-cast(Transacao.valor, Float),
+    )
+    linhas = db.execute(
+        select(Transacao.data, valor_com_sinal, Transacao.id_conta, Transacao.id_categoria)
+        .where(
+            Transacao.id_usuario == id_usuario,
+            Transacao.data >= inicio_historico.astype("datetime64[D]").item(),
+            Transacao.data < mes_atual.astype("datetime64[D]").item(),
+        )
+    ).all()
+
+    n_contas = len(ids_contas)
+    if linhas:
+        datas, valores, contas_t, categorias_t = zip(*linhas)
+        meses_t = np.array(datas, dtype="datetime64[D]").astype("datetime64[M]")
+        valores = np.fromiter(valores, dtype=np.float64, count=len(linhas))
+        ids_categorias, categoria_i = np.unique(np.asarray(categorias_t, dtype=np.int64), return_inverse=True)
+        conta_i = np.searchsorted(ids_contas, np.asarray(contas_t, dtype=np.int64))
+
+        # Histórico começa no primeiro mês com lançamento (usuários novos)
+        inicio = meses_t.min()
+        n_meses = int((fim_historico - inicio).astype(np.int64)) + 1
+        mes_i = (meses_t - inicio).astype(np.int64)
+
+        n_categorias = len(ids_categorias)
+        indice = (conta_i * n_categorias + categoria_i) * n_meses + mes_i
+        tamanho = n_contas * n_categorias * n_meses
+        formato = (n_contas, n_categorias, n_meses)
+
+        totais = np.bincount(indice, weights=valores, minlength=tamanho).reshape(formato)
+        ocorrencias = np.bincount(indice, minlength=tamanho).reshape(formato)
+
+        frequencia = (ocorrencias > 0).mean(axis=2)
+        media_mensal = totais.mean(axis=2)
+        recorrente = frequencia >= LIMIAR_RECORRENCIA
+        por_categoria = np.where(recorrente, media_mensal, 0.0)
+    else:
+        ids_categorias = np.empty(0, dtype=np.int64)
+        por_categoria = np.zeros((n_contas, 0))
+
+    variacao_mensal = por_categoria.sum(axis=1)
+
+    # Projeção: matriz (contas x meses)
+    passos = np.arange(1, HORIZONTE_MESES + 1)
+    projecao = saldos[:, None] + variacao_mensal[:, None] * passos
+    meses_futuros = _meses_str(mes_atual + passos)
+    negativo = projecao < 0
+    primeiro_negativo = np.where(negativo.any(axis=1), negativo.argmax(axis=1), -1)
+
+    previsoes = {}
+    for i, id_conta in enumerate(ids_contas.tolist()):
+        recorrentes = np.nonzero(por_categoria[i])[0]
+        previsoes[id_conta] = {
+            "id_conta": id_conta,
+            "saldo_atual": round(float(saldos[i]), 2),
+            "variacao_mensal": round(float(variacao_mensal[i]), 2),
+            "meses": meses_futuros,
+            "saldos": np.round(projecao[i], 2).tolist(),
+            "mes_negativo": meses_futuros[primeiro_negativo[i]] if primeiro_negativo[i] >= 0 else None,
+            "categorias_recorrentes": [
+                {
+                    "id_categoria": int(ids_categorias[j]),
+                    "valor_mensal": round(float(por_categoria[i, j]), 2),
+                }
+                for j in recorrentes
+            ],
+        }
+    return previsoes
+
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+def obter_previsao(db: Session, id_usuario: int) -> dict:
+    """Retorna a previsão do usuário a partir do cache, recalculando se necessário"""
+    # Lida antes do cálculo: uma escrita concorrente muda a versão e a próxima leitura recalcula
+    versao = versoes.ler(db, id_usuario, "previsao")
+    agora = time.monotonic()
+    with _cache_lock:
+        item = _cache.get(id_usuario)
+        if item and item[0] == versao and agora - item[1] < CACHE_TTL_SEGUNDOS:
+            _cache.move_to_end(id_usuario)
+            return item[2]
+
+    previsoes = prever_usuario(db, id_usuario)
+    gerado_em = datetime.utcnow().isoformat()
+    for previsao in previsoes.values():
+        previsao["gerado_em"] = gerado_em
+
+    with _cache_lock:
+        _cache[id_usuario] = (versao, agora, previsoes)
+        _cache.move_to_end(id_usuario)
+        while len(_cache) > PREVISAO_MAX_USUARIOS:
+            _cache.popitem(last=False)
+    return previsoes
+
+
+def invalidar_previsao(db: Session, id_usuario: Optional[int] = None) -> None:
+    """
+    Invalida a previsão do usuário (ou de todos) em todos os workers
+    Chamar na transação que altera transações ou contas, antes do commit
+    """
+    versoes.marcar(db, id_usuario, "previsao")
+
+
+# ============================================================================
+# MODO LOTE (TODOS OS USUÁRIOS)
+# ============================================================================
+
+def _prever_lote(ids_usuarios: list) -> dict:
+    db = SessionLocal()
+    try:
+        return {id_usuario: prever_usuario(db, id_usuario) for id_usuario in ids_usuarios}
+    finally:
+        db.close()
+
+
+def prever_todos_usuarios(max_workers: Optional[int] = None, tamanho_lote: int = 100) -> dict:
+    """
+    Executa a projeção para todos os usuários usando um pool de processos
+
+    Cada processo abre a própria sessão e calcula um lote de usuários
+    (o pool herdado do pai é descartado pelo hook de fork do database).
+
+    Returns:
+        dict: Previsões indexadas por id_usuario e id_conta
+    """
+    db = SessionLocal()
+    try:
+        ids = [id_usuario for (id_usuario,) in db.query(Usuario.id_usuario).order_by(Usuario.id_usuario)]
+    finally:
+        db.close()
+
+    lotes = [ids[i:i + tamanho_lote] for i in range(0, len(ids), tamanho_lote)]
+    resultados = {}
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        for parcial in pool.map(_prever_lote, lotes):
+            resultados.update(parcial)
+
+    return resultados
+
+
+if __name__ == "__main__":
+    inicio = time.perf_counter()
+    resultados = prever_todos_usuarios()
+    duracao = time.perf_counter() - inicio
+
+    em_risco = [
+        (id_usuario, previsao["id_conta"], previsao["mes_negativo"])
+        for id_usuario, contas in resultados.items()
+        for previsao in contas.values()
+        if previsao["mes_negativo"]
+    ]
+
+    print(f"✅ {len(resultados)} usuários projetados em {duracao:.2f}s")
+    for id_usuario, id_conta, mes in em_risco:
+        print(f"   ⚠️ Usuário {id_usuario}, conta {id_conta}: saldo negativo em {mes}")
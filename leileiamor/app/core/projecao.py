@@ -0,0 +1,166 @@
+"""
+Módulo de Projeção para Listagens
+Caminho de leitura das rotas de listagem sem ORM: seleciona apenas as
+colunas da resposta como linhas simples (Core) e serializa direto para JSON.
+Evita o identity map, a instrumentação de atributos e a segunda passada de
+validação (from_attributes) do response_model em cada linha.
+A saída é idêntica à do schema de resposta: mesma ordem de campos,
+Decimal como string e datas em ISO 8601.
+
+?fields=id_transacao,valor,data restringe a projeção: só essas colunas
+entram no SELECT e na resposta. Os campos permitidos são os do schema.
+
+?ids=1,2,3 (multi-get) busca vários registros em uma única consulta IN,
+restrita ao usuário: {"itens": [...], "ausentes": [ids não encontrados]}.
+"""
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from typing import List, Optional
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.cronometro import RespostaJSONCronometrada
+from app.models.conta import Conta
+from app.models.categoria import Categoria
+from app.models.transacao import Transacao
+
+
+# Máximo de ids por requisição no multi-get
+MULTI_GET_MAXIMO = int(os.getenv("MULTI_GET_MAXIMO", "100"))
+
+
+def ler_ids(texto: str) -> List[int]:
+    """
+    Ids distintos de "1,2,3", na ordem em que aparecem
+    Lança ValueError se algum não for inteiro positivo ou se passar do máximo
+    """
+    erro = "ids deve ser uma lista de inteiros positivos separados por vírgula"
+    try:
+        ids = list(dict.fromkeys(int(parte) for parte in texto.split(",") if parte.strip()))
+    except ValueError:
+        raise ValueError(erro)
+    if not ids or any(i <= 0 for i in ids):
+        raise ValueError(erro)
+    if len(ids) > MULTI_GET_MAXIMO:
+        raise ValueError(f"No máximo {MULTI_GET_MAXIMO} ids por requisição")
+    return ids
+
+
+def ids_do_parametro(
+    ids: Optional[str] = Query(None, description="Multi-get: ids separados por vírgula")
+) -> Optional[List[int]]:
+    """Dependência das rotas de listagem: ?ids= -> lista de ids (400 se inválida)"""
+    if ids is None:
+        return None
+    try:
+        return ler_ids(ids)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+def _isoformat(valor):
+    return valor.isoformat()
+
+
+def _conversor(coluna):
+    """Conversão para JSON do tipo Python da coluna (None = já é nativo)"""
+    tipo = coluna.type.python_type
+    if tipo is Decimal:
+        return str
+    if tipo in (date, datetime):
+        return _isoformat
+    return None
+
+
+class Projecao:
+    """Conjunto de colunas de uma resposta e sua serialização"""
+
+    def __init__(self, *colunas):
+        self.colunas = colunas
+        self.nomes = tuple(coluna.key for coluna in colunas)
+        self.conversoes = tuple(
+            (coluna.key, _conversor(coluna)) for coluna in colunas if _conversor(coluna)
+        )
+        self._recortes = {}
+
+    def campos(self, fields: Optional[str]) -> "Projecao":
+        """
+        Projeção só com os campos pedidos (separados por vírgula), na ordem da resposta
+        Lança ValueError se algum campo não estiver entre os da projeção
+        """
+        if fields is None:
+            return self
+        pedidos = frozenset(campo.strip() for campo in fields.split(",") if campo.strip())
+        invalidos = pedidos.difference(self.nomes)
+        if invalidos or not pedidos:
+            raise ValueError(
+                f"Campos inválidos: {', '.join(sorted(invalidos)) or '(vazio)'}. "
+                f"Permitidos: {', '.join(self.nomes)}"
+            )
+        if pedidos not in self._recortes:
+            self._recortes[pedidos] = Projecao(*(c for c in self.colunas if c.key in pedidos))
+        return self._recortes[pedidos]
+
+    def do_parametro(
+        self,
+        fields: Optional[str] = Query(None, description="Campos da resposta, separados por vírgula")
+    ) -> "Projecao":
+        """Dependência das rotas: ?fields= -> projeção (400 se houver campo inválido)"""
+        try:
+            return self.campos(fields)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    def select(self):
+        return select(*self.colunas)
+
+    def serializar(self, linhas) -> list:
+        nomes = self.nomes
+        itens = [dict(zip(nomes, linha)) for linha in linhas]
+        for nome, converter in self.conversoes:
+            for item in itens:
+                valor = item[nome]
+                if valor is not None:
+                    item[nome] = converter(valor)
+        return itens
+
+    def resposta(self, db: Session, stmt) -> RespostaJSONCronometrada:
+        """Executa a consulta e devolve a resposta JSON (sem passar pelo response_model)"""
+        return RespostaJSONCronometrada(content=self.serializar(db.execute(stmt)))
+
+    def item(self, linha) -> RespostaJSONCronometrada:
+        """Resposta JSON de uma única linha (rotas de detalhe)"""
+        return RespostaJSONCronometrada(content=self.serializar([linha])[0])
+
+    def varios(self, db: Session, chave, ids: List[int], *filtros) -> RespostaJSONCronometrada:
+        """
+        Multi-get: registros com `chave` em `ids` (e os filtros de posse) em uma consulta
+        Itens na ordem dos ids; os não encontrados (ou de outro usuário) vão em "ausentes"
+        """
+        linhas = db.execute(
+            select(*self.colunas, chave.label("_chave")).where(chave.in_(ids), *filtros)
+        ).all()
+        por_id = {linha[-1]: linha for linha in linhas}
+        encontrados = [por_id[i] for i in ids if i in por_id]
+        return RespostaJSONCronometrada(content={
+            "itens": self.serializar(encontrados),
+            "ausentes": [i for i in ids if i not in por_id],
+        })
+
+
+# Colunas na ordem dos campos de ContaResponse, CategoriaResponse e TransacaoResponse
+PROJECAO_CONTA = Projecao(
+    Conta.nome, Conta.saldo, Conta.tipo, Conta.id_conta, Conta.id_usuario
+)
+
+PROJECAO_CATEGORIA = Projecao(
+    Categoria.nome, Categoria.tipo, Categoria.id_categoria, Categoria.id_usuario
+)
+
+PROJECAO_TRANSACAO = Projecao(
+    Transacao.valor, Transacao.data, Transacao.descricao, Transacao.tipo,
+    Transacao.id_conta, Transacao.id_categoria, Transacao.id_transacao, Transacao.id_usuario
+)
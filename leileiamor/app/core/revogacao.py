@@ -0,0 +1,283 @@
+"""
+Módulo de Revogação de Tokens (logout)
+No modo sem estado (AUTH_STATELESS=1) o token traz id_usuario, nome e email
+e as rotas protegidas não leem a tabela usuario. Para que o logout continue
+valendo, cada worker mantém em memória as revogações da tabela token_revogado:
+  - tokens revogados (jti) em um filtro de Bloom: nunca deixa passar um token
+    revogado; um positivo é confirmado no banco (falsos positivos são raros,
+    REVOGACAO_FALSOS_POSITIVOS com até REVOGACAO_CAPACIDADE revogações)
+  - revogações por usuário e globais como instante de corte: tokens emitidos
+    (iat) antes do corte são recusados
+Uma thread por worker lê as revogações novas a cada REVOGACAO_INTERVALO
+segundos (revogações feitas em outro worker valem aqui depois desse atraso) e
+a cada REVOGACAO_RECARGA segundos apaga as expiradas e reconstrói o filtro.
+Estatísticas em /health/revogacao.
+"""
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.core.database import SessionLocal, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.models.token_revogado import TokenRevogado
+
+logger = logging.getLogger("leileiamor.revogacao")
+
+# Revogações previstas e taxa de falsos positivos do filtro (define o tamanho)
+REVOGACAO_CAPACIDADE = int(os.getenv("REVOGACAO_CAPACIDADE", "100000"))
+REVOGACAO_FALSOS_POSITIVOS = float(os.getenv("REVOGACAO_FALSOS_POSITIVOS", "0.001"))
+
+# Segundos entre as leituras de revogações novas e entre as recargas completas
+REVOGACAO_INTERVALO = float(os.getenv("REVOGACAO_INTERVALO", "2"))
+REVOGACAO_RECARGA = float(os.getenv("REVOGACAO_RECARGA", "600"))
+
+# A leitura incremental relê esta janela (s): cobre commits fora de ordem
+MARGEM_SINCRONIZACAO = 60
+
+TODOS = "todos"
+
+
+def chave_usuario(id_usuario: int) -> str:
+    return f"usuario:{id_usuario}"
+
+
+def _instante(momento: datetime) -> float:
+    """datetime UTC sem fuso (colunas) -> segundos desde a época (iat)"""
+    return momento.replace(tzinfo=timezone.utc).timestamp()
+
+
+class FiltroBloom:
+    """
+    Conjunto aproximado de strings: sem falsos negativos, falsos positivos
+    com a taxa pedida até `capacidade` itens
+    """
+
+    def __init__(self, capacidade: int, taxa: float):
+        self.tamanho = max(64, math.ceil(-capacidade * math.log(taxa) / math.log(2) ** 2))
+        self.funcoes = max(1, round(self.tamanho / capacidade * math.log(2)))
+        self.bits = bytearray((self.tamanho + 7) // 8)
+        self.itens = 0
+
+    def _posicoes(self, chave: str):
+        # Duplo hashing: k posições a partir de um único blake2b
+        resumo = hashlib.blake2b(chave.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(resumo[:8], "little")
+        h2 = int.from_bytes(resumo[8:], "little") | 1
+        return [(h1 + i * h2) % self.tamanho for i in range(self.funcoes)]
+
+    def adicionar(self, chave: str) -> None:
+        novo = False
+        for posicao in self._posicoes(chave):
+            mascara = 1 << (posicao & 7)
+            if not self.bits[posicao >> 3] & mascara:
+                self.bits[posicao >> 3] |= mascara
+                novo = True
+        if novo:  # Reaplicar a mesma chave (sincronização) não conta de novo
+            self.itens += 1
+
+    def __contains__(self, chave: str) -> bool:
+        bits = self.bits
+        return all(bits[posicao >> 3] & (1 << (posicao & 7)) for posicao in self._posicoes(chave))
+
+
+class Revogacoes:
+    """Revogações em memória no worker, sincronizadas com token_revogado"""
+
+    def __init__(self):
+        self._filtro = FiltroBloom(REVOGACAO_CAPACIDADE, REVOGACAO_FALSOS_POSITIVOS)
+        self._cortes = {}  # "usuario:<id>" ou "todos" -> instante do corte
+        self._visto = None  # maior revogado_em já lido do banco
+        self._lock = threading.Lock()
+        self._thread = None
+        self._parar = threading.Event()
+        self.sincronizado_em = None
+        self.confirmacoes = 0
+        self.falsos_positivos = 0
+        self.recusados = 0
+
+    # ==================== CONSULTA ====================
+
+    def revogado(self, payload: dict, id_usuario: Optional[int]) -> bool:
+        """O token (payload já validado) foi revogado?"""
+        if self._thread is None:
+            self._iniciar()
+
+        emitido = payload.get("iat", 0)  # tokens antigos, sem iat: qualquer corte os revoga
+        cortes = self._cortes
+        for chave in (TODOS, chave_usuario(id_usuario)):
+            corte = cortes.get(chave)
+            if corte is not None and emitido < corte:
+                self.recusados += 1
+                return True
+
+        jti = payload.get("jti")
+        if jti is None or jti not in self._filtro:
+            return False
+
+        # Positivo do filtro: só os revogados e os falsos positivos chegam ao banco
+        self.confirmacoes += 1
+        if _existe(jti):
+            self.recusados += 1
+            return True
+        self.falsos_positivos += 1
+        return False
+
+    # ==================== ATUALIZAÇÃO ====================
+
+    def aplicar(self, chave: str, revogado_em: datetime) -> None:
+        """Registra uma revogação (lida do banco ou recém-gravada neste worker)"""
+        with self._lock:
+            self._aplicar(self._filtro, self._cortes, chave, revogado_em)
+
+    @staticmethod
+    def _aplicar(filtro: FiltroBloom, cortes: dict, chave: str, revogado_em: datetime) -> None:
+        if chave == TODOS or chave.startswith("usuario:"):
+            cortes[chave] = max(cortes.get(chave, 0), _instante(revogado_em))
+        else:
+            filtro.adicionar(chave)
+
+    def recarregar(self, purgar: bool = False) -> None:
+        """Reconstrói filtro e cortes com as revogações não expiradas"""
+        db = SessionLocal()
+        try:
+            agora = datetime.utcnow()
+            if purgar:
+                db.execute(delete(TokenRevogado).where(TokenRevogado.expira_em < agora))
+                db.commit()
+            linhas = db.execute(
+                select(TokenRevogado.chave, TokenRevogado.revogado_em).where(TokenRevogado.expira_em >= agora)
+            ).all()
+        finally:
+            db.close()
+
+        # Dimensionado para o dobro do que existe se passar da capacidade configurada
+        filtro = FiltroBloom(max(REVOGACAO_CAPACIDADE, 2 * len(linhas)), REVOGACAO_FALSOS_POSITIVOS)
+        cortes = {}
+        for chave, revogado_em in linhas:
+            self._aplicar(filtro, cortes, chave, revogado_em)
+        visto = max((revogado_em for _, revogado_em in linhas), default=agora)
+
+        with self._lock:
+            self._filtro = filtro
+            self._cortes = cortes
+            self._visto = visto
+            self.sincronizado_em = time.time()
+        # Revogações gravadas durante a recarga entram na próxima sincronização
+
+    def sincronizar(self) -> None:
+        """Aplica as revogações gravadas desde a última leitura (por qualquer worker)"""
+        desde = self._visto - timedelta(seconds=MARGEM_SINCRONIZACAO)
+        db = SessionLocal()
+        try:
+            linhas = db.execute(
+                select(TokenRevogado.chave, TokenRevogado.revogado_em).where(TokenRevogado.revogado_em >= desde)
+            ).all()
+        finally:
+            db.close()
+
+        with self._lock:
+            for chave, revogado_em in linhas:
+                # Reaplicar é inofensivo (o mesmo bit, o mesmo corte)
+                self._aplicar(self._filtro, self._cortes, chave, revogado_em)
+                self._visto = max(self._visto, revogado_em)
+            self.sincronizado_em = time.time()
+
+    # ==================== THREAD DE SINCRONIZAÇÃO ====================
+
+    def _iniciar(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            iniciando = threading.Thread(target=self._executar, name="revogacao", daemon=True)
+            self._thread = iniciando
+        try:
+            # Carga inicial síncrona: nenhum token é aceito antes de conhecer as revogações
+            self.recarregar()
+        except Exception:
+            with self._lock:
+                self._thread = None
+            raise
+        iniciando.start()
+
+    def _executar(self) -> None:
+        proxima_recarga = time.monotonic() + REVOGACAO_RECARGA
+        while not self._parar.wait(REVOGACAO_INTERVALO):
+            try:
+                if time.monotonic() >= proxima_recarga:
+                    self.recarregar(purgar=True)
+                    proxima_recarga = time.monotonic() + REVOGACAO_RECARGA
+                else:
+                    self.sincronizar()
+            except Exception:
+                # Banco fora do ar: mantém o que já tem e tenta no próximo ciclo
+                logger.exception("Falha ao sincronizar as revogações de token")
+
+    def encerrar(self) -> None:
+        """Para a thread de sincronização (shutdown)"""
+        self._parar.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=5)
+
+    def estatisticas(self) -> dict:
+        filtro = self._filtro
+        return {
+            "sincronizando": self._thread is not None and self._thread.is_alive(),
+            "sincronizado_ha_segundos": round(time.time() - self.sincronizado_em, 3) if self.sincronizado_em else None,
+            "intervalo_segundos": REVOGACAO_INTERVALO,
+            "tokens_no_filtro": filtro.itens,
+            "filtro_bytes": len(filtro.bits),
+            "filtro_funcoes": filtro.funcoes,
+            "cortes": len(self._cortes),
+            "confirmacoes_no_banco": self.confirmacoes,
+            "falsos_positivos": self.falsos_positivos,
+            "recusados": self.recusados,
+        }
+
+
+def _existe(chave: str) -> bool:
+    db = SessionLocal()
+    try:
+        return db.execute(select(TokenRevogado.id_revogacao).where(TokenRevogado.chave == chave)).first() is not None
+    finally:
+        db.close()
+
+
+revogacoes = Revogacoes()
+
+
+# ==================== REVOGAÇÃO ====================
+
+def _gravar(db: Session, chave: str, expira_em: datetime) -> None:
+    agora = datetime.utcnow()
+    # Repetir a revogação (usuário ou todos) só avança o corte
+    db.execute(delete(TokenRevogado).where(TokenRevogado.chave == chave))
+    db.add(TokenRevogado(chave=chave, revogado_em=agora, expira_em=expira_em))
+    db.commit()
+    revogacoes.aplicar(chave, agora)
+
+
+def _fim_dos_tokens_atuais() -> datetime:
+    """Até quando vale um token emitido agora (depois disso o corte é inútil)"""
+    return datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+
+
+def revogar_token(db: Session, payload: dict) -> None:
+    """Revoga um token pelo jti (faz commit)"""
+    _gravar(db, payload["jti"], datetime.utcfromtimestamp(payload["exp"]))
+
+
+def revogar_usuario(db: Session, id_usuario: int) -> None:
+    """Revoga todos os tokens do usuário emitidos até agora (faz commit)"""
+    _gravar(db, chave_usuario(id_usuario), _fim_dos_tokens_atuais())
+
+
+def revogar_todos(db: Session) -> None:
+    """Revoga todos os tokens emitidos até agora (faz commit)"""
+    _gravar(db, TODOS, _fim_dos_tokens_atuais())
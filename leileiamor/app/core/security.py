@@ -2,20 +2,34 @@
 Módulo de Segurança e Autenticação - VERSÃO SIMPLIFICADA
 """
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
+import os
+import time
+import uuid
 import jwt
 from jwt.exceptions import InvalidTokenError
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 import hashlib
 
-from app.core.database import get_db, SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.core.database import get_db, SessionLocal, SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.core.cronometro import medir
+from app.core.revogacao import revogacoes
 from app.models.usuario import Usuario
 
+# Modo sem estado: o usuário autenticado vem das claims do token (id_usuario,
+# nome, email), sem ler a tabela usuario. Tokens emitidos antes do modo (sem
+# id_usuario) continuam aceitos pela busca no banco.
+AUTH_STATELESS = os.getenv("AUTH_STATELESS", "0") == "1"
+
 # Security scheme para JWT
 security = HTTPBearer()
 
+# Sem auto_error: /eventos também aceita o token na query string
+security_opcional = HTTPBearer(auto_error=False)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica se a senha corresponde ao hash usando SHA256"""
@@ -35,6 +49,22 @@ def get_password_hash(password: str) -> str:
     return hash_password(password)
 
 
+class UsuarioToken:
+    """Usuário autenticado montado das claims do token (modo sem estado)"""
+    
+    __slots__ = ("id_usuario", "nome", "email")
+    
+    def __init__(self, payload: dict):
+        self.id_usuario = payload["id_usuario"]
+        self.nome = payload.get("nome")
+        self.email = payload["sub"]
+
+
+def claims_do_usuario(usuario: Usuario) -> dict:
+    """Claims do token de acesso: o que as rotas usam do usuário autenticado"""
+    return {"sub": usuario.email, "id_usuario": usuario.id_usuario, "nome": usuario.nome}
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Cria token JWT"""
     to_encode = data.copy()
@@ -43,33 +73,97 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    # iat com fração de segundo: compara com os cortes de revogação (logout de todas as sessões)
+    # jti identifica o token no logout
+    to_encode.update({"exp": expire, "iat": time.time(), "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> Usuario:
-    """Obtém usuário atual do token JWT"""
-    credentials_exception = HTTPException(
+def _credenciais_invalidas(detail: str = "Credenciais inválidas") -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Credenciais inválidas",
+        detail=detail,
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+
+def _decodificar(token: str) -> dict:
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
+        with medir("jwt"):
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except InvalidTokenError:
-        raise credentials_exception
+        raise _credenciais_invalidas()
+    if payload.get("sub") is None:
+        raise _credenciais_invalidas()
+    return payload
+
+
+def _verificar_revogacao(payload: dict, id_usuario: int) -> None:
+    with medir("revogacao"):
+        revogado = revogacoes.revogado(payload, id_usuario)
+    if revogado:
+        raise _credenciais_invalidas("Token revogado")
+
+
+def autenticar(token: str, db: Session) -> Tuple[Usuario, dict]:
+    """Usuário e payload de um token válido e não revogado (401 caso contrário)"""
+    payload = _decodificar(token)
     
-    user = db.query(Usuario).filter(Usuario.email == email).first()
-    if user is None:
-        raise credentials_exception
+    if AUTH_STATELESS and "id_usuario" in payload:
+        user = UsuarioToken(payload)
+    else:
+        with medir("usuario"):
+            user = db.query(Usuario).filter(Usuario.email == payload["sub"]).first()
+        if user is None:
+            raise _credenciais_invalidas()
+    
+    _verificar_revogacao(payload, user.id_usuario)
+    return user, payload
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> Usuario:
+    """
+    Obtém usuário atual do token JWT
+    Com AUTH_STATELESS=1 devolve um UsuarioToken (id_usuario, nome, email) sem ir ao banco
+    """
+    user, _ = autenticar(credentials.credentials, db)
+    return user
+
+
+def _id_usuario_por_email(email: str) -> Optional[int]:
+    db = SessionLocal()
+    try:
+        return db.query(Usuario.id_usuario).filter(Usuario.email == email).scalar()
+    finally:
+        db.close()
+
+
+async def get_current_user_id_eventos(
+    token: Optional[str] = Query(None),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security_opcional)
+) -> int:
+    """
+    ID do usuário para conexões longas (SSE)
+    EventSource não envia headers: o token pode vir em ?token=
+    Não usa get_db: a sessão fecharia só no fim da conexão
+    """
+    token = credentials.credentials if credentials is not None else token
+    if not token:
+        raise _credenciais_invalidas()
+    payload = _decodificar(token)
+    
+    if AUTH_STATELESS and "id_usuario" in payload:
+        id_usuario = payload["id_usuario"]
+    else:
+        id_usuario = await run_in_threadpool(_id_usuario_por_email, payload["sub"])
+        if id_usuario is None:
+            raise _credenciais_invalidas()
     
-    return user
\ No newline at end of file
+    # Fora do event loop: a confirmação de um positivo do filtro consulta o banco
+    if await run_in_threadpool(revogacoes.revogado, payload, id_usuario):
+        raise _credenciais_invalidas("Token revogado")
+    return id_usuario
\ No newline at end of file
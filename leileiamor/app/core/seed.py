@@ -4,6 +4,7 @@ Módulo de Seed de Dados para Teste
 from sqlalchemy.orm import Session
 from datetime import date
 from decimal import Decimal
+from app.core import versoes
 from app.core.security import get_password_hash
 from app.models.usuario import Usuario
 from app.models.conta import Conta
@@ -166,6 +167,7 @@ def seed_database(db: Session) -> dict:
     # COMMIT FINAL - IMPORTANTE!
     # ========================================
     print("💾 Salvando no banco de dados...")
+    versoes.marcar_todas(db)  # Ids de usuários já vistos pelos workers antes da limpeza
     db.commit()
     print("✅ Commit realizado com sucesso!")
     
@@ -0,0 +1,133 @@
+"""
+Tarefas executadas pelos jobs (worker.py)
+Cada tarefa recebe (db, parametros, progresso) e devolve um dict JSON que
+vira o resultado do job. ErroDefinitivo encerra o job sem novas tentativas.
+"""
+import csv
+import os
+import time
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core import versoes
+from app.core.jobs import ErroDefinitivo, Progresso, tarefa
+from app.core.limpeza import TAMANHO_LOTE_PADRAO, apagar_tabelas, expurgar_usuario, truncar_tabelas
+from app.core.projecao import PROJECAO_TRANSACAO
+from app.core.revogacao import revogar_todos, revogar_usuario
+from app.core.seed import seed_database
+from app.models.transacao import Transacao
+
+# Pasta dos arquivos gerados pelas exportações (GET /jobs/{id}/arquivo).
+# Obrigatória para exportar: a API e o worker.py precisam enxergar a mesma
+# pasta (volume compartilhado), então não há padrão local
+JOBS_EXPORTACOES = os.getenv("JOBS_EXPORTACOES")
+
+# Horas que um arquivo exportado fica disponível; o worker.py apaga os mais antigos
+JOBS_EXPORTACOES_RETENCAO = float(os.getenv("JOBS_EXPORTACOES_RETENCAO", "24"))
+
+# Linhas por bloco na exportação (progresso a cada bloco)
+BLOCO_EXPORTACAO = 1000
+
+
+def pasta_exportacoes() -> str:
+    """
+    Pasta das exportações
+
+    Raises:
+        RuntimeError: JOBS_EXPORTACOES não configurada
+    """
+    if not JOBS_EXPORTACOES:
+        raise RuntimeError(
+            "JOBS_EXPORTACOES não configurada: defina a mesma pasta para a API e o worker.py"
+        )
+    return JOBS_EXPORTACOES
+
+
+def expurgar_exportacoes() -> int:
+    """Apaga as exportações com mais de JOBS_EXPORTACOES_RETENCAO horas; devolve quantas"""
+    if not JOBS_EXPORTACOES or not os.path.isdir(JOBS_EXPORTACOES):
+        return 0
+    limite = time.time() - JOBS_EXPORTACOES_RETENCAO * 3600
+    removidos = 0
+    for entrada in os.scandir(JOBS_EXPORTACOES):
+        # Só os arquivos gerados aqui (inclusive .parcial de tentativas interrompidas)
+        if not (entrada.is_file() and entrada.name.startswith("transacoes_")):
+            continue
+        try:
+            if entrada.stat().st_mtime < limite:
+                os.remove(entrada.path)
+                removidos += 1
+        except FileNotFoundError:
+            pass  # Outro processo apagou antes
+    return removidos
+
+
+@tarefa("seed")
+def tarefa_seed(db: Session, parametros: dict, progresso: Progresso) -> dict:
+    progresso(0, "Criando dados de teste")
+    try:
+        return seed_database(db)
+    except ValueError as e:
+        # Banco já populado: repetir não muda nada
+        raise ErroDefinitivo(str(e))
+
+
+@tarefa("limpar_dados")
+def tarefa_limpar_dados(db: Session, parametros: dict, progresso: Progresso) -> dict:
+    modo = parametros.get("modo", "truncate")
+    progresso(0, f"Limpando todas as tabelas ({modo})")
+    if modo == "truncate":
+        removidos = truncar_tabelas(db)
+    elif modo == "delete":
+        removidos = apagar_tabelas(db)
+    else:
+        raise ErroDefinitivo(f"Modo inválido: {modo}")
+    versoes.marcar_todas(db)
+    db.commit()
+    # A API sincroniza as revogações: tokens dos usuários apagados deixam de valer
+    revogar_todos(db)
+    return removidos
+
+
+@tarefa("expurgar_usuario")
+def tarefa_expurgar_usuario(db: Session, parametros: dict, progresso: Progresso) -> dict:
+    removidos = expurgar_usuario(
+        db, parametros["id_usuario"], parametros.get("tamanho_lote", TAMANHO_LOTE_PADRAO), progresso
+    )
+    versoes.marcar_todas(db, parametros["id_usuario"])
+    db.commit()
+    revogar_usuario(db, parametros["id_usuario"])
+    return removidos
+
+
+@tarefa("exportar_transacoes")
+def tarefa_exportar_transacoes(db: Session, parametros: dict, progresso: Progresso) -> dict:
+    """CSV com todas as transações do usuário, lido do banco em blocos"""
+    id_usuario = parametros["id_usuario"]
+    total = db.execute(select(func.count()).where(Transacao.id_usuario == id_usuario)).scalar()
+
+    try:
+        pasta = pasta_exportacoes()
+    except RuntimeError as e:
+        raise ErroDefinitivo(str(e))
+    os.makedirs(pasta, exist_ok=True)
+    nome = f"transacoes_{id_usuario}_{progresso.id_job}.csv"
+    caminho = os.path.join(pasta, nome)
+
+    stmt = PROJECAO_TRANSACAO.select().where(
+        Transacao.id_usuario == id_usuario
+    ).order_by(Transacao.data, Transacao.id_transacao).execution_options(yield_per=BLOCO_EXPORTACAO)
+
+    linhas = 0
+    with open(caminho + ".parcial", "w", newline="", encoding="utf-8") as arquivo:
+        escritor = csv.writer(arquivo)
+        escritor.writerow(PROJECAO_TRANSACAO.nomes)
+        for bloco in db.execute(stmt).partitions():
+            escritor.writerows(bloco)
+            linhas += len(bloco)
+            progresso(100 * linhas // max(total, 1), f"{linhas} de {total} transações")
+    # Só aparece com o nome final depois de completo (nova tentativa sobrescreve)
+    os.replace(caminho + ".parcial", caminho)
+
+    return {"arquivo": nome, "linhas": linhas}
@@ -0,0 +1,58 @@
+"""
+Módulo de Versões (invalidação dos caches entre workers)
+Cada worker do gunicorn tem os próprios caches em memória. Invalidar só o
+cache local deixava os outros workers servindo dados antigos até o TTL.
+As escritas incrementam a versão do usuário em versao_cache na mesma
+transação (marcar); quem lê o cache compara a versão guardada com a do
+banco (ler): uma consulta por chave primária no lugar das consultas dos
+dados, e nenhum worker serve o que já foi alterado e commitado.
+A versão global (id_usuario = 0) invalida todos os usuários (limpeza).
+Cada cache tem a própria coluna (metadados, previsao); remoção de usuário,
+limpeza e seed incrementam todas (marcar_todas).
+"""
+from typing import Optional, Tuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.versao_cache import VersaoCache
+
+GLOBAL = 0
+
+_VERSAO = VersaoCache.__table__
+
+# Uma coluna por cache
+COLUNAS = tuple(coluna.name for coluna in _VERSAO.columns if not coluna.primary_key)
+
+
+def marcar(db: Session, id_usuario: Optional[int], *colunas: str) -> None:
+    """
+    Incrementa as versões `colunas` do usuário (ou as globais, sem id_usuario)
+    Chamar na transação da escrita, antes do commit
+    """
+    chave = GLOBAL if id_usuario is None else id_usuario
+    incrementar = update(_VERSAO).where(_VERSAO.c.id_usuario == chave).values(
+        {coluna: _VERSAO.c[coluna] + 1 for coluna in colunas}
+    )
+    if db.execute(incrementar).rowcount:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(_VERSAO).values({"id_usuario": chave, **{coluna: 1 for coluna in colunas}}))
+    except IntegrityError:
+        # Outra requisição criou a linha antes
+        db.execute(incrementar)
+
+
+def marcar_todas(db: Session, id_usuario: Optional[int] = None) -> None:
+    """Invalida todos os caches do usuário (ou de todos): remoção, limpeza e seed"""
+    marcar(db, id_usuario, *COLUNAS)
+
+
+def ler(db: Session, id_usuario: int, coluna: str) -> Tuple[int, int]:
+    """Versão atual (global, do usuário); 0 enquanto não houve escrita"""
+    versoes = dict(db.execute(
+        select(_VERSAO.c.id_usuario, _VERSAO.c[coluna]).where(_VERSAO.c.id_usuario.in_((GLOBAL, id_usuario)))
+    ).all())
+    return versoes.get(GLOBAL, 0), versoes.get(id_usuario, 0)
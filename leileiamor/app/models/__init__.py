@@ -7,10 +7,20 @@ from app.models.usuario import Usuario
 from app.models.conta import Conta
 from app.models.categoria import Categoria
 from app.models.transacao import Transacao
+from app.models.idempotencia import ChaveIdempotencia
+from app.models.contagem import ContagemTransacoes
+from app.models.job import Job
+from app.models.token_revogado import TokenRevogado
+from app.models.versao_cache import VersaoCache
 
 __all__ = [
     "Usuario",
     "Conta",
     "Categoria",
     "Transacao",
+    "ChaveIdempotencia",
+    "ContagemTransacoes",
+    "Job",
+    "TokenRevogado",
+    "VersaoCache",
 ]
\ No newline at end of file
@@ -1,7 +1,7 @@
 """
 Modelo de Categoria (SQLAlchemy ORM)
 """
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
@@ -17,6 +17,8 @@ class Categoria(Base):
     tipo = Column(String, nullable=False)  # "receita" ou "despesa"
     id_usuario = Column(Integer, ForeignKey("usuario.id_usuario"), nullable=False)
     # ============================================================================
+
+    __table_args__ = (Index("ix_categoria_usuario", "id_usuario"),)
     
     # Relacionamentos
     usuario = relationship("Usuario", back_populates="categorias")
@@ -1,7 +1,7 @@
 """
 Modelo de Conta (SQLAlchemy ORM)
 """
-from sqlalchemy import Column, Integer, String, Numeric, ForeignKey
+from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
@@ -18,6 +18,8 @@ class Conta(Base):
     tipo = Column(String, nullable=False)  # Ex: "corrente", "poupança", "investimento"
     id_usuario = Column(Integer, ForeignKey("usuario.id_usuario"), nullable=False)
     # ============================================================================
+
+    __table_args__ = (Index("ix_conta_usuario", "id_usuario"),)
     
     # Relacionamentos
     usuario = relationship("Usuario", back_populates="contas")
@@ -0,0 +1,16 @@
+"""
+Modelo de Contagem de Transações (SQLAlchemy ORM)
+Total de transações por usuário, mantido pelas rotas de escrita
+(serve o total das listagens paginadas sem COUNT(*))
+"""
+from sqlalchemy import Column, Integer, ForeignKey
+from app.core.database import Base
+
+class ContagemTransacoes(Base):
+    __tablename__ = "contagem_transacoes"
+    
+    id_usuario = Column(Integer, ForeignKey("usuario.id_usuario", ondelete="CASCADE"), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<ContagemTransacoes(usuario={self.id_usuario}, total={self.total})>"
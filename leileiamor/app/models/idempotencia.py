@@ -0,0 +1,25 @@
+"""
+Modelo de Chave de Idempotência (SQLAlchemy ORM)
+Guarda a resposta de um POST para reenviá-la quando o cliente repete a requisição
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, UniqueConstraint
+from app.core.database import Base
+
+class ChaveIdempotencia(Base):
+    __tablename__ = "chave_idempotencia"
+    
+    # A unicidade (usuário, chave) é o que deduplica requisições concorrentes
+    __table_args__ = (
+        UniqueConstraint("id_usuario", "chave", name="uq_chave_idempotencia_usuario_chave"),
+    )
+    
+    id_chave = Column(Integer, primary_key=True, index=True)
+    id_usuario = Column(Integer, ForeignKey("usuario.id_usuario", ondelete="CASCADE"), nullable=False)
+    chave = Column(String(255), nullable=False)
+    impressao = Column(String(64), nullable=False)  # SHA-256 do corpo da requisição
+    resposta = Column(Text)  # JSON da resposta original (nulo enquanto processa)
+    criado_em = Column(DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<ChaveIdempotencia(id={self.id_chave}, usuario={self.id_usuario}, chave='{self.chave}')>"
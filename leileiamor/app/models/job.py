@@ -0,0 +1,37 @@
+"""
+Modelo de Job (SQLAlchemy ORM)
+Fila de tarefas pesadas executadas fora das requisições (worker.py)
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from app.core.database import Base
+
+class Job(Base):
+    __tablename__ = "job"
+    
+    # Próximo job disponível: status = 'pendente' AND disponivel_em <= agora
+    __table_args__ = (
+        Index("ix_job_fila", "status", "disponivel_em"),
+    )
+    
+    id_job = Column(Integer, primary_key=True, index=True)
+    tipo = Column(String(50), nullable=False)  # nome da tarefa (app/core/tarefas.py)
+    parametros = Column(Text, nullable=False, default="{}")  # JSON
+    # Sem FK: o job de expurgo remove o próprio usuário e o registro continua
+    id_usuario = Column(Integer, nullable=True)  # dono (nulo = utilitário)
+    status = Column(String(20), nullable=False, default="pendente")  # pendente, executando, concluido, falhou
+    progresso = Column(Integer, nullable=False, default=0)  # 0 a 100
+    mensagem = Column(String(255))
+    resultado = Column(Text)  # JSON devolvido pela tarefa
+    erro = Column(Text)
+    tentativas = Column(Integer, nullable=False, default=0)
+    max_tentativas = Column(Integer, nullable=False, default=3)
+    worker = Column(String(100))
+    disponivel_em = Column(DateTime, nullable=False, default=datetime.utcnow)  # adiado nas novas tentativas
+    criado_em = Column(DateTime, nullable=False, default=datetime.utcnow)
+    iniciado_em = Column(DateTime)
+    atualizado_em = Column(DateTime)  # heartbeat enquanto executa
+    concluido_em = Column(DateTime)
+    
+    def __repr__(self):
+        return f"<Job(id={self.id_job}, tipo='{self.tipo}', status='{self.status}')>"
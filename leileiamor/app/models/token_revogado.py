@@ -0,0 +1,21 @@
+"""
+Modelo de Token Revogado (SQLAlchemy ORM)
+Revogações dos tokens JWT, lidas pelos workers em app/core/revogacao.py
+A chave é:
+  - o jti do token: revoga só esse token (POST /auth/logout)
+  - "usuario:<id>": revoga os tokens do usuário emitidos antes de revogado_em
+  - "todos": revoga todos os tokens emitidos antes de revogado_em
+Fica fora da limpeza (limpeza.TABELAS): apagar as revogações reabilitaria tokens
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime
+from app.core.database import Base
+
+class TokenRevogado(Base):
+    __tablename__ = "token_revogado"
+    
+    id_revogacao = Column(Integer, primary_key=True)
+    chave = Column(String(64), unique=True, nullable=False)
+    revogado_em = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)  # sincronização incremental
+    # Depois disso nenhum token afetado é aceito pelo JWT (exp): a linha pode ser apagada
+    expira_em = Column(DateTime, nullable=False, index=True)
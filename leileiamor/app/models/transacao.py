@@ -1,7 +1,7 @@
 """
 Modelo de Transação (SQLAlchemy ORM)
 """
-from sqlalchemy import Column, Integer, String, Numeric, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Numeric, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 
@@ -21,6 +21,17 @@ class Transacao(Base):
     id_conta = Column(Integer, ForeignKey("conta.id_conta"), nullable=False)
     id_categoria = Column(Integer, ForeignKey("categoria.id_categoria"), nullable=False)
     # ============================================================================
+
+    # Índices (criados igual no PostgreSQL e no SQLite): listagem e relatórios
+    # por usuário por período/ordenados por data e por faixa/ordem de valor
+    # (id_transacao desempata a ordenação); extrato por conta em ordem de data;
+    # FKs usadas nos filtros e nos CASCADEs
+    __table_args__ = (
+        Index("ix_transacao_usuario_data", "id_usuario", "data", "id_transacao"),
+        Index("ix_transacao_usuario_valor", "id_usuario", "valor", "id_transacao"),
+        Index("ix_transacao_conta_data", "id_conta", "data", "id_transacao"),
+        Index("ix_transacao_categoria", "id_categoria"),
+    )
     
     # Relacionamentos
     usuario = relationship("Usuario", back_populates="transacoes")
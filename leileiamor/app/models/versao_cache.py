@@ -0,0 +1,21 @@
+"""
+Modelo de Versão de Cache (SQLAlchemy ORM)
+Versão dos dados que os workers guardam em memória (app/core/versoes.py),
+incrementada pelas escritas na mesma transação. id_usuario = 0 é a versão
+global (limpeza de todos os dados)
+Fica fora da limpeza (limpeza.TABELAS): os ids recomeçam do 1 e a versão
+não pode voltar a um valor já visto pelos workers
+"""
+from sqlalchemy import Column, Integer
+from app.core.database import Base
+
+class VersaoCache(Base):
+    __tablename__ = "versao_cache"
+    
+    # Sem FK: a linha global não é um usuário e a versão sobrevive à remoção do usuário
+    id_usuario = Column(Integer, primary_key=True, autoincrement=False)
+    metadados = Column(Integer, nullable=False, default=0)  # contas e categorias
+    previsao = Column(Integer, nullable=False, default=0)  # transações e saldos
+    
+    def __repr__(self):
+        return f"<VersaoCache(usuario={self.id_usuario}, metadados={self.metadados}, previsao={self.previsao})>"
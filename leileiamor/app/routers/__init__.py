@@ -3,7 +3,7 @@ Routers da API FastAPI
 Contém todos os endpoints organizados por recurso
 """
 
-from app.routers import auth, usuarios, contas, categorias, transacoes
+from app.routers import auth, usuarios, contas, categorias, transacoes, relatorios, perfis, eventos, jobs
 
 __all__ = [
     "auth",
@@ -11,4 +11,8 @@ __all__ = [
     "contas",
     "categorias",
     "transacoes",
+    "relatorios",
+    "perfis",
+    "eventos",
+    "jobs",
 ]
\ No newline at end of file
@@ -3,14 +3,17 @@ Rotas de Autenticação
 """
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db, ACCESS_TOKEN_EXPIRE_MINUTES
-from app.core.security import verify_password, create_access_token
+from app.core.cronometro import RotaCronometrada
+from app.core.revogacao import revogar_token, revogar_usuario
+from app.core.security import verify_password, create_access_token, claims_do_usuario, autenticar, security
 from app.models.usuario import Usuario
-from app.schemas.schemas import Token, LoginRequest
+from app.schemas.schemas import Token, LoginRequest, MessageResponse
 
-router = APIRouter(prefix="/auth", tags=["Autenticação"])
+router = APIRouter(prefix="/auth", tags=["Autenticação"], route_class=RotaCronometrada)
 
 
 @router.post("/login", response_model=Token)
@@ -36,11 +39,40 @@ def login(
     # Cria token de acesso
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email},
+        data=claims_do_usuario(user),
         expires_delta=access_token_expires
     )
     
     return {
         "access_token": access_token,
         "token_type": "bearer"
+    }
+
+
+@router.post("/logout", response_model=MessageResponse)
+def logout(
+    todos: bool = False,  # Revoga também os outros tokens do usuário (todas as sessões)
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+):
+    """
+    Endpoint de logout
+    Revoga o token usado na requisição; com ?todos=true, todos os tokens
+    do usuário emitidos até agora. Os outros workers recusam o token em
+    até REVOGACAO_INTERVALO segundos.
+    """
+    user, payload = autenticar(credentials.credentials, db)
+    
+    # Tokens emitidos antes do jti só podem ser revogados junto com os demais
+    if todos or "jti" not in payload:
+        revogar_usuario(db, user.id_usuario)
+        return {
+            "message": "Logout realizado em todas as sessões",
+            "detail": f"Tokens do usuário {user.id_usuario} emitidos até agora foram revogados"
+        }
+    
+    revogar_token(db, payload)
+    return {
+        "message": "Logout realizado com sucesso",
+        "detail": "O token foi revogado"
     }
\ No newline at end of file
@@ -1,61 +1,74 @@
 """
 Rotas de Categorias (CRUD Completo)
 """
-from typing import List
+from typing import List, Optional, Union
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
+from app.core.contagem import ajustar_contagem
+from app.core.cronometro import RotaCronometrada
+from app.core.metadados import invalidar_metadados, obter_metadados, resposta_do_cache
 from app.core.security import get_current_user
+from app.core.projecao import PROJECAO_CATEGORIA, Projecao, ids_do_parametro
 from app.models.usuario import Usuario
 from app.models.categoria import Categoria
-from app.schemas.schemas import CategoriaCreate, CategoriaUpdate, CategoriaResponse, MessageResponse
+from app.schemas.schemas import CategoriaCreate, CategoriaUpdate, CategoriaResponse, MessageResponse, MultiGetResponse
 
-router = APIRouter(prefix="/categorias", tags=["Categorias"])
+router = APIRouter(prefix="/categorias", tags=["Categorias"], route_class=RotaCronometrada)
 
 
-@router.get("/", response_model=List[CategoriaResponse])
+@router.get("/", response_model=Union[List[CategoriaResponse], MultiGetResponse[CategoriaResponse]])
 def list_categorias(
     skip: int = 0,
     limit: int = 100,
     tipo: str = None,  # Filtro opcional por tipo (receita/despesa)
+    projecao: Projecao = Depends(PROJECAO_CATEGORIA.do_parametro),
+    ids: Optional[List[int]] = Depends(ids_do_parametro),
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
     """
     Lista todas as categorias do usuário autenticado (READ)
     Pode filtrar por tipo: ?tipo=receita ou ?tipo=despesa
+    Campos da resposta: ?fields=id_categoria,nome
+    Multi-get: ?ids=1,2,3 -> {"itens": [...], "ausentes": [...]}
+    A listagem sai do cache de metadados do usuário (app/core/metadados.py)
     """
-    query = db.query(Categoria).filter(Categoria.id_usuario == current_user.id_usuario)
+    if ids is not None:
+        return projecao.varios(db, Categoria.id_categoria, ids, Categoria.id_usuario == current_user.id_usuario)
+    
+    categorias = obter_metadados(db, current_user.id_usuario).categorias.values()
     
     if tipo:
-        query = query.filter(Categoria.tipo == tipo)
+        categorias = [categoria for categoria in categorias if categoria["tipo"] == tipo]
     
-    categorias = query.offset(skip).limit(limit).all()
-    return categorias
+    return resposta_do_cache(list(categorias)[skip:skip + limit], projecao)
 
 
 @router.get("/{id_categoria}", response_model=CategoriaResponse)
 def get_categoria(
     id_categoria: int,
+    projecao: Projecao = Depends(PROJECAO_CATEGORIA.do_parametro),
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
     """
     Busca categoria por ID (READ)
     Apenas categorias do usuário autenticado
+    Campos da resposta: ?fields=nome,tipo
     """
-    categoria = db.query(Categoria).filter(
+    categoria = db.execute(projecao.select().where(
         Categoria.id_categoria == id_categoria,
         Categoria.id_usuario == current_user.id_usuario
-    ).first()
+    )).first()
     
     if not categoria:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Categoria com ID {id_categoria} não encontrada"
         )
-    return categoria
+    return projecao.item(categoria)
 
 
 @router.post("/", response_model=CategoriaResponse, status_code=status.HTTP_201_CREATED)
@@ -76,6 +89,7 @@ def create_categoria(
     )
     
     db.add(new_categoria)
+    invalidar_metadados(db, current_user.id_usuario)
     db.commit()
     db.refresh(new_categoria)
     
@@ -110,6 +124,7 @@ def update_categoria(
     for field, value in update_data.items():
         setattr(categoria, field, value)
     
+    invalidar_metadados(db, current_user.id_usuario)
     db.commit()
     db.refresh(categoria)
     
@@ -137,7 +152,12 @@ def delete_categoria(
             detail=f"Categoria com ID {id_categoria} não encontrada"
         )
     
+    # As transações da categoria vão junto (cascade): desconta do total do usuário
+    removidas = len(categoria.transacoes)
     db.delete(categoria)
+    if removidas:
+        ajustar_contagem(db, current_user.id_usuario, -removidas)
+    invalidar_metadados(db, current_user.id_usuario)
     db.commit()
     
     return {
@@ -1,44 +1,114 @@
 """
 Rotas de Contas (CRUD Completo)
 """
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
+from app.core.contagem import ajustar_contagem
+from app.core.cronometro import RotaCronometrada
+from app.core.eventos import publicar, saldos
+from app.core.extrato import decodificar_cursor, gerar_extrato_json
+from app.core.metadados import invalidar_metadados, obter_metadados, resposta_do_cache
 from app.core.security import get_current_user
+from app.core.previsao import obter_previsao, invalidar_previsao
+from app.core.projecao import PROJECAO_CONTA, Projecao, ids_do_parametro
 from app.models.usuario import Usuario
 from app.models.conta import Conta
-from app.schemas.schemas import ContaCreate, ContaUpdate, ContaResponse, MessageResponse
+from app.schemas.schemas import ContaCreate, ContaUpdate, ContaResponse, ExtratoResponse, MessageResponse, MultiGetResponse
 
-router = APIRouter(prefix="/contas", tags=["Contas"])
+router = APIRouter(prefix="/contas", tags=["Contas"], route_class=RotaCronometrada)
 
 
-@router.get("/", response_model=List[ContaResponse])
+@router.get("/", response_model=Union[List[ContaResponse], MultiGetResponse[ContaResponse]])
 def list_contas(
     skip: int = 0,
     limit: int = 100,
+    projecao: Projecao = Depends(PROJECAO_CONTA.do_parametro),
+    ids: Optional[List[int]] = Depends(ids_do_parametro),
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
     """
     Lista todas as contas do usuário autenticado (READ)
+    Campos da resposta: ?fields=id_conta,nome,saldo
+    Multi-get: ?ids=1,2,3 -> {"itens": [...], "ausentes": [...]}
+    Seleciona só as colunas da resposta (sem carregar entidades ORM)
+    Sem o saldo (?fields=id_conta,nome,tipo) sai do cache de metadados do usuário
     """
-    contas = db.query(Conta).filter(
+    if ids is not None:
+        return projecao.varios(db, Conta.id_conta, ids, Conta.id_usuario == current_user.id_usuario)
+    
+    if "saldo" not in projecao.nomes:
+        contas = list(obter_metadados(db, current_user.id_usuario).contas.values())
+        return resposta_do_cache(contas[skip:skip + limit], projecao)
+    
+    stmt = projecao.select().where(
         Conta.id_usuario == current_user.id_usuario
-    ).offset(skip).limit(limit).all()
-    return contas
+    ).offset(skip).limit(limit)
+    return projecao.resposta(db, stmt)
 
 
 @router.get("/{id_conta}", response_model=ContaResponse)
 def get_conta(
     id_conta: int,
+    projecao: Projecao = Depends(PROJECAO_CONTA.do_parametro),
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
     """
     Busca conta por ID (READ)
     Apenas contas do usuário autenticado
+    Campos da resposta: ?fields=nome,saldo
+    """
+    conta = db.execute(projecao.select().where(
+        Conta.id_conta == id_conta,
+        Conta.id_usuario == current_user.id_usuario
+    )).first()
+    
+    if not conta:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Conta com ID {id_conta} não encontrada"
+        )
+    return projecao.item(conta)
+
+
+@router.get("/{id_conta}/previsao")
+def get_previsao_conta(
+    id_conta: int,
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """
+    Projeção do saldo da conta para os próximos 12 meses
+    Baseada nas receitas e despesas recorrentes por categoria
+    Informa o primeiro mês em que o saldo fica negativo (mes_negativo)
+    """
+    previsoes = obter_previsao(db, current_user.id_usuario)
+    
+    if id_conta not in previsoes:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Conta com ID {id_conta} não encontrada"
+        )
+    return previsoes[id_conta]
+
+
+@router.get("/{id_conta}/extrato", response_model=ExtratoResponse)
+def get_extrato_conta(
+    id_conta: int,
+    limite: int = Query(100, ge=0, le=1000),  # 0 = extrato inteiro
+    cursor: Optional[str] = None,  # proximo_cursor da página anterior
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """
+    Extrato da conta: transações da mais recente para a mais antiga com o
+    saldo após cada uma (calculado no banco a partir do saldo atual)
+    Paginado por cursor; a resposta é enviada em streaming
     """
     conta = db.query(Conta).filter(
         Conta.id_conta == id_conta,
@@ -50,7 +120,20 @@ def get_conta(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Conta com ID {id_conta} não encontrada"
         )
-    return conta
+    
+    try:
+        posicao = decodificar_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido"
+        )
+    
+    dados_conta = ContaResponse.model_validate(conta).model_dump(mode="json")
+    return StreamingResponse(
+        gerar_extrato_json(dados_conta, limite, posicao),
+        media_type="application/json"
+    )
 
 
 @router.post("/", response_model=ContaResponse, status_code=status.HTTP_201_CREATED)
@@ -72,6 +155,8 @@ def create_conta(
     )
     
     db.add(new_conta)
+    invalidar_metadados(db, current_user.id_usuario)
+    invalidar_previsao(db, current_user.id_usuario)
     db.commit()
     db.refresh(new_conta)
     
@@ -106,6 +191,11 @@ def update_conta(
     for field, value in update_data.items():
         setattr(conta, field, value)
     
+    if "saldo" in update_data:
+        publicar(db, current_user.id_usuario, {"tipo": "conta_atualizada", "contas": saldos(conta)})
+    
+    invalidar_metadados(db, current_user.id_usuario)
+    invalidar_previsao(db, current_user.id_usuario)
     db.commit()
     db.refresh(conta)
     
@@ -133,7 +223,13 @@ def delete_conta(
             detail=f"Conta com ID {id_conta} não encontrada"
         )
     
+    # As transações da conta vão junto (cascade): desconta do total do usuário
+    removidas = len(conta.transacoes)
     db.delete(conta)
+    if removidas:
+        ajustar_contagem(db, current_user.id_usuario, -removidas)
+    invalidar_metadados(db, current_user.id_usuario)
+    invalidar_previsao(db, current_user.id_usuario)
     db.commit()
     
     return {
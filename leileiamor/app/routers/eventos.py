@@ -0,0 +1,35 @@
+"""
+Rotas de Eventos (tempo real)
+O painel abre uma conexão SSE e recebe transações e saldos assim que são
+gravados, em vez de consultar a API periodicamente
+"""
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+
+from app.core.cronometro import RotaCronometrada
+from app.core.eventos import difusor, fluxo_sse, EVENTOS_MAX_CONEXOES
+from app.core.security import get_current_user_id_eventos
+
+router = APIRouter(prefix="/eventos", tags=["Eventos"], route_class=RotaCronometrada)
+
+
+@router.get("")
+async def stream_eventos(id_usuario: int = Depends(get_current_user_id_eventos)):
+    """
+    Stream text/event-stream com os eventos do usuário autenticado
+    Eventos: transacao_criada, transacao_atualizada, transacao_removida,
+    conta_atualizada (com o saldo atual das contas afetadas) e recarregar
+    (cliente lento: buscar o estado completo de novo)
+    Token no header Authorization ou em ?token= (EventSource não envia headers)
+    """
+    if difusor.conexoes >= EVENTOS_MAX_CONEXOES:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Limite de conexões de eventos atingido",
+            headers={"Retry-After": "5"},
+        )
+    return StreamingResponse(
+        fluxo_sse(id_usuario),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,83 @@
+"""
+Rotas de Jobs (tarefas pesadas em segundo plano)
+Estado, progresso e resultado dos jobs executados pelo worker.py
+"""
+import os
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.orm import Session
+
+from app.core.database import get_db
+from app.core.cronometro import RotaCronometrada
+from app.core.jobs import descrever
+from app.core.security import get_current_user, security_opcional
+from app.core.tarefas import pasta_exportacoes
+from app.models.job import Job
+from app.schemas.schemas import JobResponse
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"], route_class=RotaCronometrada)
+
+
+def _obter_job(id_job: int, credentials: Optional[HTTPAuthorizationCredentials], db: Session) -> Job:
+    """
+    Job pelo id; os de um usuário só para ele (404 para os demais)
+    Jobs utilitários (seed, limpeza) não têm dono, como as rotas que os criam
+    """
+    job = db.get(Job, id_job)
+    if job is not None and job.id_usuario is not None:
+        if credentials is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Credenciais inválidas",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        if get_current_user(credentials, db).id_usuario != job.id_usuario:
+            job = None
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job com ID {id_job} não encontrado"
+        )
+    return job
+
+
+@router.get("/{id_job}", response_model=JobResponse)
+def get_job(
+    id_job: int,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security_opcional),
+    db: Session = Depends(get_db)
+):
+    """
+    Estado do job: status (pendente, executando, concluido, falhou),
+    progresso (0 a 100), mensagem, tentativas e resultado ao concluir
+    """
+    return descrever(_obter_job(id_job, credentials, db))
+
+
+@router.get("/{id_job}/arquivo")
+def download_arquivo_job(
+    id_job: int,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security_opcional),
+    db: Session = Depends(get_db)
+):
+    """Baixa o arquivo gerado por um job de exportação concluído"""
+    job = _obter_job(id_job, credentials, db)
+    resultado = descrever(job)["resultado"] or {}
+    if job.status != "concluido" or "arquivo" not in resultado:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job {id_job} não gerou arquivo (status: {job.status})"
+        )
+    try:
+        pasta = pasta_exportacoes()
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    caminho = os.path.join(pasta, os.path.basename(resultado["arquivo"]))
+    if not os.path.exists(caminho):
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Arquivo não está mais disponível (expirou ou foi removido)"
+        )
+    return FileResponse(caminho, media_type="text/csv", filename=resultado["arquivo"])
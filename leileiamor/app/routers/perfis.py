@@ -0,0 +1,42 @@
+"""
+Rotas de Perfis (capturas do profiler por requisição)
+Restritas a administradores: exigem o header X-Profile-Token
+"""
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+
+from app.core.cronometro import RotaCronometrada
+from app.core.perfil import exigir_admin, listar_perfis, caminho_perfil
+
+router = APIRouter(
+    prefix="/perfis",
+    tags=["Perfis"],
+    dependencies=[Depends(exigir_admin)],
+    route_class=RotaCronometrada
+)
+
+
+@router.get("/")
+def list_perfis():
+    """
+    Lista as capturas mais recentes
+    Para capturar: repita a requisição com ?profile=1 e o header X-Profile-Token;
+    o arquivo gerado vem no header X-Profile da resposta
+    (rotas async não são perfiladas: X-Profile: assincrona)
+    """
+    return listar_perfis()
+
+
+@router.get("/{arquivo}")
+def download_perfil(arquivo: str):
+    """
+    Baixa uma captura (.pstats)
+    Abrir com: python -m pstats arquivo.pstats  ou  snakeviz arquivo.pstats
+    """
+    caminho = caminho_perfil(arquivo)
+    if caminho is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Captura {arquivo} não encontrada"
+        )
+    return FileResponse(caminho, media_type="application/octet-stream", filename=arquivo)
@@ -0,0 +1,41 @@
+"""
+Rotas de Relatórios (Análises)
+"""
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+from app.core.database import get_db
+from app.core.cronometro import RotaCronometrada
+from app.core.security import get_current_user
+from app.core.fluxo import calcular_fluxo, JANELA_PADRAO
+from app.models.usuario import Usuario
+
+router = APIRouter(prefix="/relatorios", tags=["Relatórios"], route_class=RotaCronometrada)
+
+
+@router.get("/fluxo")
+def fluxo_de_caixa(
+    data_inicio: date = None,  # Filtro opcional: início do período
+    data_fim: date = None,  # Filtro opcional: fim do período
+    janela: int = JANELA_PADRAO,  # Janela (em dias) das médias móveis
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """
+    Fluxo de caixa do usuário autenticado
+    Séries diárias, semanais e mensais de receitas x despesas,
+    médias móveis e saldo acumulado por conta
+    Filtros opcionais: ?data_inicio=2025-01-01&data_fim=2025-12-31&janela=30
+    """
+    if janela < 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A janela da média móvel deve ser maior que zero"
+        )
+
+    fluxo = calcular_fluxo(db, current_user.id_usuario, data_inicio, data_fim, janela)
+
+    # Séries já estão em tipos nativos: evita o jsonable_encoder em listas longas
+    return JSONResponse(content=fluxo)
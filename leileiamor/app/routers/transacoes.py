@@ -1,75 +1,184 @@
 """
 Rotas de Transações (CRUD Completo)
 """
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import date
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from decimal import Decimal
 
 from app.core.database import get_db
+from app.core.cronometro import RotaCronometrada
+from app.core.perfil import perfilar_endpoint
 from app.core.security import get_current_user
+from app.core.previsao import invalidar_previsao
+from app.core.idempotencia import reservar_chave, registrar_resposta
+from app.core.gravacao_lote import gravador, GravacaoNaoIniciada, GRAVACAO_EM_LOTE
+from app.core.projecao import PROJECAO_TRANSACAO, Projecao, ids_do_parametro
+from app.core.contagem import ajustar_contagem, total_transacoes
+from app.core.eventos import publicar, saldos
+from app.core.jobs import enfileirar, resposta_aceita
+from app.core.tarefas import pasta_exportacoes
+from app.core.insercao import (
+    INSERCAO_UNICA, TIPO_INCOMPATIVEL, ErroInsercao, atualizar_saldo, inserir_transacao, reverter_saldo
+)
 from app.models.usuario import Usuario
 from app.models.transacao import Transacao
-from app.models.conta import Conta
-from app.models.categoria import Categoria
-from app.schemas.schemas import TransacaoCreate, TransacaoUpdate, TransacaoResponse, MessageResponse
+from app.schemas.schemas import TransacaoCreate, TransacaoUpdate, TransacaoResponse, MessageResponse, JobResponse, MultiGetResponse
 
-router = APIRouter(prefix="/transacoes", tags=["Transações"])
+router = APIRouter(prefix="/transacoes", tags=["Transações"], route_class=RotaCronometrada)
 
+# Ordenações da listagem (?ordenar=): cada uma tem um índice (id_usuario, coluna, id_transacao).
+# id_transacao desempata: sem ele, valores iguais mudam de página entre consultas
+ORDENACOES = {
+    "data": (Transacao.data.desc(), Transacao.id_transacao.desc()),
+    "valor": (Transacao.valor.desc(), Transacao.id_transacao.desc()),
+}
 
-@router.get("/", response_model=List[TransacaoResponse])
+
+@router.get("/", response_model=Union[List[TransacaoResponse], MultiGetResponse[TransacaoResponse]])
 def list_transacoes(
     skip: int = 0,
     limit: int = 100,
     tipo: str = None,  # Filtro opcional por tipo (receita/despesa)
     id_conta: int = None,  # Filtro opcional por conta
     id_categoria: int = None,  # Filtro opcional por categoria
+    data_inicio: Optional[date] = None,  # Período (inclusivo)
+    data_fim: Optional[date] = None,
+    valor_min: Optional[Decimal] = None,  # Faixa de valor (inclusiva)
+    valor_max: Optional[Decimal] = None,
+    ordenar: str = "data",  # "data" ou "valor" (decrescente)
+    projecao: Projecao = Depends(PROJECAO_TRANSACAO.do_parametro),
+    ids: Optional[List[int]] = Depends(ids_do_parametro),
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
     """
     Lista todas as transações do usuário autenticado (READ)
     Filtros opcionais: ?tipo=receita&id_conta=1&id_categoria=2
+    Período e valor: ?data_inicio=2025-01-01&data_fim=2025-01-31&valor_min=500&ordenar=valor
+    Campos da resposta: ?fields=id_transacao,valor,data,descricao
+    Seleciona só as colunas da resposta (sem carregar entidades ORM)
+    Headers X-Total-Count (total de transações com os filtros) e
+    X-Total-Exato (false quando o total é estimado)
+    Multi-get: ?ids=1,2,3 -> {"itens": [...], "ausentes": [...]} (ignora filtros e paginação)
     """
-    query = db.query(Transacao).filter(Transacao.id_usuario == current_user.id_usuario)
+    if ids is not None:
+        return projecao.varios(db, Transacao.id_transacao, ids, Transacao.id_usuario == current_user.id_usuario)
+    
+    if ordenar not in ORDENACOES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Ordenação inválida. Use: {', '.join(ORDENACOES)}"
+        )
+    if data_inicio and data_fim and data_inicio > data_fim:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="data_inicio não pode ser posterior a data_fim"
+        )
+    if valor_min is not None and valor_max is not None and valor_min > valor_max:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="valor_min não pode ser maior que valor_max"
+        )
     
+    filtros = []
     if tipo:
-        query = query.filter(Transacao.tipo == tipo)
+        filtros.append(Transacao.tipo == tipo)
     if id_conta:
-        query = query.filter(Transacao.id_conta == id_conta)
+        filtros.append(Transacao.id_conta == id_conta)
     if id_categoria:
-        query = query.filter(Transacao.id_categoria == id_categoria)
+        filtros.append(Transacao.id_categoria == id_categoria)
+    if data_inicio:
+        filtros.append(Transacao.data >= data_inicio)
+    if data_fim:
+        filtros.append(Transacao.data <= data_fim)
+    if valor_min is not None:
+        filtros.append(Transacao.valor >= valor_min)
+    if valor_max is not None:
+        filtros.append(Transacao.valor <= valor_max)
+    
+    stmt = projecao.select().where(Transacao.id_usuario == current_user.id_usuario, *filtros)
+    stmt = stmt.order_by(*ORDENACOES[ordenar]).offset(skip).limit(limit)
+    resposta = projecao.resposta(db, stmt)
     
-    transacoes = query.order_by(Transacao.data.desc()).offset(skip).limit(limit).all()
-    return transacoes
+    total, exato = total_transacoes(db, current_user.id_usuario, *filtros)
+    resposta.headers["X-Total-Count"] = str(total)
+    resposta.headers["X-Total-Exato"] = "true" if exato else "false"
+    return resposta
+
+
+@router.post("/exportar", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+def exportar_transacoes(
+    db: Session = Depends(get_db),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """
+    Exporta todas as transações do usuário em CSV, em segundo plano
+    Responde 202 com o job: acompanhar em /jobs/{id} e baixar em /jobs/{id}/arquivo
+    Exige JOBS_EXPORTACOES configurada (503 sem ela)
+    """
+    try:
+        pasta_exportacoes()
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    job = enfileirar(
+        db, "exportar_transacoes", {"id_usuario": current_user.id_usuario}, id_usuario=current_user.id_usuario
+    )
+    return resposta_aceita(job)
 
 
 @router.get("/{id_transacao}", response_model=TransacaoResponse)
 def get_transacao(
     id_transacao: int,
+    projecao: Projecao = Depends(PROJECAO_TRANSACAO.do_parametro),
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
     """
     Busca transação por ID (READ)
     Apenas transações do usuário autenticado
+    Campos da resposta: ?fields=valor,data
     """
-    transacao = db.query(Transacao).filter(
+    transacao = db.execute(projecao.select().where(
         Transacao.id_transacao == id_transacao,
         Transacao.id_usuario == current_user.id_usuario
-    ).first()
+    )).first()
     
     if not transacao:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Transação com ID {id_transacao} não encontrada"
         )
-    return transacao
+    return projecao.item(transacao)
+
+
+def _erro_insercao(e: ErroInsercao, transacao_data: TransacaoCreate) -> HTTPException:
+    """Resposta para a validação recusada na escrita (app/core/insercao.py)"""
+    # Conta/categoria de outro usuário responde como inexistente (não revela o id)
+    if e.motivo == TIPO_INCOMPATIVEL:
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Tipo da transação ({transacao_data.tipo}) não corresponde ao tipo da categoria ({e.categoria_tipo})"
+        )
+    if e.motivo.startswith("conta"):
+        return HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Conta com ID {transacao_data.id_conta} não encontrada"
+        )
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Categoria com ID {transacao_data.id_categoria} não encontrada"
+    )
 
 
 @router.post("/", response_model=TransacaoResponse, status_code=status.HTTP_201_CREATED)
-def create_transacao(
+async def create_transacao(
     transacao_data: TransacaoCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: Session = Depends(get_db),
     current_user: Usuario = Depends(get_current_user)
 ):
@@ -77,37 +186,73 @@ def create_transacao(
     Cria nova transação (CREATE)
     Requer autenticação JWT
     Atualiza automaticamente o saldo da conta
+    Header opcional Idempotency-Key: repetições reenviam a resposta original
+    Com GRAVACAO_EM_LOTE=1 a inserção é gravada em micro-lote (group commit)
+    No PostgreSQL validação, inserção e saldo são um único comando (app/core/insercao.py)
+    Conta, categoria e tipo são sempre validados na escrita, nunca no cache
     """
-    # Valida se conta pertence ao usuário
-    conta = db.query(Conta).filter(
-        Conta.id_conta == transacao_data.id_conta,
-        Conta.id_usuario == current_user.id_usuario
-    ).first()
-    
-    if not conta:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Conta com ID {transacao_data.id_conta} não encontrada"
-        )
-    
-    # Valida se categoria pertence ao usuário
-    categoria = db.query(Categoria).filter(
-        Categoria.id_categoria == transacao_data.id_categoria,
-        Categoria.id_usuario == current_user.id_usuario
-    ).first()
+    # Group commit: a linha vai para o próximo micro-lote, que a valida na própria transação.
+    # A espera pelo lote é um await: não prende uma thread do pool por requisição.
+    # Com Idempotency-Key segue o caminho normal (a chave exige a mesma transação)
+    if GRAVACAO_EM_LOTE and idempotency_key is None:
+        id_usuario = current_user.id_usuario
+        await run_in_threadpool(db.close)  # Libera a conexão enquanto o lote é gravado
+        try:
+            transacao = await gravador.enviar({**transacao_data.model_dump(), "id_usuario": id_usuario})
+        except ErroInsercao as e:
+            raise _erro_insercao(e, transacao_data)
+        except GravacaoNaoIniciada as e:
+            # Cancelado antes de entrar em um lote: nada foi gravado, repetir é seguro
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Gravação em lote sobrecarregada: {str(e)}",
+                headers={"Retry-After": "1"}
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Erro ao gravar transação: {str(e)}"
+            )
+        return transacao
     
-    if not categoria:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Categoria com ID {transacao_data.id_categoria} não encontrada"
+    return await run_in_threadpool(_criar_transacao, transacao_data, response, idempotency_key, db, current_user)
+
+
+@perfilar_endpoint  # Parte perfilada de create_transacao (?profile=1): roda no threadpool
+def _criar_transacao(
+    transacao_data: TransacaoCreate,
+    response: Response,
+    idempotency_key: Optional[str],
+    db: Session,
+    current_user: Usuario
+):
+    """Caminho síncrono de create_transacao (roda no threadpool)"""
+    registro = None
+    if idempotency_key is not None:
+        registro, resposta = reservar_chave(
+            db, current_user.id_usuario, idempotency_key, transacao_data.model_dump(mode="json")
         )
+        if resposta is not None:
+            response.headers["Idempotent-Replayed"] = "true"
+            return resposta
     
-    # Valida se tipo da transação corresponde ao tipo da categoria
-    if transacao_data.tipo != categoria.tipo:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Tipo da transação ({transacao_data.tipo}) não corresponde ao tipo da categoria ({categoria.tipo})"
-        )
+    if INSERCAO_UNICA:
+        id_usuario = current_user.id_usuario  # current_user expira no commit
+        try:
+            transacao, conta = inserir_transacao(db, id_usuario, transacao_data.model_dump())
+        except ErroInsercao as e:
+            db.rollback()
+            raise _erro_insercao(e, transacao_data)
+        
+        dados = TransacaoResponse.model_validate(transacao).model_dump(mode="json")
+        if registro is not None:
+            registrar_resposta(registro, dados)
+        publicar(db, id_usuario, {
+            "tipo": "transacao_criada", "transacao": dados, "contas": saldos(conta)
+        })
+        db.commit()
+        
+        return transacao
     
     # Cria nova transação
     new_transacao = Transacao(
@@ -120,13 +265,39 @@ def create_transacao(
         id_categoria=transacao_data.id_categoria
     )
     
-    # Atualiza saldo da conta
-    if transacao_data.tipo == "receita":
-        conta.saldo += Decimal(str(transacao_data.valor))
-    else:  # despesa
-        conta.saldo -= Decimal(str(transacao_data.valor))
+    # Atualiza saldo da conta (UPDATE ... RETURNING: sem carregar a conta),
+    # validando conta, categoria e tipo no próprio comando
+    try:
+        conta = atualizar_saldo(db, current_user.id_usuario, transacao_data.model_dump())
+    except ErroInsercao as e:
+        db.rollback()
+        raise _erro_insercao(e, transacao_data)
     
     db.add(new_transacao)
+    try:
+        db.flush()
+    except IntegrityError:
+        # Categoria removida por outra requisição entre o UPDATE e o INSERT
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Categoria com ID {transacao_data.id_categoria} não encontrada"
+        )
+    ajustar_contagem(db, current_user.id_usuario, 1)
+    
+    # Resposta gravada no mesmo commit da transação e do saldo
+    if registro is not None:
+        db.refresh(new_transacao)
+        registrar_resposta(registro, TransacaoResponse.model_validate(new_transacao).model_dump(mode="json"))
+    
+    # Enviado aos painéis conectados só depois do commit
+    publicar(db, current_user.id_usuario, {
+        "tipo": "transacao_criada",
+        "transacao": TransacaoResponse.model_validate(new_transacao).model_dump(mode="json"),
+        "contas": saldos(conta),
+    })
+    
+    invalidar_previsao(db, current_user.id_usuario)
     db.commit()
     db.refresh(new_transacao)
     
@@ -144,6 +315,7 @@ def update_transacao(
     Atualiza transação existente (UPDATE)
     Requer autenticação JWT
     Recalcula saldo da conta se valor for alterado
+    Conta, categoria e tipo do resultado são validados na escrita, como na criação
     """
     transacao = db.query(Transacao).filter(
         Transacao.id_transacao == id_transacao,
@@ -156,56 +328,45 @@ def update_transacao(
             detail=f"Transação com ID {id_transacao} não encontrada"
         )
     
-    # Guarda valores antigos para recalcular saldo
-    valor_antigo = transacao.valor
-    conta_antiga = transacao.conta
-    tipo_antigo = transacao.tipo
-    
     # Atualiza apenas campos fornecidos
     update_data = transacao_data.model_dump(exclude_unset=True)
+    colunas = ("valor", "data", "descricao", "tipo", "id_conta", "id_categoria")
+    antiga = {coluna: getattr(transacao, coluna) for coluna in colunas}
+    final = TransacaoCreate.model_construct(**{**antiga, **update_data})
     
-    # Valida nova conta se fornecida
-    if "id_conta" in update_data:
-        nova_conta = db.query(Conta).filter(
-            Conta.id_conta == update_data["id_conta"],
-            Conta.id_usuario == current_user.id_usuario
-        ).first()
-        if not nova_conta:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Conta com ID {update_data['id_conta']} não encontrada"
-            )
-    
-    # Valida nova categoria se fornecida
-    if "id_categoria" in update_data:
-        nova_categoria = db.query(Categoria).filter(
-            Categoria.id_categoria == update_data["id_categoria"],
-            Categoria.id_usuario == current_user.id_usuario
-        ).first()
-        if not nova_categoria:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Categoria com ID {update_data['id_categoria']} não encontrada"
-            )
+    # Recalcula saldo (UPDATE ... RETURNING, sem carregar as contas)
+    # 1. Reverte valor antigo; 2. aplica o novo validando conta, categoria e tipo no comando
+    contas = {}
+    conta = reverter_saldo(db, current_user.id_usuario, antiga)
+    if conta is not None:
+        contas[conta.id_conta] = conta
+    try:
+        conta = atualizar_saldo(db, current_user.id_usuario, final.model_dump())
+    except ErroInsercao as e:
+        db.rollback()
+        raise _erro_insercao(e, final)
+    contas[conta.id_conta] = conta  # Mesma conta: vale o saldo depois dos dois comandos
     
     # Aplica atualizações
     for field, value in update_data.items():
         setattr(transacao, field, value)
     
-    # Recalcula saldo
-    # 1. Reverte valor antigo
-    if tipo_antigo == "receita":
-        conta_antiga.saldo -= Decimal(str(valor_antigo))
-    else:
-        conta_antiga.saldo += Decimal(str(valor_antigo))
-    
-    # 2. Aplica novo valor
-    conta_nova = transacao.conta
-    if transacao.tipo == "receita":
-        conta_nova.saldo += Decimal(str(transacao.valor))
-    else:
-        conta_nova.saldo -= Decimal(str(transacao.valor))
+    try:
+        db.flush()
+    except IntegrityError:
+        # Categoria removida por outra requisição entre o UPDATE e o flush
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Categoria com ID {final.id_categoria} não encontrada"
+        )
+    publicar(db, current_user.id_usuario, {
+        "tipo": "transacao_atualizada",
+        "transacao": TransacaoResponse.model_validate(transacao).model_dump(mode="json"),
+        "contas": saldos(*contas.values()),
+    })
     
+    invalidar_previsao(db, current_user.id_usuario)
     db.commit()
     db.refresh(transacao)
     
@@ -242,6 +403,11 @@ def delete_transacao(
         conta.saldo += Decimal(str(transacao.valor))
     
     db.delete(transacao)
+    ajustar_contagem(db, current_user.id_usuario, -1)
+    publicar(db, current_user.id_usuario, {
+        "tipo": "transacao_removida", "id_transacao": transacao.id_transacao, "contas": saldos(conta)
+    })
+    invalidar_previsao(db, current_user.id_usuario)
     db.commit()
     
     return {
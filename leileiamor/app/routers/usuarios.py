@@ -6,11 +6,14 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
-from app.core.security import get_current_user, get_password_hash
+from app.core.cronometro import RotaCronometrada
+from app.core import versoes
+from app.core.revogacao import revogar_usuario
+from app.core.security import AUTH_STATELESS, get_current_user, get_password_hash
 from app.models.usuario import Usuario
 from app.schemas.schemas import UsuarioCreate, UsuarioUpdate, UsuarioResponse, MessageResponse
 
-router = APIRouter(prefix="/usuarios", tags=["Usuários"])
+router = APIRouter(prefix="/usuarios", tags=["Usuários"], route_class=RotaCronometrada)
 
 
 @router.get("/me", response_model=UsuarioResponse)
@@ -133,6 +136,12 @@ def update_usuario(
         setattr(usuario, field, value)
     
     db.commit()
+    
+    # Tokens emitidos antes deixam de valer: credenciais trocadas ou, no modo
+    # sem estado, claims desatualizadas (nome e email vêm do token)
+    if "senha" in update_data or "email" in update_data or (AUTH_STATELESS and "nome" in update_data):
+        revogar_usuario(db, id_usuario)
+    
     db.refresh(usuario)
     
     return usuario
@@ -164,8 +173,11 @@ def delete_usuario(
         )
     
     db.delete(usuario)
+    versoes.marcar_todas(db, id_usuario)
     db.commit()
     
+    revogar_usuario(db, id_usuario)
+    
     return {
         "message": "Usuário deletado com sucesso",
         "detail": f"Usuário {usuario.nome} (ID: {id_usuario}) foi removido"
@@ -2,8 +2,9 @@
 Schemas Pydantic para validaÃ§Ã£o e serializaÃ§Ã£o de dados
 """
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
-from datetime import datetime
+from typing import Any, Dict, Generic, List, Optional, TypeVar
+from datetime import date, datetime
+from decimal import Decimal
 
 
 # ============================================================================
@@ -52,8 +53,8 @@ class Token(BaseModel):
 
 class LoginRequest(BaseModel):
     """Schema de requisiÃ§Ã£o de login"""
-    username: str
-    password: str
+    email: EmailStr
+    senha: str
 
 
 # ============================================================================
@@ -93,6 +94,174 @@ class ProductResponse(ProductBase):
         from_attributes = True
 
 
+# ============================================================================
+# SCHEMAS DE USUARIO (tabela usuario)
+# ============================================================================
+
+class UsuarioBase(BaseModel):
+    """Schema base para usuario"""
+    nome: str = Field(..., min_length=1, max_length=255)
+    email: EmailStr
+
+
+class UsuarioCreate(UsuarioBase):
+    """Schema para criacao de usuario"""
+    senha: str = Field(..., min_length=6)
+
+
+class UsuarioUpdate(BaseModel):
+    """Schema para atualizacao de usuario"""
+    nome: Optional[str] = Field(None, min_length=1, max_length=255)
+    email: Optional[EmailStr] = None
+    senha: Optional[str] = Field(None, min_length=6)
+
+
+class UsuarioResponse(UsuarioBase):
+    """Schema de resposta de usuario"""
+    id_usuario: int
+
+    class Config:
+        from_attributes = True
+
+
+# ============================================================================
+# SCHEMAS DE CONTA
+# ============================================================================
+
+class ContaBase(BaseModel):
+    """Schema base para conta"""
+    nome: str = Field(..., min_length=1, max_length=255)
+    saldo: Decimal = Decimal("0.00")
+    tipo: str = Field(..., min_length=1, max_length=50)
+
+
+class ContaCreate(ContaBase):
+    """Schema para criacao de conta"""
+    pass
+
+
+class ContaUpdate(BaseModel):
+    """Schema para atualizacao de conta"""
+    nome: Optional[str] = Field(None, min_length=1, max_length=255)
+    saldo: Optional[Decimal] = None
+    tipo: Optional[str] = Field(None, min_length=1, max_length=50)
+
+
+class ContaResponse(ContaBase):
+    """Schema de resposta de conta"""
+    id_conta: int
+    id_usuario: int
+
+    class Config:
+        from_attributes = True
+
+
+# ============================================================================
+# SCHEMAS DE CATEGORIA
+# ============================================================================
+
+class CategoriaBase(BaseModel):
+    """Schema base para categoria"""
+    nome: str = Field(..., min_length=1, max_length=255)
+    tipo: str = Field(..., pattern="^(receita|despesa)$")
+
+
+class CategoriaCreate(CategoriaBase):
+    """Schema para criacao de categoria"""
+    pass
+
+
+class CategoriaUpdate(BaseModel):
+    """Schema para atualizacao de categoria"""
+    nome: Optional[str] = Field(None, min_length=1, max_length=255)
+    tipo: Optional[str] = Field(None, pattern="^(receita|despesa)$")
+
+
+class CategoriaResponse(CategoriaBase):
+    """Schema de resposta de categoria"""
+    id_categoria: int
+    id_usuario: int
+
+    class Config:
+        from_attributes = True
+
+
+# ============================================================================
+# SCHEMAS DE TRANSACAO
+# ============================================================================
+
+class TransacaoBase(BaseModel):
+    """Schema base para transacao"""
+    valor: Decimal = Field(..., gt=0)
+    data: date
+    descricao: Optional[str] = Field(None, max_length=500)
+    tipo: str = Field(..., pattern="^(receita|despesa)$")
+    id_conta: int = Field(..., gt=0)
+    id_categoria: int = Field(..., gt=0)
+
+
+class TransacaoCreate(TransacaoBase):
+    """Schema para criacao de transacao"""
+    pass
+
+
+class TransacaoUpdate(BaseModel):
+    """Schema para atualizacao de transacao"""
+    valor: Optional[Decimal] = Field(None, gt=0)
+    data: Optional[date] = None
+    descricao: Optional[str] = Field(None, max_length=500)
+    tipo: Optional[str] = Field(None, pattern="^(receita|despesa)$")
+    id_conta: Optional[int] = Field(None, gt=0)
+    id_categoria: Optional[int] = Field(None, gt=0)
+
+
+class TransacaoResponse(TransacaoBase):
+    """Schema de resposta de transacao"""
+    id_transacao: int
+    id_usuario: int
+
+    class Config:
+        from_attributes = True
+
+
+class LinhaExtrato(BaseModel):
+    """Linha do extrato: transacao com o saldo da conta logo apos ela"""
+    id_transacao: int
+    data: date
+    descricao: Optional[str] = None
+    tipo: str
+    valor: Decimal
+    id_categoria: int
+    saldo_apos: Decimal
+
+
+class ExtratoResponse(BaseModel):
+    """Pagina do extrato (proximo_cursor nulo na ultima pagina)"""
+    conta: ContaResponse
+    transacoes: List[LinhaExtrato]
+    proximo_cursor: Optional[str] = None
+
+
+# ============================================================================
+# SCHEMAS DE JOB
+# ============================================================================
+
+class JobResponse(BaseModel):
+    """Estado de um job (pendente, executando, concluido, falhou)"""
+    id_job: int
+    tipo: str
+    status: str
+    progresso: int
+    mensagem: Optional[str] = None
+    resultado: Optional[Dict[str, Any]] = None
+    erro: Optional[str] = None
+    tentativas: int
+    max_tentativas: int
+    criado_em: Optional[datetime] = None
+    iniciado_em: Optional[datetime] = None
+    concluido_em: Optional[datetime] = None
+
+
 # ============================================================================
 # SCHEMAS DE RESPOSTA GENÃ‰RICOS
 # ============================================================================
@@ -100,4 +269,13 @@ class ProductResponse(ProductBase):
 class MessageResponse(BaseModel):
     """Schema para mensagens de resposta"""
     message: str
-    detail: Optional[str] = None
\ No newline at end of file
+    detail: Optional[str] = None
+
+
+ItemMultiGet = TypeVar("ItemMultiGet")
+
+
+class MultiGetResponse(BaseModel, Generic[ItemMultiGet]):
+    """Multi-get (?ids=): itens na ordem dos ids; ausentes = nao encontrados ou de outro usuario"""
+    itens: List[ItemMultiGet]
+    ausentes: List[int]
\ No newline at end of file
@@ -2,28 +2,44 @@
 Arquivo Principal da API FastAPI
 Contém configuração do app, seed de dados e rotas
 """
-from fastapi import FastAPI, Depends, HTTPException
+import os
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from datetime import date
 from decimal import Decimal
+from typing import Optional
 
-from app.core.database import engine, Base, get_db
+from app.core.database import get_db, encerrar_conexoes
 from app.core.security import get_password_hash
 from app.models.usuario import Usuario
 from app.models.conta import Conta
 from app.models.categoria import Categoria
 from app.models.transacao import Transacao
-from app.routers import auth, usuarios, contas, categorias, transacoes
+from app.routers import auth, usuarios, contas, categorias, transacoes, relatorios, perfis, eventos, jobs
 from app.schemas.schemas import MessageResponse
 from app.core.seed import seed_database as seed_db_function
+from app.core.limpeza import apagar_tabelas, truncar_tabelas, expurgar_usuario, TAMANHO_LOTE_PADRAO
+from app.core.jobs import enfileirar, resposta_aceita
+from app.core.admissao import AdmissaoMiddleware, estatisticas_admissao
+from app.core.cronometro import ServerTimingMiddleware, RotaCronometrada, RespostaJSONCronometrada
+from app.core.perfil import PerfilMiddleware
+from app.core.gravacao_lote import gravador
+from app.core.eventos import difusor
+from app.core import versoes
+from app.core.metadados import metadados
+from app.core.revogacao import revogacoes, revogar_todos, revogar_usuario
 
-# Criação das tabelas no banco de dados
-Base.metadata.create_all(bind=engine)
+# Criação das tabelas NÃO acontece mais no import: é um passo explícito de deploy
+# (python -m app.core.migracao). Para desenvolvimento, CRIAR_TABELAS_NO_STARTUP=1
+# cria as tabelas no evento de startup.
+CRIAR_TABELAS_NO_STARTUP = os.getenv("CRIAR_TABELAS_NO_STARTUP", "0") == "1"
 
-# Configuração do Swagger para autenticação JWT
-app = FastAPI(
-    title="API de Controle Financeiro",
-    description="""
+# Em produção a documentação pode ser desligada (DOCS_ENABLED=0).
+# Quando ligada, o schema OpenAPI só é gerado no primeiro acesso a /docs
+# e fica em cache no app (FastAPI.openapi_schema).
+DOCS_ENABLED = os.getenv("DOCS_ENABLED", "1") == "1"
+
+DESCRICAO = """
     ## API RESTful completa para controle financeiro pessoal
     
     ### Funcionalidades:
@@ -32,6 +48,7 @@ app = FastAPI(
     * 💰 **Contas** - Gerencie suas contas bancárias
     * 📑 **Categorias** - Organize receitas e despesas
     * 💸 **Transações** - Registre e acompanhe movimentações financeiras
+    * 📈 **Relatórios** - Fluxo de caixa diário, semanal e mensal
     
     ### Como usar a autenticação no Swagger:
     1. Execute o endpoint `POST /seed` para criar dados de teste
@@ -45,22 +62,13 @@ app = FastAPI(
     - **Usuário** possui várias **Contas** e **Categorias**
     - Cada **Transação** está vinculada a uma Conta e Categoria
     - Saldo das contas é atualizado automaticamente com as transações
-    """,
-    version="2.0.0",
-    swagger_ui_parameters={
-        "persistAuthorization": True,
-    }
-)
+    """
 
-# Registra os routers
-app.include_router(auth.router)
-app.include_router(usuarios.router)
-app.include_router(contas.router)
-app.include_router(categorias.router)
-app.include_router(transacoes.router)
+# Rotas gerais e utilitários (registradas no app pela create_app)
+router = APIRouter(route_class=RotaCronometrada)
 
 
-@app.get("/", tags=["Root"])
+@router.get("/", tags=["Root"])
 def root():
     """
     Endpoint raiz da API
@@ -75,12 +83,13 @@ def root():
             "usuarios": "/usuarios",
             "contas": "/contas",
             "categorias": "/categorias",
-            "transacoes": "/transacoes"
+            "transacoes": "/transacoes",
+            "relatorios": "/relatorios/fluxo"
         }
     }
 
 
-@app.get("/health", tags=["Health Check"])
+@router.get("/health", tags=["Health Check"])
 def health_check():
     """
     Verifica se a API está funcionando
@@ -88,34 +97,123 @@ def health_check():
     return {"status": "healthy", "message": "API está online"}
 
 
+@router.get("/health/admissao", tags=["Health Check"])
+def health_admissao():
+    """
+    Fila e rejeições do controle de admissão por grupo de rotas
+    """
+    return estatisticas_admissao()
+
+
+@router.get("/health/eventos", tags=["Health Check"])
+def health_eventos():
+    """
+    Conexões SSE abertas neste worker e eventos entregues/descartados
+    """
+    return difusor.estatisticas()
+
+
+@router.get("/health/metadados", tags=["Health Check"])
+def health_metadados():
+    """
+    Cache de contas e categorias por usuário neste worker: taxa de acerto
+    """
+    return metadados.estatisticas()
+
+
+@router.get("/health/revogacao", tags=["Health Check"])
+def health_revogacao():
+    """
+    Revogações de token em memória neste worker: filtro, atraso da sincronização e consultas ao banco
+    """
+    return revogacoes.estatisticas()
+
+
 # ============================================================================
 # ENDPOINT PARA LIMPAR DADOS
 # ============================================================================
 
-@app.delete("/limpar-dados", response_model=MessageResponse, tags=["Utilitários"])
-def limpar_dados(db: Session = Depends(get_db)):
+@router.delete("/limpar-dados", response_model=MessageResponse, tags=["Utilitários"])
+def limpar_dados(
+    modo: str = "truncate",  # "truncate" (rápido) ou "delete" (linha a linha)
+    id_usuario: Optional[int] = None,  # Expurga apenas este usuário, em lotes
+    tamanho_lote: int = Query(TAMANHO_LOTE_PADRAO, ge=1),
+    assincrono: bool = False,  # Enfileira como job (worker.py) e responde 202
+    db: Session = Depends(get_db)
+):
     """
     ⚠️ CUIDADO! Este endpoint deleta TODOS os dados do banco!
     
     Use apenas em ambiente de desenvolvimento/teste.
     Útil para limpar e reexecutar o seed.
+    
+    Modos:
+    - `?modo=truncate` (padrão): TRUNCATE ... RESTART IDENTITY CASCADE
+    - `?modo=delete`: DELETE tabela por tabela em uma única transação
+    - `?id_usuario=1`: remove apenas os dados desse usuário, em lotes curtos
+    - `?assincrono=true`: executa em segundo plano; acompanhar em /jobs/{id}
     """
+    if modo not in ("truncate", "delete"):
+        raise HTTPException(
+            status_code=400,
+            detail="Modo inválido. Use 'truncate' ou 'delete'"
+        )
+    
+    if assincrono:
+        if id_usuario is not None:
+            job = enfileirar(db, "expurgar_usuario", {"id_usuario": id_usuario, "tamanho_lote": tamanho_lote})
+        else:
+            job = enfileirar(db, "limpar_dados", {"modo": modo})
+        return resposta_aceita(job)
+    
     try:
-        print("🗑️ Iniciando limpeza de dados...")
+        if id_usuario is not None:
+            print(f"🗑️ Expurgando usuário {id_usuario} em lotes de {tamanho_lote}...")
+            removidos = expurgar_usuario(db, id_usuario, tamanho_lote)
+            versoes.marcar_todas(db, id_usuario)
+            db.commit()
+            revogar_usuario(db, id_usuario)
+            
+            print(f"✅ Expurgo concluído: {removidos}")
+            
+            return {
+                "message": f"🗑️ Dados do usuário {id_usuario} foram deletados com sucesso!",
+                "detail": (
+                    f"Removidos: {removidos['usuario']} usuários, {removidos['conta']} contas, "
+                    f"{removidos['categoria']} categorias, {removidos['transacao']} transações."
+                )
+            }
+        
+        print(f"🗑️ Iniciando limpeza de dados (modo: {modo})...")
         
-        # Deleta na ordem correta (por causa das foreign keys)
-        trans_count = db.query(Transacao).delete()
-        cat_count = db.query(Categoria).delete()
-        conta_count = db.query(Conta).delete()
-        user_count = db.query(Usuario).delete()
+        # No PostgreSQL o TRUNCATE não conta linhas: os números são a estimativa do planner
+        rotulo = "Removidos"
+        if modo == "truncate":
+            removidos = truncar_tabelas(db)
+            if db.get_bind().dialect.name == "postgresql":
+                rotulo = "Removidos (estimativa)"
+            trans_count = removidos["transacao"]
+            cat_count = removidos["categoria"]
+            conta_count = removidos["conta"]
+            user_count = removidos["usuario"]
+        else:
+            # Deleta na ordem correta (por causa das foreign keys)
+            removidos = apagar_tabelas(db)
+            trans_count = removidos["transacao"]
+            cat_count = removidos["categoria"]
+            conta_count = removidos["conta"]
+            user_count = removidos["usuario"]
         
+        versoes.marcar_todas(db)
         db.commit()
+        # Os ids recomeçam do 1 (RESTART IDENTITY): tokens antigos apontariam para novos usuários
+        revogar_todos(db)
         
         print(f"✅ Deletados: {user_count} usuários, {conta_count} contas, {cat_count} categorias, {trans_count} transações")
         
         return {
             "message": "🗑️ Todos os dados foram deletados com sucesso!",
-            "detail": f"Removidos: {user_count} usuários, {conta_count} contas, {cat_count} categorias, {trans_count} transações. Você pode executar /seed novamente."
+            "detail": f"{rotulo}: {user_count} usuários, {conta_count} contas, {cat_count} categorias, {trans_count} transações. Você pode executar /seed novamente."
         }
     except Exception as e:
         db.rollback()
@@ -132,11 +230,18 @@ def limpar_dados(db: Session = Depends(get_db)):
 
 # ... (mantenha todos os imports existentes) ...
 
-@app.post("/seed", response_model=MessageResponse, tags=["Utilitários"])
-def seed_database(db: Session = Depends(get_db)):
+@router.post("/seed", response_model=MessageResponse, tags=["Utilitários"])
+def seed_database(
+    assincrono: bool = False,  # Enfileira como job (worker.py) e responde 202
+    db: Session = Depends(get_db)
+):
     """
     Popula o banco de dados com dados fictícios para teste
+    Com `?assincrono=true` executa em segundo plano; acompanhar em /jobs/{id}
     """
+    if assincrono:
+        return resposta_aceita(enfileirar(db, "seed"))
+    
     try:
         # VERIFICAÇÃO 1: Verifica se já existem dados
         existing_count = db.query(Usuario).count()
@@ -221,6 +326,7 @@ def seed_database(db: Session = Depends(get_db)):
         
         # COMMIT FINAL
         print("💾 Fazendo commit...")
+        versoes.marcar_todas(db)  # Ids de usuários já vistos pelos workers antes da limpeza
         db.commit()
         print("✅ Commit realizado!")
         
@@ -251,6 +357,67 @@ def seed_database(db: Session = Depends(get_db)):
         )
 
 
+# ============================================================================
+# FÁBRICA DA APLICAÇÃO
+# ============================================================================
+
+def create_app() -> FastAPI:
+    """
+    Monta a aplicação sem efeitos colaterais (sem acesso ao banco no import)
+    """
+    application = FastAPI(
+        title="API de Controle Financeiro",
+        description=DESCRICAO,
+        version="2.0.0",
+        docs_url="/docs" if DOCS_ENABLED else None,
+        redoc_url="/redoc" if DOCS_ENABLED else None,
+        openapi_url="/openapi.json" if DOCS_ENABLED else None,
+        swagger_ui_parameters={
+            "persistAuthorization": True,
+        },
+        default_response_class=RespostaJSONCronometrada
+    )
+    
+    # Registra os routers
+    application.include_router(router)
+    application.include_router(auth.router)
+    application.include_router(usuarios.router)
+    application.include_router(contas.router)
+    application.include_router(categorias.router)
+    application.include_router(transacoes.router)
+    application.include_router(relatorios.router)
+    application.include_router(perfis.router)
+    application.include_router(eventos.router)
+    application.include_router(jobs.router)
+    
+    # Captura de perfil sob demanda (header X-Profile-Token, só administradores)
+    application.add_middleware(PerfilMiddleware)
+    
+    # Server-Timing nas requisições amostradas (SERVER_TIMING_AMOSTRAGEM)
+    application.add_middleware(ServerTimingMiddleware)
+    
+    # Limite de concorrência por grupo de rotas (503 + Retry-After quando lota)
+    application.add_middleware(AdmissaoMiddleware)
+    
+    @application.on_event("shutdown")
+    def fechar_pool():
+        gravador.encerrar()  # Grava os lotes pendentes antes de fechar o pool
+        difusor.encerrar()
+        revogacoes.encerrar()
+        encerrar_conexoes()
+    
+    if CRIAR_TABELAS_NO_STARTUP:
+        @application.on_event("startup")
+        def criar_tabelas_no_startup():
+            from app.core.migracao import criar_tabelas
+            criar_tabelas()
+    
+    return application
+
+
+app = create_app()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8001, reload=True)
\ No newline at end of file
@@ -6,6 +6,8 @@ import sys
 from sqlalchemy import create_engine, text
 from sqlalchemy.exc import SQLAlchemyError
 
+from app.core.banco_sqlite import PRAGMAS, criar_engines, usar_perfil_sqlite
+
 # ============================================================================
 # === AJUSTE SEUS DADOS AQUI ===
 # ============================================================================
@@ -32,10 +34,14 @@ def test_connection():
     try:
         # Cria engine
         print("🔄 Criando engine SQLAlchemy...")
-        engine = create_engine(
-            DATABASE_URL,
-            connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-        )
+        if usar_perfil_sqlite(DATABASE_URL):
+            # Mesmo perfil do app: WAL + PRAGMAs (engine de escrita)
+            engine, _ = criar_engines(DATABASE_URL)
+        else:
+            engine = create_engine(
+                DATABASE_URL,
+                connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
+            )
         
         # Tenta conectar
         print("🔄 Tentando conectar ao banco de dados...")
@@ -51,6 +57,12 @@ def test_connection():
             print(f"   - Driver: {engine.driver}")
             print(f"   - Dialect: {engine.dialect.name}")
             
+            # Perfil SQLite: confirma os PRAGMAs efetivos da conexão
+            if engine.dialect.name == "sqlite":
+                for pragma in PRAGMAS:
+                    valor = connection.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+                    print(f"   - {pragma}: {valor}")
+            
             # Lista tabelas existentes (se possível)
             try:
                 from sqlalchemy import inspect
@@ -0,0 +1,88 @@
+"""
+Worker dos Jobs (processo separado da API)
+Executa os jobs gravados na tabela job (app/core/jobs.py) com um pool de
+processos: cada processo reserva um job por vez (SKIP LOCKED no PostgreSQL)
+e consulta a fila a cada JOBS_INTERVALO segundos quando ela está vazia.
+Não precisa de broker: basta o mesmo DATABASE_URL da API (e, para as
+exportações, a mesma pasta JOBS_EXPORTACOES, apagada após a retenção).
+
+Uso:
+    python worker.py                # JOBS_PROCESSOS processos (padrão: 2)
+    python worker.py -p 4
+Encerrar com Ctrl+C / SIGTERM: cada processo termina o job atual e sai.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(levelname)s %(message)s")
+
+# Intervalo (s) entre as verificações de jobs abandonados (worker morto)
+INTERVALO_ABANDONADOS = 30
+
+
+def trabalhar(indice: int, parar) -> None:
+    """Laço de um processo do pool"""
+    # Importa no processo filho (spawn): engine e pool próprios
+    from app.core.database import SessionLocal
+    from app.core.jobs import JOBS_INTERVALO, devolver_abandonados, executar_proximo
+    from app.core.tarefas import expurgar_exportacoes  # importar registra as tarefas
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # O processo pai coordena o encerramento
+    nome = f"{socket.gethostname()}:{os.getpid()}"
+    logger = logging.getLogger("leileiamor.worker")
+    logger.info("Worker %s pronto", nome)
+
+    proxima_verificacao = 0.0
+    while not parar.is_set():
+        try:
+            if indice == 0 and time.monotonic() >= proxima_verificacao:
+                db = SessionLocal()
+                try:
+                    devolvidos = devolver_abandonados(db)
+                finally:
+                    db.close()
+                if devolvidos:
+                    logger.warning("%s job(s) abandonado(s) devolvido(s) à fila", devolvidos)
+                expiradas = expurgar_exportacoes()
+                if expiradas:
+                    logger.info("%s exportação(ões) expirada(s) removida(s)", expiradas)
+                proxima_verificacao = time.monotonic() + INTERVALO_ABANDONADOS
+
+            if not executar_proximo(nome):
+                parar.wait(JOBS_INTERVALO)
+        except Exception:
+            # Banco fora do ar etc.: tenta de novo no próximo ciclo
+            logger.exception("Erro no laço do worker")
+            parar.wait(JOBS_INTERVALO)
+
+    logger.info("Worker %s encerrado", nome)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Executa os jobs em segundo plano")
+    parser.add_argument("-p", "--processos", type=int, default=int(os.getenv("JOBS_PROCESSOS", "2")))
+    args = parser.parse_args()
+
+    contexto = multiprocessing.get_context("spawn")
+    parar = contexto.Event()
+    processos = [
+        contexto.Process(target=trabalhar, args=(indice, parar), name=f"worker-{indice}")
+        for indice in range(args.processos)
+    ]
+    for processo in processos:
+        processo.start()
+
+    def encerrar(*_):
+        parar.set()
+
+    signal.signal(signal.SIGINT, encerrar)
+    signal.signal(signal.SIGTERM, encerrar)
+    print(f"⚙️ {args.processos} processo(s) executando jobs (Ctrl+C para encerrar)")
+
+    for processo in processos:
+        processo.join()